@@ -0,0 +1,133 @@
+"""
+Compare one-query-per-call knowledge search with the batched search tool.
+
+Ingests the retrieval fixture corpus into an in-process ChromaDB collection
+and answers groups of fixture queries either:
+
+- sequential: one `aretrieve` per query (what search_in_knowledge costs)
+- batched:    one `aretrieve_many` for the whole group (search_in_knowledge_batch)
+
+The stand-in embedder and the collection add a fixed round-trip latency per
+call, like the Jina API and the ChromaDB server, and count calls. Both modes
+must return the same chunks for every query.
+
+Usage:
+    python benchmarks/bench_batch_search.py --group 4 --embed-latency 0.15 --query-latency 0.01
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import shutil
+import tempfile
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import chromadb
+
+from bench_retrieval import FIXTURE, TrigramEmbeddings
+from utils.ingest_data import run_ingestion
+from utils.retrieval import HybridRetriever
+
+COLLECTION = "bench_batch_search"
+
+
+class SlowEmbeddings(TrigramEmbeddings):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+        self.calls = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class SlowCollection:
+    """Collection wrapper adding a round-trip latency to query/get calls."""
+
+    def __init__(self, collection, latency: float):
+        self.collection = collection
+        self.latency = latency
+        self.calls = 0
+
+    def query(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.collection.query(**kwargs)
+
+    def get(self, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self.collection.get(**kwargs)
+
+
+async def main(fixture, group: int, embed_latency: float, query_latency: float):
+    workdir = tempfile.mkdtemp(prefix="bench_batch_search_")
+    lexical_path = os.path.join(workdir, "lexical.db")
+    client = chromadb.EphemeralClient(settings=chromadb.config.Settings(anonymized_telemetry=False))
+    raw = client.get_or_create_collection(COLLECTION, metadata={"hnsw:space": "cosine"})
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_ingestion(
+                ((doc["source"], doc["text"]) for doc in fixture["documents"]),
+                collection_name=COLLECTION,
+                embedder=TrigramEmbeddings(),
+                collection=raw,
+                state_dir=workdir,
+                lexical_index_path=lexical_path,
+            )
+        queries = [item["query"] for item in fixture["queries"]]
+        groups = [queries[i:i + group] for i in range(0, len(queries), group)]
+        print(f"{len(queries)} queries in groups of {group}, embed latency {embed_latency * 1000:.0f} ms, "
+              f"store latency {query_latency * 1000:.0f} ms\n")
+        print(f"{'mode':<12}{'ms/group':>10}{'embed calls':>13}{'store calls':>13}")
+
+        results = {}
+        for mode in ("sequential", "batched"):
+            embedder = SlowEmbeddings(embed_latency)
+            collection = SlowCollection(raw, query_latency)
+            retriever = HybridRetriever(embedder=embedder, lexical_index_path=lexical_path)
+            ids = []
+            started = time.perf_counter()
+            for batch in groups:
+                if mode == "sequential":
+                    found = [await retriever.aretrieve(q, collection, COLLECTION) for q in batch]
+                else:
+                    found = await retriever.aretrieve_many(batch, collection, COLLECTION)
+                ids.extend([chunk.id for chunk in chunks] for chunks in found)
+            elapsed = (time.perf_counter() - started) * 1000 / len(groups)
+            results[mode] = ids
+            print(f"{mode:<12}{elapsed:>10.1f}{embedder.calls:>13}{collection.calls:>13}")
+
+        same = results["sequential"] == results["batched"]
+        print(f"\nSame chunks for every query: {same}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--group", type=int, default=4, help="Queries per agent question")
+    parser.add_argument("--embed-latency", type=float, default=0.15)
+    parser.add_argument("--query-latency", type=float, default=0.01)
+    parser.add_argument("--fixture", default=FIXTURE)
+    args = parser.parse_args()
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+    asyncio.run(main(fixture, args.group, args.embed_latency, args.query_latency))
@@ -0,0 +1,100 @@
+"""
+Microbenchmark for the safe calculator engine.
+
+- per call:  raw eval() (the old calculator_tool) vs the AST engine with a
+             cold and a warm compiled-expression cache
+- batch:     one formula over N inputs, as N scalar evaluations vs one
+             NumPy batch evaluation
+- bombs:     time to reject expressions that pinned a CPU under eval()
+             (eval itself is not run on them)
+
+Usage:
+    python benchmarks/bench_calculator.py --rows 100000
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from utils.calculator import compile_expression, evaluate, evaluate_batch
+
+EXPRESSIONS = [
+    "4*4",
+    "(1200 - 150) / 12",
+    "2^10 + sqrt(144)",
+    "15 * 240 / 100",
+    "round(1000 * (1 + 0.05) ** 10, 2)",
+    "sin(pi / 6) + log(e ** 3)",
+]
+BOMBS = ["9**9**9", "10**10**10", "factorial(10**6)", "2**2**2**2**2**2"]
+FORMULA = "price * qty * (1 + tax) - discount"
+
+
+def per_call_us(function, expressions, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for expression in expressions:
+            function(expression)
+    return (time.perf_counter() - started) / (repeat * len(expressions)) * 1e6
+
+
+def cold(expression):
+    compile_expression.cache_clear()
+    return evaluate(expression)
+
+
+def main(rows: int, repeat: int):
+    scope = {"__builtins__": {}, "sqrt": math.sqrt, "round": round, "sin": math.sin, "log": math.log,
+             "pi": math.pi, "e": math.e}
+    python_eval = lambda expression: eval(expression.replace("^", "**"), scope)
+
+    print(f"Per call, {len(EXPRESSIONS)} typical expressions x {repeat}\n")
+    print(f"{'mode':<16}{'us/call':>10}")
+    for mode, function in (("eval()", python_eval), ("engine (cold)", cold), ("engine (cached)", evaluate)):
+        print(f"{mode:<16}{per_call_us(function, EXPRESSIONS, repeat):>10.1f}")
+
+    rng = np.random.default_rng(0)
+    variables = {
+        "price": rng.uniform(1, 500, rows),
+        "qty": rng.integers(1, 20, rows).astype(float),
+        "tax": np.full(rows, 0.14),
+        "discount": rng.uniform(0, 10, rows),
+    }
+    print(f"\nBatch: '{FORMULA}' over {rows} rows\n")
+    print(f"{'mode':<16}{'ms':>10}{'rows/s':>14}")
+    started = time.perf_counter()
+    scalar = [
+        evaluate(FORMULA, {name: float(values[i]) for name, values in variables.items()}) for i in range(rows)
+    ]
+    scalar_s = time.perf_counter() - started
+    started = time.perf_counter()
+    batch = evaluate_batch(FORMULA, variables)
+    batch_s = time.perf_counter() - started
+    for mode, seconds in (("scalar loop", scalar_s), ("numpy batch", batch_s)):
+        print(f"{mode:<16}{seconds * 1000:>10.1f}{rows / seconds:>14,.0f}")
+    assert np.allclose(scalar, batch)
+    print(f"speedup: {scalar_s / batch_s:.0f}x")
+
+    print("\nRejecting bombs\n")
+    for bomb in BOMBS:
+        started = time.perf_counter()
+        try:
+            evaluate(bomb)
+            outcome = "evaluated?!"
+        except ValueError as e:
+            outcome = str(e)
+        print(f"{bomb:<22}{(time.perf_counter() - started) * 1e6:>8.0f} us  {outcome}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,76 @@
+"""
+Benchmark checkpoint writes per second at 1, 8 and 64 concurrent thread_ids.
+
+Each simulated conversation runs a series of super-steps; one super-step stores
+the pending writes of two tasks and then the checkpoint itself, the same
+pattern the supervisor graph produces. The baseline is the single shared
+sqlite3 connection behind SqliteSaver; the candidate is PooledSqliteSaver.
+
+Usage:
+    python benchmarks/bench_checkpoint_writes.py --steps 50
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.sqlite import SqliteSaver
+from utils.checkpoint import PooledSqliteSaver
+
+MESSAGES = [HumanMessage(content="what is a def in python? " * 10), AIMessage(content="A function definition. " * 40)]
+
+
+def run_conversation(saver, thread_id, steps):
+    """Write `steps` super-steps for one thread; returns the number of write calls."""
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    for step in range(steps):
+        checkpoint = empty_checkpoint()
+        checkpoint["id"] = str(uuid6(clock_seq=step))
+        checkpoint["channel_values"] = {"messages": MESSAGES}
+        write_config = {"configurable": {**config["configurable"], "checkpoint_id": checkpoint["id"]}}
+        saver.put_writes(write_config, [("messages", MESSAGES[0])], task_id=f"{step}-a")
+        saver.put_writes(write_config, [("messages", MESSAGES[1])], task_id=f"{step}-b")
+        config = saver.put(config, checkpoint, {"source": "loop", "step": step}, {})
+        config["configurable"]["checkpoint_ns"] = ""
+    return steps * 3
+
+
+def measure(saver, concurrency, steps):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        writes = sum(pool.map(lambda i: run_conversation(saver, f"thread-{i}", steps), range(concurrency)))
+    return writes / (time.perf_counter() - start)
+
+
+def main(steps):
+    print(f"{'backend':<22}{'threads':>8}{'writes/s':>12}{'commits':>10}")
+    for concurrency in (1, 8, 64):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = sqlite3.connect(os.path.join(tmp, "baseline.db"), check_same_thread=False)
+            rate = measure(SqliteSaver(conn), concurrency, steps)
+            conn.close()
+            print(f"{'SqliteSaver (shared)':<22}{concurrency:>8}{rate:>12.0f}{'-':>10}")
+
+            with PooledSqliteSaver.from_conn_string(os.path.join(tmp, "pooled.db")) as saver:
+                rate = measure(saver, concurrency, steps)
+                print(f"{'PooledSqliteSaver':<22}{concurrency:>8}{rate:>12.0f}{saver.commits:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--steps", type=int, default=50, help="Super-steps per thread_id")
+    args = parser.parse_args()
+    main(args.steps)
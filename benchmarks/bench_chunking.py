@@ -0,0 +1,87 @@
+"""
+Benchmark the chunking stage: single-process vs N worker processes.
+
+Runs `split_documents` over a synthetic corpus of large markdown-like
+documents and reports documents/sec and chunks/sec per worker count. Chunk IDs
+from every run are compared with the single-process run, so the benchmark
+also checks that parallel output is identical and in order. Speedup is
+bounded by the CPU cores available.
+
+Usage:
+    python benchmarks/bench_chunking.py --docs 2000 --workers 1 2 4 8
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import hashlib
+import random
+import time
+
+from utils.chunking import split_documents
+
+WORDS = (
+    "python list comprehension generator decorator dictionary hash table exception "
+    "handling function module package import class instance method attribute iterator "
+    "memory lazy evaluation concurrency thread process pool embedding vector chunk"
+).split()
+
+
+def synthetic_corpus(n_docs: int, doc_chars: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(n_docs):
+        parts = [f"# Document {i}\n"]
+        size = 0
+        while size < doc_chars:
+            paragraph = ". ".join(
+                " ".join(rng.choices(WORDS, k=rng.randint(6, 18))).capitalize()
+                for _ in range(rng.randint(2, 6))
+            ) + "."
+            heading = f"\n## Section {len(parts)}\n" if rng.random() < 0.15 else ""
+            parts.append(heading + paragraph)
+            size += len(paragraph)
+        corpus.append((f"docs/doc_{i}.md", "\n\n".join(parts)))
+    return corpus
+
+
+def run(corpus, chunk_size, chunk_overlap, workers, task_size):
+    digest = hashlib.sha256()
+    n_chunks = 0
+    started = time.perf_counter()
+    for _, chunks in split_documents(corpus, chunk_size, chunk_overlap, workers=workers, task_size=task_size):
+        for chunk in chunks:
+            digest.update(chunk.id.encode())
+        n_chunks += len(chunks)
+    return time.perf_counter() - started, n_chunks, digest.hexdigest()
+
+
+def main(n_docs, doc_chars, chunk_size, chunk_overlap, worker_counts, task_size):
+    corpus = synthetic_corpus(n_docs, doc_chars)
+    total_mb = sum(len(text) for _, text in corpus) / 1e6
+    print(f"Corpus: {n_docs} docs, {total_mb:.1f} MB, chunk size {chunk_size}, overlap {chunk_overlap}, "
+          f"{os.cpu_count()} CPU(s)")
+    print(f"{'workers':>8}{'seconds':>10}{'docs/s':>10}{'chunks/s':>12}{'speedup':>10}  output")
+
+    baseline = None
+    for workers in worker_counts:
+        elapsed, n_chunks, digest = run(corpus, chunk_size, chunk_overlap, workers, task_size)
+        if baseline is None:
+            baseline = (elapsed, digest)
+        same = "identical" if digest == baseline[1] else "DIFFERENT"
+        print(f"{workers:>8}{elapsed:>10.2f}{n_docs / elapsed:>10.0f}{n_chunks / elapsed:>12.0f}"
+              f"{baseline[0] / elapsed:>9.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=2000)
+    parser.add_argument("--doc-chars", type=int, default=20000, help="Approximate characters per document")
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--task-size", type=int, default=16, help="Documents per worker task")
+    args = parser.parse_args()
+    main(args.docs, args.doc_chars, args.chunk_size, args.chunk_overlap, args.workers, args.task_size)
@@ -0,0 +1,137 @@
+"""
+Measure the per-call saving of cached collection handles, and outage behaviour.
+
+Starts a local ChromaDB server (`chroma run`) and compares, per knowledge
+search:
+
+- resolve: `get_or_create_collection` on every call, then query (old tool)
+- cached:  `CollectionCache` handle, then query (new tool)
+
+It then stops the server and measures how long a lookup takes to fail with
+the cache (fast, reconnect runs in the background) versus the blocking retry
+loop of `get_chroma_client` (retries x delay), restarts the server and
+measures how long the background reconnect needs to recover.
+
+Usage:
+    python benchmarks/bench_collection_cache.py --calls 300
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import logging
+import shutil
+import subprocess
+import tempfile
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import chromadb
+import numpy as np
+
+from bench_vector_store import start_chroma_server
+from utils.util import CollectionCache, logger
+
+COLLECTION = "bench_handles"
+DIM = 256
+
+
+def percentiles(samples):
+    return np.mean(samples), np.percentile(samples, 50), np.percentile(samples, 99)
+
+
+async def main(n_calls: int, retries: int, retry_delay: float):
+    logger.setLevel(logging.ERROR)
+    workdir = tempfile.mkdtemp(prefix="bench_collection_cache_")
+    data_path = os.path.join(workdir, "server")
+    process, port = start_chroma_server(data_path)
+    settings = chromadb.config.Settings(anonymized_telemetry=False)
+    state = {"client": None}
+
+    def connect():
+        if state["client"] is None:
+            state["client"] = chromadb.HttpClient(host="127.0.0.1", port=port, settings=settings)
+        return state["client"]
+
+    def reset():
+        state["client"] = None
+
+    try:
+        rng = np.random.default_rng(0)
+        collection = connect().get_or_create_collection(COLLECTION, metadata={"hnsw:space": "cosine"})
+        vectors = rng.standard_normal((2000, DIM)).astype(np.float32)
+        collection.add(
+            ids=[str(i) for i in range(len(vectors))],
+            embeddings=vectors.tolist(),
+            documents=[f"chunk {i}" for i in range(len(vectors))],
+        )
+        queries = rng.standard_normal((n_calls, DIM)).astype(np.float32).tolist()
+        cache = CollectionCache(connect, reset, retries=retries, retry_delay=retry_delay)
+
+        def resolve_each_call(query):
+            handle = connect().get_or_create_collection(name=COLLECTION, metadata={"hnsw:space": "cosine"})
+            return handle.query(query_embeddings=[query], n_results=5)
+
+        def cached(query):
+            return cache.get(COLLECTION).query(query_embeddings=[query], n_results=5)
+
+        print(f"{n_calls} searches against a local ChromaDB server\n")
+        print(f"{'mode':<10}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        results = {}
+        for mode, search in (("resolve", resolve_each_call), ("cached", cached)):
+            samples = []
+            for query in queries:
+                started = time.perf_counter()
+                search(query)
+                samples.append((time.perf_counter() - started) * 1000)
+            results[mode] = percentiles(samples)
+            print(f"{mode:<10}" + "".join(f"{value:>10.2f}" for value in results[mode]))
+        print(f"\nSaved per call: {results['resolve'][0] - results['cached'][0]:.2f} ms mean, "
+              f"{results['resolve'][1] - results['cached'][1]:.2f} ms p50")
+
+        # Outage: stop the server, fail one search, then time the next lookups
+        process.terminate()
+        process.wait(timeout=30)
+        try:
+            (await cache.aget(COLLECTION)).query(query_embeddings=[queries[0]], n_results=5)
+        except Exception:
+            cache.invalidate(COLLECTION)
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        try:
+            await cache.aget(COLLECTION)
+        except Exception:
+            pass
+        fail_ms = (time.perf_counter() - started) * 1000
+        print(f"\nServer down: lookup failed after {fail_ms:.1f} ms "
+              f"(blocking retry loop: ~{(retries - 1) * retry_delay * 1000:.0f} ms + connect timeouts)")
+
+        process = subprocess.Popen(
+            ["chroma", "run", "--path", data_path, "--port", str(port)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        started = time.perf_counter()
+        while not cache.healthy:
+            await asyncio.sleep(0.1)
+        handle = await cache.aget(COLLECTION)
+        handle.query(query_embeddings=[queries[0]], n_results=5)
+        print(f"Server back: recovered {time.perf_counter() - started:.1f} s after restart; stats {cache.snapshot()}")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--retries", type=int, default=20, help="Background reconnect attempts")
+    parser.add_argument("--retry-delay", type=float, default=1.5)
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.retries, args.retry_delay))
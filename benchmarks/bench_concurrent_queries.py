@@ -0,0 +1,84 @@
+"""
+Benchmark concurrent /query calls against the FastAPI app.
+
+The compiled supervisor graph is replaced by a stand-in whose `astream` awaits
+a fixed per-request latency, so the numbers isolate how the API worker
+schedules concurrent agent runs. With a non-blocking execution path, N parallel
+queries finish in about the time of the slowest one rather than the sum.
+
+Usage:
+    python benchmarks/bench_concurrent_queries.py --requests 16 --latency 0.5
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import random
+import time
+
+# The graph is never called for real, but utils.util builds its clients on import
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import httpx
+from langchain_core.messages import AIMessage
+import server
+
+
+class SlowGraph:
+    """Stand-in for the compiled graph that simulates one agent run per call."""
+
+    def __init__(self, latencies):
+        self.latencies = latencies
+
+    async def astream(self, inputs, config=None, stream_mode="updates"):
+        thread_id = config["configurable"]["thread_id"]
+        await asyncio.sleep(self.latencies[thread_id])
+        yield {"supervisor": {"messages": [AIMessage(content=f"done {thread_id}")]}}
+
+
+async def run(n_requests: int, latency: float, jitter: float):
+    latencies = {
+        f"bench-{i}": latency + random.uniform(0, jitter) for i in range(n_requests)
+    }
+    server.graph = SlowGraph(latencies)
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def query(thread_id):
+            response = await client.post("/query", json={"message": "hi", "thread_id": thread_id})
+            response.raise_for_status()
+
+        async def health_probe():
+            # Probe /health while the queries are in flight
+            await asyncio.sleep(latency / 4)
+            start = time.perf_counter()
+            response = await client.get("/health")
+            response.raise_for_status()
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = await asyncio.gather(health_probe(), *(query(t) for t in latencies))
+        wall = time.perf_counter() - start
+
+    health_latency = results[0]
+    slowest = max(latencies.values())
+    total = sum(latencies.values())
+    print(f"Parallel /query calls : {n_requests}")
+    print(f"Slowest single run    : {slowest:.3f}s")
+    print(f"Sum of all runs       : {total:.3f}s")
+    print(f"Wall-clock for batch  : {wall:.3f}s ({wall / slowest:.2f}x slowest, {wall / total:.2%} of sum)")
+    print(f"/health under load    : {health_latency * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="Base seconds per agent run")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Extra random seconds per run")
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency, args.jitter))
@@ -0,0 +1,79 @@
+"""
+Measure prompt tokens per turn with and without history management.
+
+Simulates a growing thread where each turn carries the messages the supervisor
+graph really stores (user message, handoff, worker answer, handoff back, final
+answer) and reports the history tokens that would be sent at the start of each
+turn under each HISTORY_MODE. Summaries come from a fake chat model returning
+a fixed-length summary, so no LLM is needed.
+
+Usage:
+    python benchmarks/bench_history_tokens.py --turns 40 --max-turns 6 --max-tokens 2000
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import uuid
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.graph.message import add_messages
+from utils.history import HistoryManager
+
+
+def turn_messages(i):
+    """The messages one supervisor turn appends to the thread."""
+    call_id = str(uuid.uuid4())
+    back_id = str(uuid.uuid4())
+    return [
+        HumanMessage(content=f"Question {i}: what does the knowledge base say about decorators and generators?"),
+        AIMessage(content="", name="supervisor", tool_calls=[{"name": "transfer_to_researcher", "args": {}, "id": call_id}]),
+        ToolMessage(content="Successfully transferred to researcher", name="transfer_to_researcher", tool_call_id=call_id),
+        AIMessage(content="Decorators modify functions without changing their code; generators yield items lazily. " * 3, name="researcher"),
+        AIMessage(content="Transferring back to supervisor", name="researcher", tool_calls=[{"name": "transfer_back_to_supervisor", "args": {}, "id": back_id}]),
+        ToolMessage(content="Successfully transferred back to supervisor", name="transfer_back_to_supervisor", tool_call_id=back_id),
+        AIMessage(content="Decorators wrap functions to extend behaviour; generators produce values lazily. " * 3, name="supervisor"),
+    ]
+
+
+def simulate(manager, turns):
+    """Return the history tokens sent at the start of every turn."""
+    messages = []
+    per_turn = []
+    for i in range(turns):
+        messages = add_messages(messages, turn_messages(i)[:1])
+        update = manager.compact({"messages": messages})
+        if update:
+            messages = add_messages(messages, update["messages"])
+        per_turn.append(manager.stats["last_prompt_tokens_after"])
+        messages = add_messages(messages, turn_messages(i)[1:])
+    return per_turn
+
+
+def main(turns, max_turns, max_tokens):
+    summarizer = FakeListChatModel(responses=["The user keeps asking about Python decorators and generators. " * 4])
+    results = {
+        mode: simulate(HistoryManager(mode, max_turns, max_tokens, model=summarizer), turns)
+        for mode in ("off", "window", "summary")
+    }
+
+    print(f"{'turn':>6}" + "".join(f"{mode:>10}" for mode in results))
+    for i in range(0, turns, max(turns // 10, 1)):
+        print(f"{i + 1:>6}" + "".join(f"{results[mode][i]:>10}" for mode in results))
+    print(f"{'total':>6}" + "".join(f"{sum(results[mode]):>10}" for mode in results))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--max-turns", type=int, default=6)
+    parser.add_argument("--max-tokens", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.turns, args.max_turns, args.max_tokens)
@@ -0,0 +1,122 @@
+"""
+Benchmark the streaming ingestion pipeline: chunks/sec and peak RSS.
+
+Each corpus size runs in a fresh subprocess so peak RSS is measured per run.
+Embeddings come from a stand-in returning 1024-dim vectors after a fixed
+per-batch latency, and the collection only counts upserts, so the numbers
+reflect the pipeline rather than Jina or ChromaDB. The legacy mode reproduces
+the old behaviour: materialize every chunk, embed them all, add them at once.
+
+Usage:
+    python benchmarks/bench_ingest_pipeline.py --docs 10000 100000
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import resource
+import subprocess
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+DIM = 1024
+
+
+class StandInEmbeddings:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [[0.1] * DIM for _ in texts]
+
+
+class CountingCollection:
+    def __init__(self):
+        self.count = 0
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.count += len(ids)
+
+    add = upsert
+
+    def update(self, ids, metadatas):
+        pass
+
+    def delete(self, ids):
+        pass
+
+
+def synthetic_corpus(n_docs):
+    from utils.ingest_data import TEST_DOCUMENT
+    sentences = TEST_DOCUMENT.split(". ")
+    for i in range(n_docs):
+        start = i % len(sentences)
+        yield f"Document {i}. " + ". ".join(sentences[start:] + sentences[:start])[:1200]
+
+
+def child(mode, n_docs, batch_size, concurrency, latency):
+    import contextlib
+    import io
+    import tempfile
+    from utils import ingest_data
+    from utils.chunking import split_documents
+
+    embedder = StandInEmbeddings(latency)
+    collection = CountingCollection()
+    state_dir = tempfile.mkdtemp(prefix="bench_ingest_")
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if mode == "pipeline":
+            ingest_data.run_ingestion(
+                ingest_data.iter_texts(synthetic_corpus(n_docs)),
+                batch_size=batch_size,
+                concurrency=concurrency,
+                embedder=embedder,
+                collection=collection,
+                state_dir=state_dir,
+                lexical_index_path=os.path.join(state_dir, "lexical.db"),
+            )
+        else:
+            documents = split_documents(ingest_data.iter_texts(synthetic_corpus(n_docs)), 250, 50, workers=1)
+            chunks = [chunk for _, document_chunks in documents for chunk in document_chunks]
+            vectors = [v for batch in ingest_data.batched([c.text for c in chunks], batch_size) for v in embedder.embed_documents(batch)]
+            collection.add([c.id for c in chunks], vectors, [c.text for c in chunks], [c.metadata for c in chunks])
+    elapsed = time.perf_counter() - started
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"chunks": collection.count, "seconds": elapsed, "peak_rss_mb": peak_kb / 1024}))
+
+
+def main(doc_counts, batch_size, concurrency, latency, modes):
+    print(f"{'mode':<10}{'docs':>9}{'chunks':>10}{'chunks/s':>12}{'peak RSS':>12}")
+    for n_docs in doc_counts:
+        for mode in modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", mode, "--docs", str(n_docs),
+                 "--batch-size", str(batch_size), "--concurrency", str(concurrency), "--latency", str(latency)],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip().splitlines()[-1]
+            result = json.loads(output)
+            rate = result["chunks"] / result["seconds"]
+            print(f"{mode:<10}{n_docs:>9}{result['chunks']:>10}{rate:>12.0f}{result['peak_rss_mb']:>10.0f}MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01, help="Seconds per embedding batch")
+    parser.add_argument("--modes", nargs="+", default=["legacy", "pipeline"])
+    parser.add_argument("--child", choices=["legacy", "pipeline"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.child, args.docs[0], args.batch_size, args.concurrency, args.latency)
+    else:
+        main(args.docs, args.batch_size, args.concurrency, args.latency, args.modes)
@@ -0,0 +1,198 @@
+"""
+Compare a new Jira client per call with the shared pooled client and the
+metadata cache, against a local mock Jira HTTP server.
+
+The mock serves the REST endpoints the tools use. --handshake adds the cost
+of opening a connection (TCP + TLS round trips to a remote Jira), --latency
+the server time per request, and --projects the size of the project list.
+
+Each "turn" is what a typical Jira conversation does: list projects, create
+an issue (checking its type against the project's issue types) and comment
+on it.
+
+- per call:  the old get_jira_client(), a new Jira object and HTTP session
+             for every call, project list and issue types fetched each time
+- pooled:    one shared client on a keep-alive session, no metadata cache
+- cached:    pooled client plus the TTL metadata cache
+
+Usage:
+    python benchmarks/bench_jira_client.py --turns 40 --concurrency 4
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import logging
+import re
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from atlassian import Jira
+
+from utils import jira_client
+from utils.jira_client import JiraMetadataCache, get_jira_client, reset_jira_client
+from utils.util import logger
+
+ISSUE_TYPES = [{"id": str(i), "name": name} for i, name in enumerate(["Bug", "Task", "Story", "Epic"], 1)]
+
+
+class MockJira(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handshake: float, latency: float, n_projects: int):
+        super().__init__(("127.0.0.1", 0), MockJiraHandler)
+        self.handshake = handshake
+        self.latency = latency
+        self.projects = [
+            {"id": str(i), "key": f"P{i}", "name": f"Project {i}", "projectTypeKey": "software",
+             "description": "x" * 200, "lead": {"name": f"lead{i}"}}
+            for i in range(n_projects)
+        ]
+        self.lock = threading.Lock()
+        self.counts = {"connections": 0, "requests": 0, "project_lists": 0}
+        self.issues = 0
+
+    def count(self, name: str):
+        with self.lock:
+            self.counts[name] += 1
+
+
+class MockJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+        time.sleep(self.server.handshake)
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self, method: str):
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        time.sleep(self.server.latency)
+        # /rest/api/<version>/<resource>
+        path = re.sub(r"^/rest/api/[^/]+", "", self.path.split("?")[0])
+        if method == "GET" and path == "/project":
+            self.server.count("project_lists")
+            return self.reply(200, self.server.projects)
+        if method == "GET" and re.fullmatch(r"/project/[^/]+", path):
+            return self.reply(200, {"key": path.rsplit("/", 1)[1], "issueTypes": ISSUE_TYPES})
+        if method == "GET" and path == "/field":
+            return self.reply(200, [{"id": "summary", "name": "Summary"}])
+        if method == "POST" and path == "/issue":
+            with self.server.lock:
+                self.server.issues += 1
+                key = f"P1-{self.server.issues}"
+            return self.reply(201, {"id": key, "key": key})
+        if method == "POST" and re.fullmatch(r"/issue/[^/]+/comment", path):
+            return self.reply(201, {"id": "1"})
+        self.reply(404, {"errorMessages": [f"No mock for {method} {path}"]})
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+
+FIELDS = {"project": {"key": "P1"}, "summary": "Login fails", "issuetype": {"name": "bug"}}
+
+
+def turn_per_call(url: str):
+    """The old tools: a fresh client (and HTTP session) for every call."""
+    new_client = lambda: Jira(url=url, username="bench", password="bench")
+    new_client().projects()
+    names = [item["name"] for item in new_client().project("P1")["issueTypes"]]
+    assert "Bug" in names
+    issue = new_client().create_issue(fields=FIELDS)
+    new_client().issue_add_comment(issue["key"], "Investigating")
+
+
+def turn_shared(metadata: JiraMetadataCache):
+    metadata.projects()
+    names = [item["name"] for item in metadata.issue_types("P1")]
+    assert "Bug" in names
+    jira = get_jira_client()
+    issue = jira.create_issue(fields=FIELDS)
+    jira.issue_add_comment(issue["key"], "Investigating")
+
+
+def run(server: MockJira, turn, turns: int, concurrency: int):
+    server.counts = dict.fromkeys(server.counts, 0)
+    latencies = []
+
+    def timed_turn(_):
+        started = time.perf_counter()
+        turn()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_turn, range(turns)))
+    total = time.perf_counter() - started
+    return statistics.median(latencies), total, dict(server.counts)
+
+
+def main(turns: int, concurrency: int, handshake: float, latency: float, n_projects: int):
+    logger.setLevel(logging.WARNING)
+    server = MockJira(handshake, latency, n_projects)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ.update(JIRA_INSTANCE_URL=url, JIRA_USERNAME="bench", JIRA_PASSWORD="bench")
+    jira_client.JIRA_POOL_SIZE = max(concurrency, 1)
+
+    print(
+        f"{turns} turns x 4 calls, concurrency {concurrency}, connection setup {handshake * 1000:.0f} ms, "
+        f"request {latency * 1000:.0f} ms, {n_projects} projects\n"
+    )
+    print(f"{'mode':<10}{'turn p50 ms':>13}{'total s':>10}{'connections':>13}{'requests':>10}{'project lists':>15}")
+    try:
+        modes = (
+            ("per call", lambda: turn_per_call(url)),
+            ("pooled", lambda metadata=JiraMetadataCache(ttl=0): turn_shared(metadata)),
+            ("cached", lambda metadata=JiraMetadataCache(): turn_shared(metadata)),
+        )
+        for mode, turn in modes:
+            reset_jira_client()
+            p50, total, counts = run(server, turn, turns, concurrency)
+            print(
+                f"{mode:<10}{p50:>13.1f}{total:>10.2f}{counts['connections']:>13}"
+                f"{counts['requests']:>10}{counts['project_lists']:>15}"
+            )
+    finally:
+        reset_jira_client()
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--handshake", type=float, default=0.05, help="Seconds to open a connection")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds of server time per request")
+    parser.add_argument("--projects", type=int, default=500)
+    args = parser.parse_args()
+    main(args.turns, args.concurrency, args.handshake, args.latency, args.projects)
@@ -0,0 +1,120 @@
+"""
+Compare connect-per-email sending with the pooled background mail queue.
+
+A local aiosmtpd server stands in for Gmail; --handshake adds the cost of
+a new session (TLS handshake and login round trips) and --send the cost of
+accepting one message.
+
+- direct: the old gmail_send_tool, a new SMTP session per email inside the
+          agent run (the tool returns after delivery)
+- queued: the tool enqueues (the time it blocks the agent run), then the
+          background sender delivers the batch over pooled connections
+
+Usage:
+    python benchmarks/bench_mail_queue.py --emails 50 --handshake 0.15 --send 0.02
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import logging
+import smtplib
+import socket
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from aiosmtpd.controller import Controller
+
+from utils.mail_queue import MailQueue, MailSender, SMTPConnectionPool, build_message
+from utils.util import logger
+
+SENDER = "assistant@example.com"
+
+
+class SlowHandler:
+    def __init__(self, handshake: float, send: float):
+        self.handshake = handshake
+        self.send = send
+        self.sessions = 0
+        self.delivered = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.sessions += 1
+        await asyncio.sleep(self.handshake)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.send)
+        self.delivered += 1
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def send_direct(port: int, to: str):
+    """What the old tool did: a fresh session per email."""
+    with smtplib.SMTP("127.0.0.1", port, timeout=30) as smtp:
+        smtp.send_message(build_message(SENDER, to, "Report", "Body"))
+
+
+async def main(n_emails: int, handshake: float, send: float, pool_sizes: list[int]):
+    logger.setLevel(logging.WARNING)
+    print(f"{n_emails} emails, session setup {handshake * 1000:.0f} ms, message {send * 1000:.0f} ms\n")
+    print(f"{'mode':<12}{'tool p50 ms':>13}{'delivered in s':>16}{'sessions':>10}")
+
+    handler = SlowHandler(handshake, send)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    try:
+        latencies = []
+        started = time.perf_counter()
+        for i in range(n_emails):
+            t = time.perf_counter()
+            await asyncio.to_thread(send_direct, controller.port, f"user{i}@example.com")
+            latencies.append((time.perf_counter() - t) * 1000)
+        total = time.perf_counter() - started
+        print(f"{'direct':<12}{statistics.median(latencies):>13.1f}{total:>16.2f}{handler.sessions:>10}")
+
+        for size in pool_sizes:
+            handler.sessions = handler.delivered = 0
+            with tempfile.TemporaryDirectory() as workdir:
+                sender = MailSender(
+                    queue=MailQueue(os.path.join(workdir, "mail.db")),
+                    pool=SMTPConnectionPool(host="127.0.0.1", port=controller.port, security="plain", size=size),
+                    sender=SENDER,
+                )
+                latencies = []
+                started = time.perf_counter()
+                for i in range(n_emails):
+                    t = time.perf_counter()
+                    await sender.enqueue(f"user{i}@example.com", "Report", "Body")
+                    latencies.append((time.perf_counter() - t) * 1000)
+                await sender.drain()
+                total = time.perf_counter() - started
+                assert handler.delivered == n_emails
+                print(f"{f'queued x{size}':<12}{statistics.median(latencies):>13.1f}{total:>16.2f}{handler.sessions:>10}")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=50)
+    parser.add_argument("--handshake", type=float, default=0.15, help="Seconds to set up an SMTP session")
+    parser.add_argument("--send", type=float, default=0.02, help="Seconds to accept one message")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+    asyncio.run(main(args.emails, args.handshake, args.send, args.pool_sizes))
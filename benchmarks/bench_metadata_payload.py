@@ -0,0 +1,124 @@
+"""
+Measure collection size and query payload for the legacy vs compact chunk metadata.
+
+Builds two persistent in-process ChromaDB collections from the same chunks
+and random embeddings: one with the legacy metadata (chunk text duplicated in
+`metadata["doc"]` plus position fields), one with the compact schema. It
+reports on-disk size and the serialized size of query responses, then runs
+the migration tool on the legacy collection and measures its query payload
+again. On-disk size includes the vectors, so use a small --dim to see the
+metadata share more clearly.
+
+Usage:
+    python benchmarks/bench_metadata_payload.py --docs 500 --dim 1024
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import random
+import shutil
+import tempfile
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import chromadb
+
+from utils.chunking import make_text_splitter, split_document
+from utils.ingest_data import TEST_DOCUMENT, batched
+from utils.migrate_metadata import migrate_collection
+
+
+def directory_size(path: str) -> int:
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, files in os.walk(path)
+        for name in files
+    )
+
+
+def build_chunks(n_docs: int):
+    splitter = make_text_splitter(250, 50)
+    sentences = TEST_DOCUMENT.split(". ")
+    records = []
+    for doc_index in range(n_docs):
+        start = doc_index % len(sentences)
+        text = f"Document {doc_index}. " + ". ".join(sentences[start:] + sentences[:start])
+        _, chunks = split_document(f"docs/doc_{doc_index}.md", text, splitter)
+        for chunk in chunks:
+            legacy = {
+                "source": chunk.metadata["source"],
+                "doc_index": doc_index,
+                "chunk_index": chunk.metadata["chunk_index"],
+                "total_chunks": len(chunks),
+                "doc": chunk.text,
+            }
+            records.append((chunk, legacy))
+    return records
+
+
+def fill(collection, records, vectors, legacy: bool):
+    for batch in batched(range(len(records)), 512):
+        collection.add(
+            ids=[records[i][0].id for i in batch],
+            embeddings=[vectors[i] for i in batch],
+            documents=[records[i][0].text for i in batch],
+            metadatas=[records[i][1] if legacy else records[i][0].metadata for i in batch],
+        )
+
+
+def query_payload(collection, queries, k: int) -> float:
+    """Average serialized bytes of a default query response (documents, metadatas, distances)."""
+    total = 0
+    for vector in queries:
+        result = collection.query(query_embeddings=[vector], n_results=k)
+        total += len(json.dumps({key: result[key] for key in ("ids", "documents", "metadatas", "distances")}))
+    return total / len(queries)
+
+
+def main(n_docs: int, dim: int, k: int, n_queries: int):
+    rng = random.Random(0)
+    records = build_chunks(n_docs)
+    vectors = [[rng.random() for _ in range(dim)] for _ in records]
+    queries = [[rng.random() for _ in range(dim)] for _ in range(n_queries)]
+    print(f"{len(records)} chunks from {n_docs} docs, dim {dim}, top-{k} over {n_queries} queries\n")
+
+    workdir = tempfile.mkdtemp(prefix="bench_metadata_")
+    try:
+        results = {}
+        collections = {}
+        for schema in ("legacy", "compact"):
+            path = os.path.join(workdir, schema)
+            client = chromadb.PersistentClient(path=path, settings=chromadb.config.Settings(anonymized_telemetry=False))
+            collection = client.get_or_create_collection(f"bench_{schema}", metadata={"hnsw:space": "cosine"})
+            fill(collection, records, vectors, legacy=(schema == "legacy"))
+            collections[schema] = collection
+            results[schema] = (directory_size(path), query_payload(collection, queries, k))
+
+        report = migrate_collection(collections["legacy"], state_dir=os.path.join(workdir, "state"))
+        migrated_payload = query_payload(collections["legacy"], queries, k)
+
+        print(f"{'':<22}{'on disk':>12}{'query payload':>16}")
+        for schema, (size, payload) in results.items():
+            print(f"{schema:<22}{size / 1e6:>10.2f}MB{payload:>14.0f} B")
+        print(f"{'legacy, migrated':<22}{'':>12}{migrated_payload:>14.0f} B")
+        print(f"\nMigration: {report['migrated']}/{report['records']} records, "
+              f"ids+documents+metadatas {report['payload_bytes_before'] / 1e6:.2f}MB -> "
+              f"{report['payload_bytes_after'] / 1e6:.2f}MB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+    main(args.docs, args.dim, args.k, args.queries)
@@ -0,0 +1,95 @@
+"""
+Cost of the metrics hooks (utils/metrics.py) on the request path.
+
+Each thread updates the same labelled counter and histogram --updates times:
+- locked:  one threading.Lock around a shared dict (the usual alternative)
+- sharded: the lock-free per-thread shards the API uses
+and one scrape renders the result, to show a scrape stays cheap.
+
+Usage:
+    python benchmarks/bench_metrics.py --updates 200000 --threads 1 4 8
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import bisect
+import threading
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from utils import metrics
+
+LABELS = ("researcher", "search_in_knowledge")
+
+
+class LockedMetrics:
+    """Counter and histogram behind one lock."""
+
+    def __init__(self, buckets=metrics.LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.histogram = {}
+
+    def inc(self, *labels):
+        with self.lock:
+            self.counts[labels] = self.counts.get(labels, 0) + 1
+
+    def observe(self, value, *labels):
+        with self.lock:
+            entry = self.histogram.get(labels)
+            if entry is None:
+                entry = self.histogram[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[bisect.bisect_left(self.buckets, value)] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+
+def run(inc, observe, threads: int, updates: int) -> float:
+    def work():
+        for i in range(updates):
+            inc(*LABELS)
+            observe(0.001 * (i % 100), *LABELS)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def main(updates: int, thread_counts: list[int]):
+    print(f"{updates} counter + histogram updates per thread; ns per update pair\n")
+    print(f"{'threads':>8}{'locked ns':>12}{'sharded ns':>12}{'scrape ms':>11}")
+    for threads in thread_counts:
+        locked = LockedMetrics()
+        locked_s = run(locked.inc, locked.observe, threads, updates)
+
+        registry = metrics.Registry()
+        counter = metrics.Counter("bench_total", "Benchmark counter.", ("agent", "tool"), registry=registry)
+        histogram = metrics.Histogram("bench_seconds", "Benchmark histogram.", ("agent", "tool"), registry=registry)
+        sharded_s = run(counter.inc, histogram.observe, threads, updates)
+        assert counter.value(*LABELS) == threads * updates
+
+        started = time.perf_counter()
+        registry.render()
+        scrape_ms = (time.perf_counter() - started) * 1000
+
+        ops = threads * updates
+        print(f"{threads:>8}{locked_s / ops * 1e9:>12.0f}{sharded_s / ops * 1e9:>12.0f}{scrape_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=200000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+    main(args.updates, args.threads)
@@ -0,0 +1,136 @@
+"""
+Compare the supervisor's one-worker-at-a-time delegation with planning mode
+on compound requests (benchmarks/fixtures/compound_requests.json).
+
+The real supervisor graph from utils/nodes.py runs with a scripted chat model
+in place of the LLM: every call sleeps --latency seconds and then answers from
+the fixture.
+- supervisor: hands off to each fixture task's agent in turn, then answers
+- planner: returns the fixture's task graph
+- worker: answers its task at once (one LLM call, no tools)
+The router and history stages are off, so only delegation is measured.
+
+- supervisor: PLANNER_MODE=off, the graph as before
+- planner:    plan, run independent tasks concurrently, join
+
+Usage:
+    python benchmarks/bench_planner.py --latency 0.3
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+import uuid
+from collections import Counter
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+# Measure delegation only: no fast-path router (it embeds), no history compaction
+os.environ["ROUTER_ENABLED"] = "false"
+os.environ["HISTORY_MODE"] = "off"
+os.environ["PLANNER_MODE"] = "multi_intent"
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langgraph.checkpoint.memory import InMemorySaver
+
+from utils import util
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "compound_requests.json")
+
+
+class ScriptedLLM(BaseChatModel):
+    """Chat model with a fixed latency that plays each role from the fixture."""
+
+    latency: float
+    plans: dict
+    calls: Counter = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("the graph runs on the async path")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        system = next((m.content for m in messages if isinstance(m, SystemMessage)), "")
+        request = next(m.content for m in reversed(messages) if isinstance(m, HumanMessage))
+        if system.startswith("You are a planner"):
+            role, message = "planner", AIMessage(content=json.dumps({"tasks": self.plans[request]}))
+        elif system.startswith("You are the supervisor of a team"):
+            role, message = "join", AIMessage(content="Here is everything you asked for.")
+        elif system.startswith("You are a supervisor"):
+            role, message = "supervisor", self.supervise(messages, request)
+        else:
+            role, message = "worker", AIMessage(content=f"Done: {request[:60]}")
+        self.calls[role] += 1
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def supervise(self, messages, request) -> AIMessage:
+        """Hand off to the next fixture task's agent, or answer once every task was handed off."""
+        turn = messages[max(i for i, m in enumerate(messages) if isinstance(m, HumanMessage)):]
+        handed_off = sum(1 for m in turn if isinstance(m, ToolMessage) and m.name.startswith("transfer_to_"))
+        tasks = self.plans[request]
+        if handed_off < len(tasks):
+            name = f"transfer_to_{tasks[handed_off]['agent']}"
+            return AIMessage(content="", tool_calls=[{"name": name, "args": {}, "id": f"call_{uuid.uuid4().hex[:8]}"}])
+        return AIMessage(content="Here is everything you asked for.")
+
+
+async def run_mode(graph, requests, planning: bool, fake: ScriptedLLM, planner):
+    planner.mode = "multi_intent" if planning else "off"
+    fake.calls = Counter()
+    latencies = []
+    for request in requests:
+        config = {"configurable": {"thread_id": f"bench-{uuid.uuid4().hex}"}}
+        started = time.perf_counter()
+        result = await graph.ainvoke({"messages": [HumanMessage(content=request["message"])]}, config)
+        latencies.append(time.perf_counter() - started)
+        assert result["messages"][-1].content == "Here is everything you asked for."
+    return latencies, dict(fake.calls)
+
+
+async def main(latency: float):
+    util.logger.setLevel(logging.WARNING)
+    with open(FIXTURE) as f:
+        requests = json.load(f)["requests"]
+    fake = ScriptedLLM(latency=latency, plans={r["message"]: r["tasks"] for r in requests}, calls=Counter())
+    # Every module that calls the LLM must see the scripted model, so patch it before they are imported
+    util.llm = fake
+    from utils.nodes import supervisor_workflow
+    from utils.planner import planner
+
+    graph = supervisor_workflow.compile(checkpointer=InMemorySaver())
+    n_tasks = sum(len(r["tasks"]) for r in requests)
+    print(f"{len(requests)} compound requests, {n_tasks} tasks, {latency * 1000:.0f} ms per LLM call\n")
+    print(f"{'mode':<12}{'p50 s':>8}{'mean s':>8}{'total s':>9}  LLM calls")
+
+    for mode, planning in (("supervisor", False), ("planner", True)):
+        latencies, calls = await run_mode(graph, requests, planning, fake, planner)
+        detail = ", ".join(f"{role} {count}" for role, count in sorted(calls.items()))
+        print(
+            f"{mode:<12}{statistics.median(latencies):>8.2f}{statistics.mean(latencies):>8.2f}"
+            f"{sum(latencies):>9.2f}  {sum(calls.values())} ({detail})"
+        )
+    print(f"\nplanner stats: {planner.snapshot()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per LLM call")
+    args = parser.parse_args()
+    asyncio.run(main(args.latency))
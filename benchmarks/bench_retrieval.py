@@ -0,0 +1,147 @@
+"""
+Offline recall@k and latency benchmark for knowledge-base retrieval.
+
+Ingests the fixture corpus (benchmarks/fixtures/retrieval_corpus.json) into an
+in-process ChromaDB collection and a temporary BM25 index, then answers every
+fixture query with:
+
+- top1:   the old behaviour, a single nearest chunk
+- vector: top-k vector search only
+- bm25:   top-k BM25 only
+- hybrid: vector + BM25 fused with reciprocal-rank fusion
+
+A query counts as recalled at k when any of the first k chunks comes from its
+relevant document. Embeddings come from a local hashed character-trigram
+model, so the run needs no API key; absolute recall depends on the real
+embedding model, the comparison between modes is what matters.
+
+Usage:
+    python benchmarks/bench_retrieval.py --k 5
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import io
+import json
+import shutil
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import chromadb
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.ingest_data import run_ingestion
+from utils.lexical_index import LexicalIndex
+from utils.retrieval import HybridRetriever
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "retrieval_corpus.json")
+COLLECTION = "bench_retrieval"
+
+
+class TrigramEmbeddings(Embeddings):
+    """Hashed character-trigram vectors: a deterministic, offline stand-in embedding model."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        padded = f"  {text.lower()}  "
+        for i in range(len(padded) - 2):
+            bucket = int.from_bytes(hashlib.md5(padded[i:i + 3].encode()).digest()[:4], "little")
+            vector[bucket % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+def recall_at(sources: list[str], relevant: str, k: int) -> bool:
+    return relevant in sources[:k]
+
+
+async def evaluate(fixture, k: int, dim: int):
+    workdir = tempfile.mkdtemp(prefix="bench_retrieval_")
+    lexical_path = os.path.join(workdir, "lexical.db")
+    embedder = TrigramEmbeddings(dim)
+    client = chromadb.EphemeralClient(settings=chromadb.config.Settings(anonymized_telemetry=False))
+    collection = client.get_or_create_collection(COLLECTION, metadata={"hnsw:space": "cosine"})
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_ingestion(
+                ((doc["source"], doc["text"]) for doc in fixture["documents"]),
+                collection_name=COLLECTION,
+                embedder=embedder,
+                collection=collection,
+                state_dir=workdir,
+                lexical_index_path=lexical_path,
+            )
+        stored = collection.get(include=["metadatas"])
+        source_of = {chunk_id: metadata["source"] for chunk_id, metadata in zip(stored["ids"], stored["metadatas"])}
+        print(f"{len(fixture['documents'])} documents, {len(source_of)} chunks, {len(fixture['queries'])} queries\n")
+
+        lexical = LexicalIndex(COLLECTION, lexical_path)
+        retrievers = {
+            "vector": HybridRetriever(top_k=k, hybrid=False, embedder=embedder, lexical_index_path=lexical_path),
+            "hybrid": HybridRetriever(top_k=k, hybrid=True, embedder=embedder, lexical_index_path=lexical_path),
+        }
+
+        async def top1(query):
+            result = collection.query(query_embeddings=[embedder.embed_query(query)], n_results=1)
+            return result["ids"][0]
+
+        async def bm25(query):
+            return [chunk_id for chunk_id, _ in lexical.search(query, k)]
+
+        def via(retriever):
+            async def run(query):
+                return [chunk.id for chunk in await retriever.aretrieve(query, collection, COLLECTION)]
+            return run
+
+        modes = {"top1": top1, "vector": via(retrievers["vector"]), "bm25": bm25, "hybrid": via(retrievers["hybrid"])}
+        cutoffs = sorted({1, 3, k})
+        print(f"{'mode':<8}" + "".join(f"{'R@' + str(c):>8}" for c in cutoffs) + f"{'p50 ms':>10}{'p95 ms':>10}")
+        for mode, search in modes.items():
+            hits = {c: 0 for c in cutoffs}
+            latencies = []
+            for item in fixture["queries"]:
+                started = time.perf_counter()
+                ids = await search(item["query"])
+                latencies.append((time.perf_counter() - started) * 1000)
+                sources = [source_of[chunk_id] for chunk_id in ids]
+                for c in cutoffs:
+                    hits[c] += recall_at(sources, item["source"], c)
+            latencies.sort()
+            n = len(fixture["queries"])
+            print(f"{mode:<8}" + "".join(f"{hits[c] / n:>8.2f}" for c in cutoffs)
+                  + f"{statistics.median(latencies):>10.2f}{latencies[int(0.95 * (n - 1))]:>10.2f}")
+        lexical.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=256, help="Stand-in embedding dimension")
+    parser.add_argument("--fixture", default=FIXTURE)
+    args = parser.parse_args()
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+    asyncio.run(evaluate(fixture, args.k, args.dim))
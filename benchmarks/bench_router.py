@@ -0,0 +1,92 @@
+"""
+Routing accuracy and supervisor LLM calls saved by the fast-path router.
+
+Classifies every message of benchmarks/fixtures/routing_queries.json with the
+router (keyword rules + nearest centroid) and compares the destination with
+the labeled agent. Messages labeled "supervisor" (multi-step, vague or
+follow-up requests) are expected to fall back.
+
+- routed:    share of requests sent straight to a worker
+- precision: share of routed requests that reached the labeled worker
+- fallback:  share of "supervisor" messages that did fall back
+- saved:     supervisor LLM calls saved per request (2 per routed request:
+             the routing call and the relay of the answer)
+
+Embeddings come from the offline hashed-trigram stand-in of
+bench_retrieval.py unless --jina is given; similarity scales differ between
+models, so the centroid threshold is swept.
+
+Usage:
+    python benchmarks/bench_router.py --thresholds 0.5 0.6 0.7 0.8
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+from bench_retrieval import TrigramEmbeddings
+from utils.router import FastRouter, SUPERVISOR, SUPERVISOR_CALLS_PER_TURN
+from utils.util import embeddings, logger
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "routing_queries.json")
+
+
+async def evaluate(router: FastRouter, queries: list[dict], verbose: bool):
+    routed = correct = fallback_expected = fallback_ok = 0
+    latencies = []
+    for item in queries:
+        started = time.perf_counter()
+        destination, reason = await router.classify(item["query"])
+        latencies.append((time.perf_counter() - started) * 1000)
+        if item["agent"] == SUPERVISOR:
+            fallback_expected += 1
+            fallback_ok += destination == SUPERVISOR
+        if destination != SUPERVISOR:
+            routed += 1
+            correct += destination == item["agent"]
+        if verbose and destination != item["agent"]:
+            print(f"    {item['query']!r}: expected {item['agent']}, got {destination} ({reason})")
+    n = len(queries)
+    latencies.sort()
+    return {
+        "routed": routed / n,
+        "precision": correct / routed if routed else float("nan"),
+        "fallback": fallback_ok / fallback_expected if fallback_expected else float("nan"),
+        "saved": SUPERVISOR_CALLS_PER_TURN * routed / n,
+        "p50_ms": latencies[n // 2],
+    }
+
+
+async def main(queries, thresholds, margin, use_jina, verbose):
+    logger.setLevel(logging.WARNING)
+    embedder = embeddings if use_jina else TrigramEmbeddings()
+    print(f"{len(queries)} labeled messages, {'Jina' if use_jina else 'trigram stand-in'} embeddings\n")
+    print(f"{'threshold':<11}{'routed':>8}{'precision':>11}{'fallback':>10}{'saved/req':>11}{'p50 ms':>9}")
+    for threshold in thresholds:
+        router = FastRouter(threshold=threshold, margin=margin, embedder=embedder)
+        result = await evaluate(router, queries, verbose)
+        print(f"{threshold:<11.2f}{result['routed']:>8.2f}{result['precision']:>11.2f}"
+              f"{result['fallback']:>10.2f}{result['saved']:>11.2f}{result['p50_ms']:>9.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.4, 0.5, 0.6, 0.7, 0.8])
+    parser.add_argument("--margin", type=float, default=0.05)
+    parser.add_argument("--jina", action="store_true", help="Use the configured Jina embeddings (needs an API key)")
+    parser.add_argument("--verbose", action="store_true", help="Print every wrong destination")
+    parser.add_argument("--fixture", default=FIXTURE)
+    args = parser.parse_args()
+    with open(args.fixture) as f:
+        fixture = json.load(f)
+    asyncio.run(main(fixture["queries"], args.thresholds, args.margin, args.jina, args.verbose))
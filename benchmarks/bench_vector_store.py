@@ -0,0 +1,160 @@
+"""
+Compare query latency (p50/p99) across vector-store backends.
+
+Every backend gets the same clustered unit vectors (embeddings of real text
+cluster by topic; uniform random vectors are a worst case for approximate
+indexes) with short documents and compact metadata, then answers the same
+top-k queries near stored vectors, including documents and metadatas, which
+is what the retrieval tool does:
+
+- http:       ChromaDB server over HTTP (a local `chroma run` subprocess is
+              started unless --chroma-url points at a running server)
+- chroma:     in-process persistent ChromaDB
+- numpy-flat: memory-mapped vectors, exact scan
+- numpy-hnsw: memory-mapped vectors, HNSW graph built at load
+
+Load time is the time to open a fresh client and answer the first query.
+Recall is measured against numpy-flat, which is exact.
+
+Usage:
+    python benchmarks/bench_vector_store.py --vectors 20000 --dim 1024 --queries 300
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from urllib.parse import urlparse
+
+os.environ.setdefault("LLM_API_KEY", "benchmark")
+os.environ.setdefault("LLM_MODEL_NAME", "benchmark")
+os.environ.setdefault("JINA_EMBEDDING_API_KEY", "benchmark")
+
+import chromadb
+import numpy as np
+
+from utils.ingest_data import batched
+from utils.vector_store import LocalVectorClient
+
+COLLECTION = "bench_vectors"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_chroma_server(path: str):
+    port = free_port()
+    process = subprocess.Popen(
+        ["chroma", "run", "--path", path, "--port", str(port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(120):
+        try:
+            chromadb.HttpClient(host="127.0.0.1", port=port).heartbeat()
+            return process, port
+        except Exception:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError("ChromaDB server did not start")
+
+
+def make_client(backend: str, workdir: str, server: tuple[str, int] | None):
+    settings = chromadb.config.Settings(anonymized_telemetry=False)
+    if backend == "http":
+        return chromadb.HttpClient(host=server[0], port=server[1], settings=settings)
+    if backend == "chroma":
+        return chromadb.PersistentClient(path=os.path.join(workdir, "chroma"), settings=settings)
+    return LocalVectorClient(os.path.join(workdir, "numpy"), index_type=backend.split("-")[1])
+
+
+def fill(collection, vectors):
+    for rows in batched(range(len(vectors)), 1000):
+        collection.add(
+            ids=[f"chunk-{i}" for i in rows],
+            embeddings=vectors[rows[0]:rows[-1] + 1].tolist(),
+            documents=[f"Chunk {i} of the synthetic corpus with some text to return." for i in rows],
+            metadatas=[{"source": f"doc_{i // 10}.md", "doc_id": f"{i // 10:032x}", "chunk_index": i % 10} for i in rows],
+        )
+
+
+def main(n_vectors, dim, n_queries, k, backends, chroma_url):
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((max(1, n_vectors // 100), dim)).astype(np.float32)
+    vectors = centers[rng.integers(len(centers), size=n_vectors)]
+    vectors += 0.5 * rng.standard_normal((n_vectors, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = vectors[rng.integers(n_vectors, size=n_queries)]
+    queries = queries + 0.02 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    workdir = tempfile.mkdtemp(prefix="bench_vector_store_")
+    process = None
+    server = None
+    try:
+        if "http" in backends:
+            if chroma_url:
+                url = urlparse(chroma_url)
+                server = (url.hostname, url.port or 8000)
+            else:
+                process, port = start_chroma_server(os.path.join(workdir, "server"))
+                server = ("127.0.0.1", port)
+
+        print(f"{n_vectors} vectors, dim {dim}, {n_queries} queries, top-{k}\n")
+        print(f"{'backend':<12}{'load ms':>10}{'p50 ms':>10}{'p99 ms':>10}{'recall':>9}")
+        exact = None
+        filled = set()
+        for backend in backends:
+            store = "numpy" if backend.startswith("numpy") else backend
+            if store not in filled:
+                collection = make_client(backend, workdir, server).get_or_create_collection(
+                    COLLECTION, metadata={"hnsw:space": "cosine"}
+                )
+                fill(collection, vectors)
+                filled.add(store)
+
+            started = time.perf_counter()
+            collection = make_client(backend, workdir, server).get_or_create_collection(
+                COLLECTION, metadata={"hnsw:space": "cosine"}
+            )
+            collection.query(query_embeddings=[queries[0].tolist()], n_results=k)
+            load_ms = (time.perf_counter() - started) * 1000
+
+            latencies = []
+            results = []
+            for query in queries:
+                started = time.perf_counter()
+                result = collection.query(query_embeddings=[query.tolist()], n_results=k)
+                latencies.append((time.perf_counter() - started) * 1000)
+                results.append(set(result["ids"][0]))
+            if backend == "numpy-flat":
+                exact = results
+            recall = (
+                np.mean([len(r & e) / k for r, e in zip(results, exact)]) if exact is not None else float("nan")
+            )
+            print(f"{backend:<12}{load_ms:>10.1f}{np.percentile(latencies, 50):>10.2f}"
+                  f"{np.percentile(latencies, 99):>10.2f}{recall:>9.3f}")
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", default=["numpy-flat", "numpy-hnsw", "chroma", "http"])
+    parser.add_argument("--chroma-url", help="Use a running ChromaDB server, e.g. http://localhost:8000")
+    args = parser.parse_args()
+    main(args.vectors, args.dim, args.queries, args.k, args.backends, args.chroma_url)
@@ -5,8 +5,9 @@ Simple Streamlit Chat UI for Mail Sender Agent
 import streamlit as st
 import requests
 import os
+import json
 import uuid
-from typing import Optional
+from typing import Iterator, Optional, Tuple
 
 
 # Basic page config
@@ -40,6 +41,78 @@ class SimpleChat:
                 return f"Error: {response.status_code}"
         except requests.exceptions.RequestException as e:
             return f"Connection error: {str(e)}"
+
+    def stream_message(self, message: str) -> Iterator[Tuple[str, dict]]:
+        """Send message to the streaming endpoint and yield (event, data) pairs as they arrive."""
+        payload = {"message": message, "thread_id": self.thread_id}
+        try:
+            with requests.post(f"{self.api_url}/query/stream", json=payload, stream=True) as response:
+                if response.status_code != 200:
+                    yield "error", {"detail": f"Error: {response.status_code}"}
+                    return
+
+                event, data_lines = "message", []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data_lines.append(line[len("data:"):].strip())
+                        continue
+                    # A blank line terminates one event
+                    if data_lines:
+                        yield event, json.loads("\n".join(data_lines))
+                    event, data_lines = "message", []
+        except requests.exceptions.RequestException as e:
+            yield "error", {"detail": f"Connection error: {str(e)}"}
+
+    def render_stream(self, message: str) -> str:
+        """Render streamed agent events incrementally and return the final answer."""
+        status = st.status("🤔 Thinking...", expanded=False)
+        placeholder = st.empty()
+        answer = ""
+        failed = False
+        # Agent whose tokens are the answer: the supervisor, unless the turn is routed elsewhere
+        answering = "supervisor"
+
+        for event, data in self.stream_message(message):
+            if event == "token" and data.get("agent") == answering:
+                answer += data["content"]
+                placeholder.markdown(answer + "▌")
+            elif event == "route":
+                answering = data["to"]
+                answer = ""
+                placeholder.empty()
+                status.update(label=f"🔀 {data['to']} is working...")
+            elif event == "handoff":
+                if answering == "supervisor":
+                    # Text before a handoff is routing chatter, not the answer
+                    answer = ""
+                    placeholder.empty()
+                    status.update(label=f"🔀 {data['to']} is working...")
+                status.write(f"🔀 {data['from']} → {data['to']}")
+            elif event == "node" and "status" in data:
+                status.write(f"🗺️ {data['agent']}: {data['node']} {data['status']}")
+            elif event == "tool_call":
+                if data["agent"] == answering:
+                    # Text before a tool call is not the answer either
+                    answer = ""
+                    placeholder.empty()
+                status.write(f"🔧 {data['agent']} called `{data['tool']}`")
+            elif event == "final":
+                answer = data["response"]
+            elif event == "error":
+                answer = data["detail"]
+                failed = True
+
+        if not answer:
+            answer = "No response generated"
+        placeholder.markdown(answer)
+        if failed:
+            status.update(label="❌ Failed", state="error")
+        else:
+            status.update(label="✅ Done", state="complete")
+        return answer
     
     def run(self):
     
@@ -64,9 +137,7 @@ class SimpleChat:
                 st.write(prompt)
             # Get and display assistant response
             with st.chat_message("assistant"):
-                with st.spinner("🤔 Thinking..."):
-                    response = self.send_message(prompt)
-                st.write(response)
+                response = self.render_stream(prompt)
                 st.session_state.messages.append({"role": "assistant", "content": response})
 
 if __name__ == "__main__":
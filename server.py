@@ -1,11 +1,67 @@
 """FastAPI server for the LangChain agent."""
 
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 from pydantic import BaseModel
-from utils.nodes import agent_executor as graph
-from utils.util import logger
+from utils.nodes import open_agent_executor, WORKERS
+from utils.history import HISTORY_NODE, history_manager
+from utils.router import router, ROUTER_NODE
+from utils.planner import planner, PLANNER_NODE, PLANNER_STEP_METADATA_KEY
+from utils.semantic_cache import response_cache, context_key
+from utils.retention import retention_loop, CHECKPOINT_RETENTION_INTERVAL_SECONDS
+from utils.mail_queue import mail_sender
+from utils.jira_client import jira_metadata
+from utils.completion_cache import completion_cache
+from utils import tracing, metrics
+from utils.util import logger, chroma_collections, embeddings, llm_gateway, DEFAULT_COLLECTION
+from utils.vector_store import VECTOR_STORE_BACKEND
 
-app = FastAPI(title="Agent API", version="2.0.0")
+# Compiled supervisor graph, bound to the async checkpointer on startup
+graph = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load a local vector store, open the checkpointer, compile the graph and start the background tasks."""
+    global graph
+    if VECTOR_STORE_BACKEND != "http":
+        # Load (memory-map / index) the local vector store before the first query
+        await asyncio.to_thread(chroma_collections.get, DEFAULT_COLLECTION)
+    async with open_agent_executor() as executor:
+        graph = executor
+        retention_task = None
+        if CHECKPOINT_RETENTION_INTERVAL_SECONDS > 0:
+            retention_task = asyncio.create_task(retention_loop())
+        mail_task = asyncio.create_task(mail_sender.run())
+        try:
+            yield
+        finally:
+            if retention_task is not None:
+                retention_task.cancel()
+            mail_task.cancel()
+            await asyncio.gather(mail_task, return_exceptions=True)
+            tracing.shutdown()
+    graph = None
+
+
+app = FastAPI(title="Agent API", version="2.0.0", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Agent, tool and LLM metrics for every graph run
+graph_metrics = metrics.GraphMetricsHandler(agents=["supervisor", *(agent.name for agent in WORKERS)])
+metrics.register_embedding_metrics(embeddings)
+metrics.register_response_cache_metrics(response_cache)
+metrics.register_history_metrics(history_manager)
+
+
+def graph_callbacks(trace_callbacks):
+    """Callbacks to run the graph with: the request's tracing handler and the metrics handler."""
+    return [*trace_callbacks, graph_metrics] if metrics.METRICS_ENABLED else list(trace_callbacks)
 
 class QueryRequest(BaseModel):
     message: str
@@ -22,6 +78,17 @@ def log_chunk(chunk):
         return
     
     for node_name, node_data in chunk.items():
+        if node_name == HISTORY_NODE:
+            if node_data:
+                logger.info(f"\n🗜️  {node_name.upper()}: conversation history compacted")
+                logger.info("-" * 80)
+            continue
+        if node_name == ROUTER_NODE:
+            # The router only picks the next node; its decision is logged by the router
+            continue
+        if node_name == PLANNER_NODE and not node_data:
+            # Not a compound request: the planner passed the turn on
+            continue
         logger.info(f"\n🔄 {node_name.upper()}")
         
         for msg in node_data.get('messages', []):
@@ -40,13 +107,20 @@ def log_chunk(chunk):
         logger.info("-" * 80)
 
 
+# Shown when a run ends without an answer; never cached
+NO_RESPONSE = "No response generated"
+
+
 def extract_final_response(stream_results):
-    """Extract final AI response from stream."""
+    """Extract final AI response from stream; None when the run produced no answer."""
     for chunk in reversed(stream_results):
         if not isinstance(chunk, dict):
             continue
         
         for node_name, node_data in chunk.items():
+            # The history stage re-emits earlier turns, never a new answer
+            if node_name == HISTORY_NODE:
+                continue
             messages = node_data.get('messages', []) if isinstance(node_data, dict) else []
             
             for msg in reversed(messages):
@@ -56,28 +130,194 @@ def extract_final_response(stream_results):
                     logger.info(f"📤 Final: {msg.content[:150]}...")
                     return msg.content
     
-    return "No response generated"
+    return None
+
+
+def visited_agents(stream_results):
+    """Names of the top-level graph nodes a run went through, and of the workers the planner ran."""
+    visited = set()
+    for chunk in stream_results:
+        if not isinstance(chunk, dict):
+            continue
+        for node_name, node_data in chunk.items():
+            visited.add(node_name)
+            if node_name == PLANNER_NODE and isinstance(node_data, dict):
+                visited |= {msg.name for msg in node_data.get('messages', []) if getattr(msg, 'name', None)}
+    return visited
+
 
+async def thread_context(thread_id):
+    """Response-cache scope of the thread: a hash of the messages already in it."""
+    state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+    return context_key(state.values.get("messages", []) if state.values else [])
 
-def process_query(message, thread_id):
+
+async def record_cached_turn(message, response, config):
+    """Append a cache-served turn to the thread so its history stays complete."""
+    await graph.aupdate_state(
+        config,
+        {"messages": [HumanMessage(content=message), AIMessage(content=response, name="supervisor")]},
+        as_node="supervisor",
+    )
+
+
+async def process_query(message, thread_id):
     """Process agent query and return response."""
+    with tracing.request_trace("POST /query", thread_id) as callbacks:
+        return await _process_query(message, thread_id, callbacks)
+
+
+async def _process_query(message, thread_id, callbacks):
     inputs = {"messages": [{"role": "user", "content": message}]}
-    config = {"configurable": {"thread_id": thread_id}}
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": graph_callbacks(callbacks)}
     
     logger.info("=" * 80)
     logger.info(f"📨 Thread: {thread_id} | Query: {message}")
+
+    context = await thread_context(thread_id)
+    cached, query_vector = await response_cache.lookup(message, context)
+    tracing.annotate(**{"response_cache.hit": cached is not None})
+    if cached is not None:
+        await record_cached_turn(message, cached.response, config)
+        logger.info("=" * 80 + "\n")
+        return cached.response
+
     logger.info("🚀 Executing...")
     logger.info("-" * 80)
     
+    started = time.perf_counter()
     stream_results = []
-    for chunk in graph.stream(inputs, config=config, stream_mode="updates"):
+    async for chunk in graph.astream(inputs, config=config, stream_mode="updates"):
         stream_results.append(chunk)
         log_chunk(chunk)
     
     logger.info(f"\n✅ Complete. Chunks: {len(stream_results)}")
     logger.info("=" * 80 + "\n")
     
-    return extract_final_response(stream_results)
+    response = extract_final_response(stream_results)
+    response_cache.store(
+        message, query_vector, response, visited_agents(stream_results), time.perf_counter() - started, context
+    )
+    return response or NO_RESPONSE
+
+
+def format_sse(event, data):
+    """Format one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _agent_name(namespace, node_name):
+    """Resolve which agent produced a chunk from its subgraph namespace."""
+    if namespace:
+        return namespace[0].split(":")[0]
+    return node_name
+
+
+async def stream_query_events(message, thread_id):
+    """
+    Run the agent and yield (event, data) pairs as they are produced.
+
+    Events:
+        token: LLM output token from an agent
+        route: the turn was sent straight to an agent (or planned), whose tokens are the answer
+        node: a graph node finished a step, or a planned task started or finished (with a status)
+        handoff: control moved between the supervisor and a worker agent
+        tool_call: an agent invoked a tool
+        tool_result: a tool returned
+        final: the final answer for the user
+    """
+    with tracing.request_trace("POST /query/stream", thread_id) as callbacks:
+        async for event in _stream_query_events(message, thread_id, callbacks):
+            yield event
+
+
+async def _stream_query_events(message, thread_id, callbacks):
+    inputs = {"messages": [{"role": "user", "content": message}]}
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": graph_callbacks(callbacks)}
+
+    logger.info("=" * 80)
+    logger.info(f"📨 Thread: {thread_id} | Query: {message} | Streaming")
+
+    context = await thread_context(thread_id)
+    cached, query_vector = await response_cache.lookup(message, context)
+    tracing.annotate(**{"response_cache.hit": cached is not None})
+    if cached is not None:
+        await record_cached_turn(message, cached.response, config)
+        yield "final", {"response": cached.response, "thread_id": thread_id, "cached": True}
+        return
+
+    logger.info("-" * 80)
+
+    started = time.perf_counter()
+    stream_results = []
+    seen_tool_calls = set()
+    seen_tool_results = set()
+    handoff_call_ids = set()
+
+    async for namespace, mode, data in graph.astream(
+        inputs, config=config, stream_mode=["updates", "messages", "custom"], subgraphs=True
+    ):
+        if mode == "custom":
+            if isinstance(data, dict) and data.get("event") == "route":
+                yield "route", {"to": data["to"], "reason": data["reason"]}
+            elif isinstance(data, dict) and data.get("event") == "task":
+                yield "node", {"agent": data["agent"], "node": f"task {data['id']}", "status": data["status"]}
+            continue
+
+        if mode == "messages":
+            msg, metadata = data
+            # Only stream genuine LLM tokens, not whole messages written to state
+            if isinstance(msg, AIMessageChunk) and isinstance(msg.content, str) and msg.content:
+                agent = _agent_name(namespace, metadata.get("langgraph_node"))
+                # Planned tasks run concurrently and the plan is JSON; only the join answers the user
+                if agent == PLANNER_NODE and metadata.get(PLANNER_STEP_METADATA_KEY) != "join":
+                    continue
+                yield "token", {"agent": agent, "content": msg.content}
+            continue
+
+        if not namespace:
+            stream_results.append(data)
+            log_chunk(data)
+
+        for node_name, node_data in data.items():
+            agent = _agent_name(namespace, node_name)
+            yield "node", {"agent": agent, "node": node_name}
+
+            messages = node_data.get('messages', []) if isinstance(node_data, dict) else []
+            for msg in messages:
+                for tool_call in getattr(msg, 'tool_calls', None) or []:
+                    if tool_call['id'] in seen_tool_calls:
+                        continue
+                    seen_tool_calls.add(tool_call['id'])
+
+                    name = tool_call['name']
+                    if name.startswith("transfer_to_"):
+                        handoff_call_ids.add(tool_call['id'])
+                        yield "handoff", {"from": agent, "to": name[len("transfer_to_"):]}
+                    elif name.startswith("transfer_back_to_"):
+                        handoff_call_ids.add(tool_call['id'])
+                        yield "handoff", {"from": agent, "to": name[len("transfer_back_to_"):]}
+                    else:
+                        yield "tool_call", {"agent": agent, "tool": name, "args": tool_call['args']}
+
+                tool_call_id = getattr(msg, 'tool_call_id', None)
+                if tool_call_id and tool_call_id not in seen_tool_results:
+                    seen_tool_results.add(tool_call_id)
+                    if tool_call_id not in handoff_call_ids:
+                        yield "tool_result", {
+                            "agent": agent,
+                            "tool": getattr(msg, 'name', None),
+                            "content": str(msg.content)[:500],
+                        }
+
+    logger.info(f"\n✅ Complete. Chunks: {len(stream_results)}")
+    logger.info("=" * 80 + "\n")
+
+    response = extract_final_response(stream_results)
+    response_cache.store(
+        message, query_vector, response, visited_agents(stream_results), time.perf_counter() - started, context
+    )
+    yield "final", {"response": response or NO_RESPONSE, "thread_id": thread_id, "cached": False}
 
 
 @app.get("/")
@@ -90,15 +330,91 @@ async def root():
 async def query_agent(request: QueryRequest) -> QueryResponse:
     """Query the agent with a message."""
     try:
-        response = process_query(request.message, request.thread_id)
+        response = await process_query(request.message, request.thread_id)
         return QueryResponse(response=response, thread_id=request.thread_id)
     except Exception as e:
         logger.error(f"❌ Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/query/stream")
+async def query_agent_stream(request: QueryRequest) -> StreamingResponse:
+    """Query the agent and stream its progress as Server-Sent Events."""
+
+    async def event_source():
+        try:
+            async for event, data in stream_query_events(request.message, request.thread_id):
+                yield format_sse(event, data)
+        except Exception as e:
+            logger.error(f"❌ Error: {e}")
+            yield format_sse("error", {"detail": str(e)})
+        yield format_sse("done", {})
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics in the text exposition format."""
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/debug/trace/{thread_id}")
+async def debug_trace(thread_id: str, limit: int = 1, format: str = "json"):
+    """Span waterfall of the thread's most recent requests (newest first); `format=text` renders bars."""
+    traces = tracing.recent_waterfalls(thread_id, max(1, limit))
+    if not traces:
+        raise HTTPException(status_code=404, detail=f"No recent trace for thread '{thread_id}'")
+    if format == "text":
+        return PlainTextResponse("\n\n".join(tracing.render_waterfall(t) for t in traces) + "\n")
+    return {"thread_id": thread_id, "traces": traces}
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Response cache hit rate and latency saved."""
+    return {
+        "semantic": response_cache.snapshot(),
+        "llm": completion_cache.snapshot() if completion_cache is not None else {"enabled": False},
+        "jira": jira_metadata.snapshot(),
+    }
+
+
+@app.delete("/cache/llm")
+async def clear_llm_cache():
+    """Drop every cached LLM completion, in memory and on disk."""
+    if completion_cache is None:
+        raise HTTPException(status_code=404, detail="LLM completion cache is disabled")
+    await asyncio.to_thread(completion_cache.clear)
+    return {"cleared": True}
+
+
+@app.delete("/cache/jira")
+async def invalidate_jira_cache(kind: str | None = None, project: str | None = None):
+    """Drop cached Jira metadata: everything, one kind (projects, issue_types, fields) or one project's entries."""
+    try:
+        dropped = jira_metadata.invalidate(kind, project)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"dropped": dropped}
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy", "service": "Agent"}
+    return {
+        "status": "healthy",
+        "service": "Agent",
+        "vector_store": chroma_collections.snapshot(),
+        "llm": llm_gateway.snapshot(),
+        "router": router.snapshot(),
+        "planner": planner.snapshot(),
+        "history": history_manager.snapshot(),
+        "mail": mail_sender.snapshot(),
+        "tracing": tracing.snapshot(),
+    }
 
@@ -0,0 +1,69 @@
+"""
+Shared test setup: environment defaults and a scripted chat model.
+
+pytest loads this before collecting the tests; the test files also import it
+themselves (`from test.conftest import ...`) so they keep running as scripts.
+For that, each puts the repository root first on sys.path: appended, `test`
+would resolve to the standard library's regression-test package instead.
+"""
+
+import os
+import asyncio
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+# utils.util reads these at import time; no test talks to the real services
+ENV_DEFAULTS = {
+    "LLM_API_KEY": "test",
+    "LLM_MODEL_NAME": "test",
+    "JINA_EMBEDDING_API_KEY": "test",
+}
+
+
+def set_env_defaults():
+    """Fill in the variables utils needs, keeping any the environment already sets."""
+    for name, value in ENV_DEFAULTS.items():
+        os.environ.setdefault(name, value)
+
+
+set_env_defaults()
+
+
+class ScriptedModel(BaseChatModel):
+    """
+    Calls `tool_name` once with `tool_args`, then answers.
+
+    The answer is `answer` with `{result}` replaced by the last tool result.
+    Every call sleeps `latency` seconds and reports `usage` as its token usage.
+    """
+
+    tool_name: str
+    tool_args: dict[str, Any] = {}
+    answer: str = "{result}"
+    usage: dict[str, int] | None = None
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise NotImplementedError("the graph runs on the async path")
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = [m for m in messages if isinstance(m, ToolMessage)]
+        if results:
+            message = AIMessage(content=self.answer.format(result=results[-1].content), usage_metadata=self.usage)
+        else:
+            call = {"name": self.tool_name, "args": self.tool_args, "id": f"call_{uuid.uuid4().hex[:8]}"}
+            message = AIMessage(content="", tool_calls=[call], usage_metadata=self.usage)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,183 @@
+"""
+Fuzz tests for the safe calculator engine (utils/calculator.py).
+
+Runs without external services:
+
+    python test/test_calculator.py --cases 5000
+    python -m pytest test/test_calculator.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from utils.calculator import CalculatorError, evaluate, evaluate_batch
+
+CASES = 2000
+SEED = 1234
+# Every expression, hostile or not, must finish well inside this
+MAX_SECONDS = 0.5
+
+FUNCTIONS = ["abs", "sqrt", "exp", "log", "log10", "sin", "cos", "atan", "floor", "ceil", "round"]
+BOMBS = [
+    "9**9**9",
+    "2**2**2**2**2**2",
+    "10**10**10",
+    "(10**200)*(10**200)",
+    "factorial(10**6)",
+    "factorial(100000)",
+    "1e308*1e308",
+    "exp(10**6)",
+    "'a'*10**9",
+    "[1]*10**9",
+    "(" * 300 + "1" + ")" * 300,
+    "-" * 600 + "1",
+    "1" * 10000,
+    "+".join(["1"] * 400),
+    "__import__('os').system('true')",
+    "().__class__.__bases__[0].__subclasses__()",
+    "(lambda: 1)()",
+    "[x for x in range(10**9)]",
+    "open('/etc/passwd').read()",
+    "sqrt.__globals__",
+    "abs(x=1)",
+    "eval('1')",
+    "True + 1",
+    "1 if 1 else 2",
+    "1 < 2",
+    "2 >> 1",
+    "~1",
+]
+
+
+def random_expression(rng: random.Random, depth: int = 0, variables: tuple = ()) -> str:
+    """A random, syntactically valid expression over small numbers."""
+    if depth > 3 or rng.random() < 0.3:
+        choice = rng.random()
+        if variables and choice < 0.3:
+            return rng.choice(variables)
+        if choice < 0.6:
+            return str(rng.randint(-20, 20))
+        if choice < 0.9:
+            return f"{rng.uniform(-50, 50):.3f}"
+        return rng.choice(["pi", "e", "tau"])
+    kind = rng.random()
+    if kind < 0.6:
+        op = rng.choice(["+", "-", "*", "/", "//", "%"])
+        return f"({random_expression(rng, depth + 1, variables)} {op} {random_expression(rng, depth + 1, variables)})"
+    if kind < 0.75:
+        return f"({random_expression(rng, depth + 1, variables)} ** {rng.randint(-3, 4)})"
+    if kind < 0.85:
+        return f"-{random_expression(rng, depth + 1, variables)}"
+    return f"{rng.choice(FUNCTIONS)}({random_expression(rng, depth + 1, variables)})"
+
+
+def reference(expression: str, variables: dict = None):
+    """Trusted evaluation of a generated (known-safe) expression."""
+    scope = {name: getattr(math, name) for name in FUNCTIONS if hasattr(math, name)}
+    scope.update(abs=abs, round=round, pi=math.pi, e=math.e, tau=math.tau)
+    scope.update(variables or {})
+    return eval(expression, {"__builtins__": {}}, scope)
+
+
+def close(a, b) -> bool:
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    try:
+        return function(*args), None
+    except CalculatorError as e:
+        return None, e
+    finally:
+        elapsed = time.perf_counter() - started
+        assert elapsed < MAX_SECONDS, f"{args[0]!r} took {elapsed:.2f}s"
+
+
+def test_matches_reference(cases: int = CASES, seed: int = SEED):
+    rng = random.Random(seed)
+    for _ in range(cases):
+        expression = random_expression(rng)
+        try:
+            expected = reference(expression)
+            if isinstance(expected, complex) or (isinstance(expected, float) and not math.isfinite(expected)):
+                expected = None
+        except (ArithmeticError, ValueError, TypeError):
+            expected = None
+        result, error = timed(evaluate, expression)
+        if expected is None or abs(expected) > 1e300:
+            assert error is not None, f"{expression!r}: expected an error, got {result!r}"
+        else:
+            assert error is None, f"{expression!r}: unexpected error {error}"
+            assert close(result, expected), f"{expression!r}: {result!r} != {expected!r}"
+
+
+def test_hostile_input_is_rejected_quickly(cases: int = CASES, seed: int = SEED):
+    for bomb in BOMBS:
+        result, error = timed(evaluate, bomb)
+        assert error is not None, f"{bomb[:60]!r} was evaluated to {result!r}"
+
+    # Random token soup: must either evaluate or raise CalculatorError, never anything else
+    rng = random.Random(seed)
+    tokens = ["1", "9", "2.5", "x", "pi", "(", ")", "**", "*", "/", "%", "+", "-", "^", ",", ".", "[", "]",
+              "sqrt", "factorial", "__class__", "lambda", ":", "'s'", "import", "=", "<", "and", " "]
+    for _ in range(cases):
+        expression = "".join(rng.choice(tokens) for _ in range(rng.randint(1, 25)))
+        result, error = timed(evaluate, expression)
+        assert error is not None or isinstance(result, (int, float)), f"{expression!r} -> {result!r}"
+
+
+def test_batch_matches_scalar(cases: int = CASES // 10, seed: int = SEED):
+    rng = random.Random(seed)
+    xs = np.linspace(-10, 10, 41)
+    checked = 0
+    for _ in range(cases):
+        expression = random_expression(rng, variables=("x",))
+        try:
+            batch = evaluate_batch(expression, {"x": xs})
+        except CalculatorError:
+            continue
+        for x, value in zip(xs, batch):
+            try:
+                expected = float(evaluate(expression, {"x": float(x)}))
+            except CalculatorError:
+                continue
+            if not np.isnan(value):
+                assert close(value, expected), f"{expression!r} at x={x}: {value!r} != {expected!r}"
+                checked += 1
+    assert checked > 0
+
+
+def test_batch_rows_beyond_the_limit_are_nan():
+    result = evaluate_batch("1/x", {"x": [1, 0]})
+    assert result[0] == 1 and np.isnan(result[1])
+    result = evaluate_batch("exp(x) * 1e300", {"x": [0, 1000]})
+    assert result[0] == 1e300 and np.isnan(result[1])
+    assert np.isnan(evaluate_batch("10**x", {"x": [2, 400]})).tolist() == [False, True]
+    # Scalar evaluation still refuses them
+    for expression in ("1/0", "10**400"):
+        assert timed(evaluate, expression)[1] is not None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fuzz the safe calculator engine")
+    parser.add_argument("--cases", type=int, default=CASES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args()
+
+    test_matches_reference(args.cases, args.seed)
+    print(f"✅ {args.cases} random expressions match Python's evaluation")
+    test_hostile_input_is_rejected_quickly(args.cases, args.seed)
+    print(f"✅ {len(BOMBS)} known bombs and {args.cases} token soups rejected in < {MAX_SECONDS}s each")
+    test_batch_matches_scalar(max(1, args.cases // 10), args.seed)
+    print("✅ Batch evaluation matches scalar evaluation")
+    test_batch_rows_beyond_the_limit_are_nan()
+    print("✅ Batch rows beyond the limit are NaN")
@@ -0,0 +1,79 @@
+"""
+Tests for the pooled checkpoint store's writer thread (utils/checkpoint.py);
+runs on a temporary SQLite file:
+
+    python test/test_checkpoint.py
+    python -m pytest test/test_checkpoint.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sqlite3
+import tempfile
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+from utils.checkpoint import PooledSqliteSaver
+
+CONFIG = {"configurable": {"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "c1"}}
+
+
+class FailingConnection:
+    """Write connection whose statements fail, and whose ROLLBACK fails too when asked."""
+
+    def __init__(self, conn: sqlite3.Connection, failing_rollback: bool):
+        self.conn = conn
+        self.failing_rollback = failing_rollback
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def execute(self, sql, *args):
+        if sql == "ROLLBACK" and self.failing_rollback:
+            raise sqlite3.OperationalError("disk I/O error")
+        return self.conn.execute(sql, *args)
+
+    def executemany(self, sql, rows):
+        raise sqlite3.OperationalError("database disk image is malformed")
+
+
+def run_with_connection(failing_rollback: bool):
+    with tempfile.TemporaryDirectory() as directory:
+        saver = PooledSqliteSaver(os.path.join(directory, "checkpoints.db"), pool_size=1)
+        real_conn = saver.conn
+        saver.conn = FailingConnection(real_conn, failing_rollback)
+        errors = []
+        for _ in range(2):
+            try:
+                saver.put_writes(CONFIG, [("messages", "hi")], "task")
+            except Exception as e:
+                errors.append(e)
+        saver.conn = real_conn
+        saver.close()
+        return saver, errors
+
+
+def test_failed_write_leaves_the_writer_usable():
+    saver, errors = run_with_connection(failing_rollback=False)
+    assert [type(e) for e in errors] == [sqlite3.OperationalError] * 2
+    assert saver._broken is None
+
+
+def test_failed_rollback_fails_pending_and_later_writes():
+    saver, errors = run_with_connection(failing_rollback=True)
+    # The write in flight gets the error instead of hanging, and the next one is refused up front
+    assert isinstance(errors[0], sqlite3.OperationalError)
+    assert isinstance(errors[1], RuntimeError) and errors[1].__cause__ is errors[0]
+
+
+if __name__ == "__main__":
+    for test in (
+        test_failed_write_leaves_the_writer_usable,
+        test_failed_rollback_fails_pending_and_later_writes,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
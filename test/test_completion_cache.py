@@ -0,0 +1,225 @@
+"""
+Tests for the LLM completion cache (utils/completion_cache.py) with the chat
+model's HTTP calls answered in-process; no LLM endpoint or API key needed:
+
+    python test/test_completion_cache.py
+    python -m pytest test/test_completion_cache.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import tempfile
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+import httpx
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import tool
+
+from utils.completion_cache import CompletionCache
+from utils.llm_gateway import LLMGateway, create_chat_model
+
+
+class FakeUpstream:
+    """Answers chat completions with "echo: <last message>", or a call to the first tool when tools are bound."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        payload = json.loads(request.content)
+        last = payload["messages"][-1]["content"]
+        if payload.get("tools"):
+            name = payload["tools"][0]["function"]["name"]
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{self.requests}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps({"query": last})}}
+            ]}
+        else:
+            message = {"role": "assistant", "content": f"echo: {last}"}
+
+        if payload.get("stream"):
+            chunks = [message["content"][i:i + 4] for i in range(0, len(message["content"]), 4)]
+            events = [
+                {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": payload["model"],
+                 "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk}, "finish_reason": None}]}
+                for chunk in chunks
+            ]
+            events.append({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0,
+                           "model": payload["model"], "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+        return httpx.Response(200, json={
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "message": message, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+        })
+
+
+@tool
+def search_docs(query: str) -> str:
+    """Search the documentation."""
+    return query
+
+
+@tool
+def search_tickets(query: str) -> str:
+    """Search the ticket tracker."""
+    return query
+
+
+def cache_in(directory: str, **options) -> CompletionCache:
+    return CompletionCache(db_path=os.path.join(directory, "llm_cache.db"), **options)
+
+
+def model_for(upstream: FakeUpstream, cache: CompletionCache):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(upstream.handle))
+    return create_chat_model(
+        gateway=LLMGateway(), completion_cache=cache, http_async_client=client,
+        base_url="http://fake/v1", api_key="test", model="fake",
+    )
+
+
+def test_repeated_requests_are_served_from_memory():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = cache_in(directory)
+        model = model_for(upstream, cache)
+
+        async def scenario():
+            first = await model.ainvoke([HumanMessage(content="hello")])
+            second = await model.ainvoke([HumanMessage(content="hello")])
+            other = await model.ainvoke([HumanMessage(content="something else")])
+            return first, second, other
+
+        first, second, other = asyncio.run(scenario())
+    assert first.content == second.content == "echo: hello" and other.content == "echo: something else"
+    assert upstream.requests == 2
+    assert second.response_metadata["completion_cache"] == "hit" and second.id != first.id
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 2 and cache.stats["stores"] == 2
+
+
+def test_entries_survive_a_restart():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(model_for(upstream, cache_in(directory)).ainvoke([HumanMessage(content="hello")]))
+        restarted = cache_in(directory)
+        answer = asyncio.run(model_for(upstream, restarted).ainvoke([HumanMessage(content="hello")]))
+    assert answer.content == "echo: hello" and upstream.requests == 1
+    assert restarted.stats["disk_hits"] == 1
+
+
+def test_tool_schemas_are_part_of_the_key():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        model = model_for(upstream, cache_in(directory))
+        docs, tickets = model.bind_tools([search_docs]), model.bind_tools([search_tickets])
+
+        async def scenario():
+            return [await m.ainvoke([HumanMessage(content="find it")]) for m in (docs, tickets, docs)]
+
+        answers = asyncio.run(scenario())
+    assert [a.tool_calls[0]["name"] for a in answers] == ["search_docs", "search_tickets", "search_docs"]
+    assert upstream.requests == 2
+    assert answers[2].tool_calls[0]["args"] == {"query": "find it"}
+
+
+def test_expired_entries_are_not_served():
+    upstream = FakeUpstream()
+    now = [1000.0]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = cache_in(directory, ttl=60, clock=lambda: now[0])
+        model = model_for(upstream, cache)
+
+        async def scenario():
+            await model.ainvoke([HumanMessage(content="hello")])
+            now[0] += 30
+            await model.ainvoke([HumanMessage(content="hello")])
+            now[0] += 61
+            await model.ainvoke([HumanMessage(content="hello")])
+
+        asyncio.run(scenario())
+    assert upstream.requests == 2
+    assert cache.stats["memory_hits"] == 1 and cache.stats["expired"] == 1
+
+
+def test_least_recently_used_entries_are_evicted():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        # Room for a few completions on disk and two in memory
+        cache = cache_in(directory, memory_entries=2, max_mb=4000 / 1024 / 1024)
+        model = model_for(upstream, cache)
+
+        async def scenario():
+            for i in range(10):
+                await model.ainvoke([HumanMessage(content=f"question {i}")])
+            await model.ainvoke([HumanMessage(content="question 9")])
+            await model.ainvoke([HumanMessage(content="question 0")])
+
+        asyncio.run(scenario())
+        on_disk = cache.disk.count()
+        disk_bytes = cache.disk.bytes
+    assert len(cache._memory) == 2
+    assert cache.stats["evictions"] > 0 and 0 < on_disk < 10 and disk_bytes <= cache.max_bytes
+    # question 9 is still cached, question 0 was evicted
+    assert upstream.requests == 11
+
+
+def test_side_effecting_agents_skip_the_cache():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = cache_in(directory)
+        model = model_for(upstream, cache)
+
+        async def scenario():
+            for metadata in ({"agent": "email_handler"}, {"langgraph_checkpoint_ns": "jira_handler:1234"}) * 2:
+                await model.ainvoke([HumanMessage(content="send it")], config={"metadata": metadata})
+            for _ in range(2):
+                await model.ainvoke(
+                    [HumanMessage(content="send it")], config={"metadata": {"langgraph_checkpoint_ns": "researcher:1"}}
+                )
+
+        asyncio.run(scenario())
+    assert upstream.requests == 5
+    assert cache.stats["skipped"] == 4 and cache.stats["stores"] == 1 and cache.stats["memory_hits"] == 1
+
+
+def test_streamed_and_plain_calls_share_entries():
+    upstream = FakeUpstream()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = cache_in(directory)
+        model = model_for(upstream, cache)
+        tools_model = model.bind_tools([search_docs])
+
+        async def scenario():
+            streamed = [chunk async for chunk in model.astream([HumanMessage(content="stream me")])]
+            plain = await model.ainvoke([HumanMessage(content="stream me")])
+            await tools_model.ainvoke([HumanMessage(content="look it up")])
+            replayed = [chunk async for chunk in tools_model.astream([HumanMessage(content="look it up")])]
+            return streamed, plain, replayed
+
+        streamed, plain, replayed = asyncio.run(scenario())
+    assert "".join(chunk.content for chunk in streamed) == "echo: stream me" and len(streamed) > 1
+    assert plain.content == "echo: stream me" and plain.response_metadata["completion_cache"] == "hit"
+    # The hit arrives as one chunk (LangChain appends an empty closing chunk)
+    merged = replayed[0]
+    for chunk in replayed[1:]:
+        merged = merged + chunk
+    assert len([c for c in replayed if c.content or c.tool_call_chunks]) == 1
+    assert merged.tool_calls[0]["args"] == {"query": "look it up"}
+    assert upstream.requests == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,100 @@
+"""
+Tests for the embedding cache (utils/embedding_cache.py) with a counting
+stand-in for the embedding API:
+
+    python test/test_embedding_cache.py
+    python -m pytest test/test_embedding_cache.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+
+import numpy as np
+
+from utils.embedding_cache import CachedEmbeddings, DiskEmbeddingStore
+
+
+class CountingEmbeddings:
+    """Embeds a text as [len(text), number of characters 'a']; counts API calls and texts."""
+
+    def __init__(self, model_name="model-a"):
+        self.model_name = model_name
+        self.calls = 0
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return [[float(len(text)), float(text.count("a"))] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_memory_and_disk_hits():
+    with tempfile.TemporaryDirectory() as directory:
+        api = CountingEmbeddings()
+        cached = CachedEmbeddings(api, cache_dir=directory)
+        first = cached.embed_documents(["alpha", "beta", "alpha"])
+        assert first == [[5.0, 2.0], [4.0, 1.0], [5.0, 2.0]]
+        assert api.calls == 1 and api.texts == 2
+
+        assert cached.embed_query("beta") == [4.0, 1.0]
+        assert cached.stats["memory_hits"] == 1 and api.calls == 1
+
+        # A fresh process finds the vectors on disk
+        restarted = CachedEmbeddings(CountingEmbeddings(), cache_dir=directory)
+        assert restarted.embed_documents(["beta", "alpha"]) == [[4.0, 1.0], [5.0, 2.0]]
+        assert restarted.stats["disk_hits"] == 2 and restarted.underlying.calls == 0
+
+
+def test_reembedding_unchanged_texts_makes_no_api_calls():
+    with tempfile.TemporaryDirectory() as directory:
+        texts = [f"chunk {i}" for i in range(50)]
+        CachedEmbeddings(CountingEmbeddings(), cache_dir=directory, memory_entries=10).embed_documents(texts)
+
+        api = CountingEmbeddings()
+        cached = CachedEmbeddings(api, cache_dir=directory, memory_entries=10)
+        cached.embed_documents(texts)
+        cached.embed_documents(texts + ["a new chunk"])
+        assert api.calls == 1 and api.texts == 1
+
+
+def test_keys_include_the_model():
+    with tempfile.TemporaryDirectory() as directory:
+        CachedEmbeddings(CountingEmbeddings("model-a"), cache_dir=directory).embed_documents(["alpha"])
+        other = CountingEmbeddings("model-b")
+        CachedEmbeddings(other, cache_dir=directory).embed_documents(["alpha"])
+        assert other.calls == 1
+
+
+def test_torn_write_does_not_shift_later_rows():
+    with tempfile.TemporaryDirectory() as directory:
+        store = DiskEmbeddingStore(directory, "model-a")
+        a, b = b"a" * 32, b"b" * 32
+        store.put_many({a: np.array([1.0, 0.0], dtype=np.float32)})
+        # A write killed after its vector append, before its index append; and half a digest
+        with open(store.vectors_path, "ab") as f:
+            f.write(np.array([9.0, 9.0], dtype=np.float32).tobytes())
+        with open(store.index_path, "ab") as f:
+            f.write(b"x" * 10)
+
+        store.put_many({b: np.array([0.0, 1.0], dtype=np.float32)})
+        for reader in (store, DiskEmbeddingStore(directory, "model-a")):
+            found = reader.get_many([a, b])
+            assert found[a].tolist() == [1.0, 0.0] and found[b].tolist() == [0.0, 1.0]
+        assert os.path.getsize(store.vectors_path) == 2 * 2 * 4
+
+
+if __name__ == "__main__":
+    for test in (
+        test_memory_and_disk_hits,
+        test_reembedding_unchanged_texts_makes_no_api_calls,
+        test_keys_include_the_model,
+        test_torn_write_does_not_shift_later_rows,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,197 @@
+"""
+Tests for the bulk Jira tools (jira_create_issues_bulk, jira_add_comments_bulk)
+against a local mock Jira server; no Jira instance or credentials needed:
+
+    python test/test_jira_bulk.py
+    python -m pytest test/test_jira_bulk.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+from utils.jira_client import jira_metadata, reset_jira_client
+from utils.tools import jira_add_comments_bulk, jira_create_issues_bulk
+
+ISSUE_TYPES = [{"id": "1", "name": "Bug"}, {"id": "2", "name": "Task"}]
+
+
+class MockJira(ThreadingHTTPServer):
+    """Rejects issues whose summary contains FAIL and comments on issues that do not exist."""
+
+    daemon_threads = True
+
+    def __init__(self, comment_delay: float = 0.0):
+        super().__init__(("127.0.0.1", 0), MockJiraHandler)
+        self.comment_delay = comment_delay
+        self.lock = threading.Lock()
+        self.requests = []
+        self.issues = []
+        self.comments = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+
+class MockJiraHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = re.sub(r"^/rest/api/[^/]+", "", self.path.split("?")[0])
+        with self.server.lock:
+            self.server.requests.append(("GET", path))
+        if re.fullmatch(r"/project/[^/]+", path):
+            return self.reply(200, {"key": path.rsplit("/", 1)[1], "issueTypes": ISSUE_TYPES})
+        if path == "/field":
+            return self.reply(200, [{"id": "summary", "name": "Summary"}])
+        self.reply(404, {"errorMessages": ["Not found"]})
+
+    def do_POST(self):
+        path = re.sub(r"^/rest/api/[^/]+", "", self.path.split("?")[0])
+        data = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        server = self.server
+        with server.lock:
+            server.requests.append(("POST", path))
+
+        if path == "/issue/bulk":
+            issues, errors = [], []
+            with server.lock:
+                for position, update in enumerate(data["issueUpdates"]):
+                    fields = update["fields"]
+                    if "FAIL" in fields.get("summary", ""):
+                        errors.append({
+                            "status": 400,
+                            "elementErrors": {"errorMessages": [], "errors": {"summary": "Summary is not allowed"}},
+                            "failedElementNumber": position,
+                        })
+                        continue
+                    server.issues.append(fields)
+                    key = f"{fields['project']['key']}-{len(server.issues)}"
+                    issues.append({"id": str(len(server.issues)), "key": key})
+            return self.reply(201 if issues else 400, {"issues": issues, "errors": errors})
+
+        match = re.fullmatch(r"/issue/([^/]+)/comment", path)
+        if match:
+            with server.lock:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            time.sleep(server.comment_delay)
+            with server.lock:
+                server.in_flight -= 1
+                known = match.group(1) in {f"TEST-{i}" for i in range(1, 100)}
+                if known:
+                    server.comments.append((match.group(1), data["body"]))
+            if not known:
+                return self.reply(404, {"errorMessages": ["Issue does not exist or you do not have permission to see it."]})
+            return self.reply(201, {"id": "1"})
+        self.reply(404, {"errorMessages": ["Not found"]})
+
+
+def start_server(**kwargs) -> MockJira:
+    server = MockJira(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(
+        JIRA_INSTANCE_URL=f"http://127.0.0.1:{server.server_address[1]}",
+        JIRA_USERNAME="test",
+        JIRA_PASSWORD="test",
+    )
+    reset_jira_client()
+    jira_metadata.invalidate()
+    return server
+
+
+def stop_server(server: MockJira):
+    reset_jira_client()
+    server.shutdown()
+    server.server_close()
+
+
+def issue(summary: str, issue_type: str = "Bug", project: str = "TEST") -> dict:
+    return {"project": {"key": project}, "summary": summary, "issuetype": {"name": issue_type}}
+
+
+def test_bulk_create_reports_partial_failures():
+    server = start_server()
+    try:
+        items = [issue(f"Bug {i}") for i in range(30)]
+        items[3] = issue("FAIL on purpose")
+        items[7] = issue("Wrong type", issue_type="Incident")
+        items[9] = "not an object"
+        output = asyncio.run(jira_create_issues_bulk.ainvoke({"issues": json.dumps(items)}))
+    finally:
+        stop_server(server)
+
+    lines = output.splitlines()
+    assert lines[0] == "⚠️ Created 27 of 30 issue(s); 3 failed:"
+    assert "4. ❌ FAIL on purpose: summary: Summary is not allowed" in lines
+    assert any(line.startswith("8. ❌ Wrong type: Issue type 'Incident' does not exist") for line in lines)
+    assert "10. ❌ Not created: not a JSON object of issue fields" in lines
+    assert "1. ✅ [TEST-1] Bug 0" in lines and "30. ✅ [TEST-27] Bug 29" in lines
+    # The 28 items that passed the metadata checks went out in one bulk request
+    assert server.requests.count(("POST", "/issue/bulk")) == 1
+    assert len(server.issues) == 27
+
+
+def test_bulk_create_when_every_issue_fails():
+    server = start_server()
+    try:
+        items = [issue("FAIL one"), issue("FAIL two")]
+        output = asyncio.run(jira_create_issues_bulk.ainvoke({"issues": json.dumps(items)}))
+    finally:
+        stop_server(server)
+    assert output.startswith("❌ Created 0 of 2 issue(s); 2 failed:")
+    assert "2. ❌ FAIL two: summary: Summary is not allowed" in output
+
+
+def test_bulk_create_rejects_bad_input():
+    assert asyncio.run(jira_create_issues_bulk.ainvoke({"issues": "{not json"})).startswith("❌ Invalid JSON")
+    assert asyncio.run(jira_create_issues_bulk.ainvoke({"issues": "[]"})).startswith("❌ Invalid issue data")
+
+
+def test_bulk_comments_are_bounded_and_reported_per_item():
+    server = start_server(comment_delay=0.05)
+    try:
+        comments = [{"issue_key": f"TEST-{i}", "comment": f"Fixed in build {i}"} for i in range(1, 13)]
+        comments[5]["issue_key"] = "NOPE-1"
+        started = time.perf_counter()
+        output = asyncio.run(jira_add_comments_bulk.ainvoke({"comments": comments}))
+        elapsed = time.perf_counter() - started
+    finally:
+        stop_server(server)
+
+    lines = output.splitlines()
+    assert lines[0] == "⚠️ Added 11 of 12 comment(s); 1 failed:"
+    assert lines[2] == "1. ✅ [TEST-1] comment added"
+    assert lines[7] == "6. ❌ [NOPE-1] Issue does not exist or you do not have permission to see it."
+    assert len(server.comments) == 11
+    # At most JIRA_BULK_CONCURRENCY (4) requests in flight, and faster than one at a time
+    assert 1 < server.max_in_flight <= 4
+    assert elapsed < 12 * 0.05
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,233 @@
+"""
+Tests for the LLM gateway (utils/llm_gateway.py) against a local fake
+OpenAI-compatible server; no LLM endpoint or API key needed:
+
+    python test/test_llm_gateway.py
+    python -m pytest test/test_llm_gateway.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+import openai
+from langchain_core.messages import HumanMessage
+
+from utils.llm_gateway import LLMGateway, create_chat_model
+
+
+class FakeOpenAI(ThreadingHTTPServer):
+    """
+    Answers /v1/chat/completions with "echo: <last message>" after `latency`
+    seconds. Statuses queued in `failures` are returned first, one per request.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, latency: float = 0.0, failures=(), retry_after: str = None):
+        super().__init__(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.latency = latency
+        self.failures = list(failures)
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def send(self, status: int, body: bytes, content_type: str = "application/json", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            failure = server.failures.pop(0) if server.failures else None
+        try:
+            time.sleep(server.latency)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+        if failure is not None:
+            headers = {"retry-after": server.retry_after} if server.retry_after else {}
+            error = {"error": {"message": f"fake error {failure}", "type": "fake", "code": str(failure)}}
+            return self.send(failure, json.dumps(error).encode(), headers=headers)
+
+        answer = "echo: " + payload["messages"][-1]["content"]
+        if payload.get("stream"):
+            chunks = [answer[i:i + 4] for i in range(0, len(answer), 4)]
+            events = [
+                {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": payload["model"],
+                 "choices": [{"index": 0, "delta": {"role": "assistant", "content": chunk}, "finish_reason": None}]}
+                for chunk in chunks
+            ]
+            events.append({"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0,
+                           "model": payload["model"], "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            body = "".join(f"data: {json.dumps(event)}\n\n" for event in events) + "data: [DONE]\n\n"
+            return self.send(200, body.encode(), content_type="text/event-stream")
+
+        completion = {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": 0, "model": payload["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10},
+        }
+        self.send(200, json.dumps(completion).encode())
+
+
+def start(**kwargs) -> FakeOpenAI:
+    server = FakeOpenAI(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def model_for(server: FakeOpenAI, **gateway_options):
+    options = {"retry_base": 0.01, "retry_max": 0.05, **gateway_options}
+    gateway = LLMGateway(**options)
+    model = create_chat_model(
+        gateway=gateway, completion_cache=None, base_url=server.base_url, api_key="test", model="fake"
+    )
+    return model, gateway
+
+
+def test_concurrency_is_capped_and_queueing_reported():
+    server = start(latency=0.05)
+    model, gateway = model_for(server, max_concurrency=3)
+
+    async def scenario():
+        return await asyncio.gather(*(model.ainvoke([HumanMessage(content=f"question {i}")]) for i in range(10)))
+
+    try:
+        answers = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    assert [a.content for a in answers] == [f"echo: question {i}" for i in range(10)]
+    assert server.max_in_flight <= 3 and gateway.stats["max_in_flight"] <= 3
+    assert gateway.stats["max_queued"] >= 7 and gateway.stats["max_queue_wait_seconds"] > 0
+    assert gateway.stats["queued"] == 0 and gateway.stats["in_flight"] == 0
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    server = start(latency=0.1)
+    model, gateway = model_for(server)
+
+    async def scenario():
+        same = [model.ainvoke([HumanMessage(content="route this")]) for _ in range(5)]
+        other = model.ainvoke([HumanMessage(content="something else")])
+        return await asyncio.gather(*same, other)
+
+    try:
+        answers = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    assert [a.content for a in answers] == ["echo: route this"] * 5 + ["echo: something else"]
+    assert server.requests == 2
+    assert gateway.stats["coalesced"] == 4 and gateway.stats["upstream_calls"] == 2
+    # Every caller gets its own message object
+    assert len({id(a) for a in answers}) == 6
+
+
+def test_rate_limits_and_server_errors_are_retried():
+    server = start(failures=[429, 503], retry_after="0")
+    model, gateway = model_for(server)
+    try:
+        answer = asyncio.run(model.ainvoke([HumanMessage(content="hello")]))
+    finally:
+        server.shutdown()
+    assert answer.content == "echo: hello"
+    assert server.requests == 3 and gateway.stats["retries"] == 2
+
+
+def test_client_errors_fail_at_once_and_retries_are_bounded():
+    server = start(failures=[400, 500, 500, 500])
+    model, gateway = model_for(server, max_retries=2)
+
+    async def scenario():
+        errors = []
+        for _ in range(2):
+            try:
+                await model.ainvoke([HumanMessage(content="hello")])
+            except openai.APIStatusError as e:
+                errors.append(e.status_code)
+        return errors
+
+    try:
+        errors = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    # 400: no retry; 500: the first attempt and 2 retries, all failing
+    assert errors == [400, 500]
+    assert server.requests == 4
+    assert gateway.stats["retries"] == 2 and gateway.stats["errors"] == 2
+
+
+def test_connections_are_kept_alive():
+    server = start()
+    model, _ = model_for(server)
+
+    async def scenario():
+        for i in range(20):
+            await model.ainvoke([HumanMessage(content=f"turn {i}")])
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    assert server.requests == 20 and server.connections == 1
+
+
+def test_streaming_retries_before_the_first_chunk():
+    server = start(failures=[503])
+    model, gateway = model_for(server)
+
+    async def scenario():
+        return [chunk.content async for chunk in model.astream([HumanMessage(content="stream me")])]
+
+    try:
+        chunks = asyncio.run(scenario())
+    finally:
+        server.shutdown()
+    assert "".join(chunks) == "echo: stream me" and len([c for c in chunks if c]) > 1
+    assert server.requests == 2 and gateway.stats["retries"] == 1
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
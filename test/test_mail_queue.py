@@ -0,0 +1,201 @@
+"""
+Tests for the outbound mail queue (utils/mail_queue.py) against a local
+aiosmtpd server; no real mail server or credentials needed:
+
+    python test/test_mail_queue.py
+    python -m pytest test/test_mail_queue.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import socket
+import tempfile
+import time
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+from aiosmtpd.controller import Controller
+
+from utils.mail_queue import MailQueue, MailSender, SMTPConnectionPool
+
+SENDER = "assistant@example.com"
+
+
+class RecordingHandler:
+    """Accepts mail, refusing `refused` recipients and answering 451 to the first `transient_failures` messages."""
+
+    def __init__(self, refused=(), transient_failures=0):
+        self.refused = set(refused)
+        self.transient_failures = transient_failures
+        self.delivered = []
+        self.connections = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        self.connections += 1
+        session.host_name = hostname
+        return responses
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address in self.refused:
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.transient_failures > 0:
+            self.transient_failures -= 1
+            return "451 Try again later"
+        self.delivered.append((envelope.rcpt_tos[0], envelope.content.decode("utf8", errors="replace")))
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def make_sender(workdir: str, port: int, **kwargs) -> MailSender:
+    pool = SMTPConnectionPool(host="127.0.0.1", port=port, security="plain", size=2, timeout=5)
+    return MailSender(
+        queue=MailQueue(os.path.join(workdir, "mail.db")), pool=pool, sender=SENDER,
+        retry_base=0.05, retry_max=0.2, **kwargs,
+    )
+
+
+def with_server(handler, port=None):
+    controller = Controller(handler, hostname="127.0.0.1", port=port or free_port())
+    controller.start()
+    return controller
+
+
+def test_bulk_delivery_reuses_connections():
+    handler = RecordingHandler()
+    controller = with_server(handler)
+    with tempfile.TemporaryDirectory() as workdir:
+        sender = make_sender(workdir, controller.port)
+
+        async def scenario():
+            ids = [await sender.enqueue(f"user{i}@example.com", f"Subject {i}", f"Body {i}") for i in range(20)]
+            await sender.drain()
+            return ids
+
+        try:
+            ids = asyncio.run(scenario())
+        finally:
+            controller.stop()
+        assert len(handler.delivered) == 20
+        assert {to for to, _ in handler.delivered} == {f"user{i}@example.com" for i in range(20)}
+        assert all(sender.queue.status(mail_id)[0] == "sent" for mail_id in ids)
+        # 20 emails over a pool of 2: at most 2 SMTP sessions
+        assert handler.connections <= 2 and sender.pool.stats["opened"] <= 2
+
+
+def test_transient_errors_are_retried_and_refusals_fail():
+    handler = RecordingHandler(refused={"nobody@example.com"}, transient_failures=2)
+    controller = with_server(handler)
+    with tempfile.TemporaryDirectory() as workdir:
+        sender = make_sender(workdir, controller.port, batch_size=10)
+
+        async def scenario():
+            good = [await sender.enqueue(f"ok{i}@example.com", "Hi", "Hello") for i in range(3)]
+            bad = await sender.enqueue("nobody@example.com", "Hi", "Hello")
+            deadline = time.monotonic() + 5
+            while time.monotonic() < deadline and sender.queue.counts().get("pending"):
+                await sender.drain()
+                await asyncio.sleep(0.05)
+            return good, bad
+
+        try:
+            good, bad = asyncio.run(scenario())
+        finally:
+            controller.stop()
+        assert [sender.queue.status(mail_id)[0] for mail_id in good] == ["sent"] * 3
+        status, attempts, error = sender.queue.status(bad)
+        assert status == "failed" and attempts == 1 and "No such user" in error
+        assert sender.stats["retried"] == 2
+
+
+def test_outage_backs_off_then_recovers():
+    port = free_port()
+    with tempfile.TemporaryDirectory() as workdir:
+        sender = make_sender(workdir, port)
+
+        async def scenario():
+            mail_id = await sender.enqueue("later@example.com", "Hi", "Hello")
+            await sender.drain()  # no server yet: the attempt fails and is scheduled for retry
+            status, attempts, error = sender.queue.status(mail_id)
+            assert status == "pending" and attempts == 1 and error
+
+            handler = RecordingHandler()
+            controller = with_server(handler, port)
+            try:
+                task = asyncio.create_task(sender.run())
+                deadline = time.monotonic() + 5
+                while time.monotonic() < deadline and sender.queue.status(mail_id)[0] != "sent":
+                    await asyncio.sleep(0.05)
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+            finally:
+                controller.stop()
+            return mail_id, handler
+
+        mail_id, handler = asyncio.run(scenario())
+        assert sender.queue.status(mail_id)[0] == "sent"
+        assert len(handler.delivered) == 1
+
+
+def test_interrupted_emails_are_requeued():
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "mail.db")
+        queue = MailQueue(path)
+        mail_id = queue.enqueue("crash@example.com", "Hi", "Hello")
+        assert [mail.id for mail in queue.claim(10)] == [mail_id]
+        queue.close()
+
+        # A new process finds the email still marked as sending, and takes it back once the lease ran out
+        restarted = MailQueue(path)
+        assert restarted.requeue_interrupted() == 0
+        assert restarted.requeue_interrupted(now=time.time() + restarted.lease_seconds + 1) == 1
+        assert [mail.id for mail in restarted.claim(10)] == [mail_id]
+
+
+def test_drain_leaves_another_senders_claims_alone():
+    handler = RecordingHandler()
+    controller = with_server(handler)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            api = MailQueue(os.path.join(workdir, "mail.db"))
+            mail_id = api.enqueue("busy@example.com", "Hi", "Hello")
+            # The API's sender is delivering this email right now
+            assert [mail.id for mail in api.claim(10)] == [mail_id]
+
+            cli = make_sender(workdir, controller.port)
+            asyncio.run(cli.drain())
+            assert handler.delivered == [] and cli.queue.status(mail_id)[0] == "sending"
+    finally:
+        controller.stop()
+
+
+def test_invalid_recipient_is_rejected_on_enqueue():
+    with tempfile.TemporaryDirectory() as workdir:
+        sender = make_sender(workdir, free_port())
+        try:
+            asyncio.run(sender.enqueue("not-an-address", "Hi", "Hello"))
+        except ValueError as e:
+            assert "Invalid recipient" in str(e)
+        else:
+            raise AssertionError("invalid address was queued")
+        assert sender.queue.counts() == {}
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
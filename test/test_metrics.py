@@ -0,0 +1,208 @@
+"""
+Tests for the Prometheus metrics (utils/metrics.py); no services needed:
+
+    python test/test_metrics.py
+    python -m pytest test/test_metrics.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import tempfile
+import threading
+import uuid
+
+from test.conftest import ScriptedModel, set_env_defaults
+
+set_env_defaults()
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.tools import tool
+
+from utils import metrics
+from utils.checkpoint import PooledSqliteSaver
+from utils.history import HistoryManager
+
+
+def test_counters_and_histograms_are_exact_across_threads():
+    registry = metrics.Registry()
+    counter = metrics.Counter("test_total", "Test counter.", ("kind",), registry=registry)
+    histogram = metrics.Histogram("test_seconds", "Test histogram.", buckets=(0.5, 1.0), registry=registry)
+
+    def work():
+        for i in range(20000):
+            counter.inc("a")
+            histogram.observe(0.25 if i % 2 else 0.75)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert counter.value("a") == 160000 and histogram.count() == 160000
+    assert histogram.values()[()][:3] == [80000, 80000, 0]
+
+
+def test_exposition_format():
+    registry = metrics.Registry()
+    counter = metrics.Counter("requests_total", "Requests.", ("endpoint",), registry=registry)
+    gauge = metrics.Gauge("in_flight", "In flight.", registry=registry)
+    histogram = metrics.Histogram("latency_seconds", "Latency.", ("endpoint",), buckets=(0.1, 1.0), registry=registry)
+    counter.inc('/say "hi"\\')
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, "/query")
+
+    assert registry.render().splitlines() == [
+        "# HELP assistant_requests_total Requests.",
+        "# TYPE assistant_requests_total counter",
+        'assistant_requests_total{endpoint="/say \\"hi\\"\\\\"} 1',
+        "# HELP assistant_in_flight In flight.",
+        "# TYPE assistant_in_flight gauge",
+        "assistant_in_flight 1",
+        "# HELP assistant_latency_seconds Latency.",
+        "# TYPE assistant_latency_seconds histogram",
+        'assistant_latency_seconds_bucket{endpoint="/query",le="0.1"} 2',
+        'assistant_latency_seconds_bucket{endpoint="/query",le="1"} 3',
+        'assistant_latency_seconds_bucket{endpoint="/query",le="+Inf"} 4',
+        'assistant_latency_seconds_sum{endpoint="/query"} 2.65',
+        'assistant_latency_seconds_count{endpoint="/query"} 4',
+    ]
+
+
+# Token usage the scripted model reports per call
+USAGE = {"input_tokens": 10, "output_tokens": 3, "total_tokens": 13}
+
+
+@tool
+def double(x: int) -> int:
+    """Double a number."""
+    return 2 * x
+
+
+@tool
+def explode(x: int) -> int:
+    """Always fails."""
+    raise ValueError("boom")
+
+
+def test_agent_tool_and_llm_metrics():
+    agent_name = f"agent_{uuid.uuid4().hex[:6]}"
+    handler = metrics.GraphMetricsHandler(agents=[agent_name])
+
+    async def run(tool_name, tools):
+        model = ScriptedModel(tool_name=tool_name, tool_args={"x": 2}, answer="done", usage=USAGE)
+        agent = create_agent(model, tools=tools, name=agent_name)
+        # Run as the planner does, so the agent is named in the run metadata
+        config = {"callbacks": [handler], "metadata": {"agent": agent_name}}
+        await agent.ainvoke({"messages": [{"role": "user", "content": "double 2"}]}, config=config)
+
+    asyncio.run(run("double", [double]))
+    try:
+        asyncio.run(run("explode", [explode]))
+    except ValueError:
+        pass
+
+    assert metrics.agent_calls.value(agent_name) == 2 and metrics.agent_errors.value(agent_name) == 1
+    assert metrics.agent_duration.count(agent_name) == 2
+    assert metrics.tool_calls.value("double", agent_name) == 1 and metrics.tool_errors.value("double", agent_name) == 0
+    assert metrics.tool_calls.value("explode", agent_name) == 1 and metrics.tool_errors.value("explode", agent_name) == 1
+    # Two calls for the successful run, one before the failing tool
+    assert metrics.llm_calls.value(agent_name, "miss") == 3 and metrics.llm_duration.count(agent_name) == 3
+    assert metrics.llm_tokens.value(agent_name, "prompt") == 30
+    assert metrics.llm_tokens.value(agent_name, "completion") == 9
+    assert handler._runs == {} and handler._open_agents == set()
+
+
+def test_cached_completions_spend_no_tokens():
+    agent_name = f"agent_{uuid.uuid4().hex[:6]}"
+    handler = metrics.GraphMetricsHandler(agents=[agent_name])
+    for cache in ("miss", "hit"):
+        run_id = uuid.uuid4()
+        message = AIMessage(content="done", usage_metadata=USAGE, response_metadata={"completion_cache": cache})
+        handler.on_chat_model_start({}, [[]], run_id=run_id, metadata={"agent": agent_name})
+        handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+    assert metrics.llm_calls.value(agent_name, "hit") == 1 and metrics.llm_calls.value(agent_name, "miss") == 1
+    assert metrics.llm_tokens.value(agent_name, "prompt") == 10
+    assert metrics.llm_tokens.value(agent_name, "completion") == 3
+
+
+def test_http_requests_are_counted_per_route():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+    prefix = f"/t{uuid.uuid4().hex[:6]}"
+
+    @app.get(prefix + "/items/{item_id}")
+    async def item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404)
+        return {"id": item_id}
+
+    @app.get(prefix + "/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                await asyncio.sleep(0.02)
+                yield f"{i}\n"
+        return StreamingResponse(chunks())
+
+    client = TestClient(app)
+    for item_id in ("a", "b", "missing"):
+        client.get(f"{prefix}/items/{item_id}")
+    assert client.get(f"{prefix}/stream").text == "0\n1\n2\n"
+
+    template = prefix + "/items/{item_id}"
+    assert metrics.http_requests.value("GET", template, "200") == 2
+    assert metrics.http_requests.value("GET", template, "404") == 1
+    assert metrics.http_in_flight.value(template) == 0
+    # A streamed response is timed until its last chunk
+    entry = metrics.http_duration.values()[("GET", prefix + "/stream")]
+    assert entry[-1] == 1 and entry[-2] >= 0.06
+
+
+def test_checkpoint_writes_are_timed():
+    before = {op: metrics.checkpoint_write_duration.count(op) for op in ("checkpoint", "writes")}
+    commits = metrics.checkpoint_commit_duration.count()
+    with tempfile.TemporaryDirectory() as directory:
+        with PooledSqliteSaver.from_conn_string(os.path.join(directory, "checkpoints.db")) as saver:
+            config = {"configurable": {"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "c1"}}
+            for i in range(3):
+                saver.put_writes(config, [("messages", f"write {i}")], task_id=f"task{i}")
+            asyncio.run(saver.aput_writes(config, [("messages", "async write")], task_id="task3"))
+    assert metrics.checkpoint_write_duration.count("writes") == before["writes"] + 4
+    assert metrics.checkpoint_write_duration.count("checkpoint") == before["checkpoint"]
+    assert metrics.checkpoint_commit_duration.count() >= commits + 1
+
+
+def test_history_prompt_tokens_are_observed_per_turn():
+    manager = HistoryManager(mode="window", max_turns=1, max_tokens=0, model=None)
+    registry = metrics.Registry()
+    metrics.register_history_metrics(manager, registry)
+    before = {stage: metrics.history_prompt_tokens.count(stage) for stage in ("before", "after")}
+    messages = [
+        message
+        for i in range(3)
+        for message in (HumanMessage(content=f"question {i}", id=f"h{i}"), AIMessage(content=f"answer {i}", id=f"a{i}"))
+    ]
+    update = manager.compact({"messages": messages})
+    manager.compact({"messages": update["messages"][1:]})
+    assert metrics.history_prompt_tokens.count("before") == before["before"] + 2
+    assert metrics.history_prompt_tokens.count("after") == before["after"] + 2
+    assert "assistant_history_compactions_total 1" in registry.render()
+    assert manager.snapshot()["mode"] == "window" and manager.snapshot()["turns"] == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,118 @@
+"""
+Tests for the metadata migration (utils/migrate_metadata.py) on an in-process
+ChromaDB collection holding records in the legacy schema; no services needed:
+
+    python test/test_migrate_metadata.py
+    python -m pytest test/test_migrate_metadata.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+import uuid
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+import chromadb
+
+from utils.chunking import make_text_splitter
+from utils.ingest_data import run_ingestion
+from utils.migrate_metadata import MigrationJournal, migrate_collection
+
+TEXT = "Alpha beta gamma. " * 20
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.texts = 0
+
+    def embed_documents(self, texts):
+        self.texts += len(texts)
+        return [[1.0, float(len(text))] for text in texts]
+
+
+def legacy_collection(documents):
+    """A collection as ingestion wrote it before the compact schema: positional ids, text in metadata."""
+    collection = chromadb.EphemeralClient().create_collection(f"legacy_{uuid.uuid4().hex[:8]}")
+    splitter = make_text_splitter(250, 50)
+    ids, texts, metadatas = [], [], []
+    for doc_index, (source, text) in enumerate(documents):
+        chunks = splitter.split_text(text)
+        for chunk_index, chunk in enumerate(chunks):
+            ids.append(str(len(ids)))
+            texts.append(chunk)
+            metadatas.append({
+                "source": source, "doc_index": doc_index, "chunk_index": chunk_index,
+                "total_chunks": len(chunks), "doc": chunk,
+            })
+    collection.add(ids=ids, embeddings=[[1.0, float(len(t))] for t in texts], documents=texts, metadatas=metadatas)
+    return collection
+
+
+def ingest(collection, documents, state_dir, **kwargs):
+    embedder = FakeEmbedder()
+    run_ingestion(
+        iter(documents), collection.name, embedder=embedder, collection=collection,
+        state_dir=state_dir, lexical_index_path=None, **kwargs,
+    )
+    return embedder.texts
+
+
+def test_interrupted_page_is_replayed_from_the_journal():
+    collection = legacy_collection([("ingestion", TEXT), ("ingestion", "Second document.")])
+    before = collection.count()
+
+    class CrashingCollection:
+        """Dies between deleting a page and re-adding it."""
+
+        def __getattr__(self, name):
+            return getattr(collection, name)
+
+        def add(self, **kwargs):
+            raise KeyboardInterrupt
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        try:
+            migrate_collection(CrashingCollection(), page_size=2, state_dir=state_dir)
+        except KeyboardInterrupt:
+            pass
+        assert collection.count() == before - 2 and MigrationJournal(collection.name, state_dir).read()
+
+        report = migrate_collection(collection, page_size=2, state_dir=state_dir)
+        assert report["replayed"] == 2 and report["migrated"] == before - 2
+        assert MigrationJournal(collection.name, state_dir).read() is None
+
+    records = collection.get(include=["metadatas"])
+    assert len(records["ids"]) == before
+    assert all(len(record_id) == 32 and "doc" not in m for record_id, m in zip(records["ids"], records["metadatas"]))
+
+
+def test_migrated_file_chunks_are_known_to_the_next_ingestion():
+    documents = [("docs/a.md", TEXT), ("docs/b.md", "Short file.")]
+    collection = legacy_collection(documents)
+    before = collection.count()
+    with tempfile.TemporaryDirectory() as state_dir:
+        migrate_collection(collection, state_dir=state_dir)
+        # Same ids as a fresh ingestion: nothing is re-embedded and nothing is duplicated
+        assert ingest(collection, documents, state_dir, incremental=True) == 0
+        assert collection.count() == before
+
+
+def test_incremental_reingestion_replaces_migrated_inline_chunks():
+    documents = [("ingestion", TEXT)]
+    collection = legacy_collection(documents)
+    with tempfile.TemporaryDirectory() as state_dir:
+        migrate_collection(collection, state_dir=state_dir)
+        embedded = ingest(collection, documents, state_dir, incremental=True)
+    assert collection.count() == embedded
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,57 @@
+"""
+Tests for the local message classification of the fast-path router
+(utils/router.py) and the planner (utils/planner.py);
+no embedding API needed:
+
+    python test/test_router.py
+    python -m pytest test/test_router.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import time
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+from utils.planner import Planner
+from utils.router import SUPERVISOR, FastRouter
+
+# Inputs the rules backtrack quadratically on: seconds each at 50-60 KB
+LONG_MESSAGES = ["issue " * 10000, "send " * 10000, "There is an issue with the build step. " * 1500]
+
+
+def test_long_messages_skip_local_classification():
+    router = FastRouter(embedder=None)
+    for text in LONG_MESSAGES:
+        started = time.perf_counter()
+        assert asyncio.run(router.classify(text)) == (SUPERVISOR, "too_long")
+        assert time.perf_counter() - started < 0.1
+
+
+def test_planner_skips_long_messages():
+    planner = Planner(model=None)
+    for text in LONG_MESSAGES:
+        started = time.perf_counter()
+        assert not planner.looks_compound(text)
+        assert time.perf_counter() - started < 0.1
+    assert planner.looks_compound("email bob@example.com the report and create a jira ticket for it")
+
+
+def test_short_messages_still_match_rules():
+    router = FastRouter(embedder=None)
+    assert asyncio.run(router.classify("list my jira projects")) == ("jira_handler", "rule")
+
+
+if __name__ == "__main__":
+    for test in (
+        test_long_messages_skip_local_classification,
+        test_planner_skips_long_messages,
+        test_short_messages_still_match_rules,
+    ):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,95 @@
+"""
+Tests for the semantic response cache (utils/semantic_cache.py) with a fake
+embedder; no embedding API needed:
+
+    python test/test_semantic_cache.py
+    python -m pytest test/test_semantic_cache.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+
+from test.conftest import set_env_defaults
+
+set_env_defaults()
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from utils import metrics
+from utils.semantic_cache import SemanticCache, context_key, EMPTY_CONTEXT
+
+
+class FakeEmbedder:
+    """Embeds every query on the same axis, so any two queries are near-duplicates."""
+
+    async def aembed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+def test_entries_only_match_the_same_conversation_history():
+    cache = SemanticCache(embedder=FakeEmbedder(), enabled=True)
+    thread_a = context_key([HumanMessage("list our open projects"), AIMessage("Apollo and Hermes")])
+    thread_b = context_key([HumanMessage("list the team leads"), AIMessage("Ana and Bo")])
+
+    async def scenario():
+        entry, vector = await cache.lookup("what about the second one?", thread_a)
+        assert entry is None
+        cache.store("what about the second one?", vector, "Hermes is ...", {"researcher"}, 2.0, thread_a)
+
+        # The same follow-up in another conversation, or in a fresh thread, runs the graph
+        assert (await cache.lookup("what about the second one?", thread_b))[0] is None
+        assert (await cache.lookup("what about the second one?", EMPTY_CONTEXT))[0] is None
+        # After the same history it is served from the cache
+        entry, _ = await cache.lookup("what about the second one?", thread_a)
+        assert entry is not None and entry.response == "Hermes is ..."
+
+    asyncio.run(scenario())
+    assert cache.stats["hits"] == 1 and cache.stats["misses"] == 3
+    assert context_key([]) == EMPTY_CONTEXT != thread_a
+
+
+def test_hit_rate_and_latency_saved_are_exported():
+    cache = SemanticCache(embedder=FakeEmbedder(), enabled=True)
+    registry = metrics.Registry()
+    metrics.register_response_cache_metrics(cache, registry)
+
+    async def scenario():
+        _, vector = await cache.lookup("what is a def in python")
+        cache.store("what is a def in python", vector, "A function definition.", {"researcher"}, 1.5)
+        await cache.lookup("what's def in Python?")
+        await cache.lookup("send an email to Bo")
+
+    asyncio.run(scenario())
+    lines = registry.render().splitlines()
+    assert 'assistant_response_cache_lookups_total{result="hit"} 1' in lines
+    assert 'assistant_response_cache_lookups_total{result="miss"} 1' in lines
+    assert 'assistant_response_cache_lookups_total{result="bypass"} 1' in lines
+    assert "assistant_response_cache_latency_saved_seconds_total 1.5" in lines
+
+
+def test_runs_without_an_answer_are_not_cached():
+    from server import extract_final_response
+
+    cache = SemanticCache(embedder=FakeEmbedder(), enabled=True)
+    # A run whose only AI message is the handoff back to the supervisor
+    stream_results = [{"researcher": {"messages": [AIMessage("Transferring back to supervisor")]}}]
+    response = extract_final_response(stream_results)
+    assert response is None
+
+    async def scenario():
+        _, vector = await cache.lookup("what is our refund policy?")
+        cache.store("what is our refund policy?", vector, response, {"researcher"}, 3.0)
+        return await cache.lookup("what's our refund policy?")
+
+    entry, _ = asyncio.run(scenario())
+    assert entry is None and cache.stats["stores"] == 0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,167 @@
+"""
+Tests for request tracing (utils/tracing.py) on a real agent graph with a
+scripted chat model; no LLM, vector store or collector needed:
+
+    python test/test_tracing.py
+    python -m pytest test/test_tracing.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+
+from test.conftest import ScriptedModel, set_env_defaults
+
+set_env_defaults()
+
+from langchain.agents import create_agent
+from langchain_core.tools import tool
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+
+from utils import tracing
+
+
+class FakeBackend:
+    def query(self, text: str) -> str:
+        time.sleep(0.02)
+        return f"found {text}"
+
+    def fail(self, text: str) -> str:
+        raise ConnectionError("backend down")
+
+
+backend = tracing.traced_client(FakeBackend(), "fake_backend")
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up in the backend."""
+    return backend.query(query)
+
+
+@tool
+async def lookup_async(query: str) -> str:
+    """Look something up in the backend from the event loop."""
+    return await asyncio.to_thread(backend.query, query)
+
+
+@tool
+def broken_lookup(query: str) -> str:
+    """A lookup whose backend is down."""
+    return backend.fail(query)
+
+
+def run_agent(tool_name: str, tools) -> tuple[str | Exception, dict]:
+    """The agent's answer (or the error it raised) and the request's trace."""
+    thread_id = f"test-{uuid.uuid4().hex}"
+    model = ScriptedModel(tool_name=tool_name, tool_args={"query": "rate limits"}, answer="Answer: {result}", latency=0.01)
+    agent = create_agent(model, tools=tools, name="researcher")
+
+    async def scenario():
+        with tracing.request_trace("POST /query", thread_id) as callbacks:
+            result = await agent.ainvoke(
+                {"messages": [{"role": "user", "content": "what are the rate limits?"}]},
+                config={"callbacks": callbacks},
+            )
+        return result["messages"][-1].content
+
+    try:
+        answer = asyncio.run(scenario())
+    except Exception as e:
+        answer = e
+    traces = tracing.recent_waterfalls(thread_id)
+    assert len(traces) == 1
+    return answer, traces[0]
+
+
+def spans_named(trace_data: dict, prefix: str) -> list[dict]:
+    return [s for s in trace_data["spans"] if s["name"].startswith(prefix)]
+
+
+def parent_of(trace_data: dict, span: dict) -> dict:
+    return next(s for s in trace_data["spans"] if s["span_id"] == span["parent_id"])
+
+
+def test_nodes_llm_calls_tools_and_backends_nest_under_the_request():
+    for tool_name, tools in (("lookup", [lookup]), ("lookup_async", [lookup_async])):
+        answer, trace_data = run_agent(tool_name, tools)
+        assert answer == "Answer: found rate limits"
+
+        root = trace_data["spans"][0]
+        assert root["name"] == "POST /query" and root["depth"] == 0 and root["parent_id"] is None
+        assert trace_data["thread_id"] == root["attributes"]["thread_id"]
+
+        chats = spans_named(trace_data, "chat ")
+        assert len(chats) == 2 and all(parent_of(trace_data, s)["name"] == "node model" for s in chats)
+        (tool_span,) = spans_named(trace_data, "tool ")
+        assert tool_span["name"] == f"tool {tool_name}" and parent_of(trace_data, tool_span)["name"] == "node tools"
+        # The backend call made inside the tool (even from a worker thread) is the tool's child
+        (backend_span,) = spans_named(trace_data, "fake_backend.query")
+        assert parent_of(trace_data, backend_span) is not None and backend_span["parent_id"] == tool_span["span_id"]
+        assert backend_span["duration_ms"] >= 20 and backend_span["depth"] == tool_span["depth"] + 1
+
+        offsets = [s["offset_ms"] for s in trace_data["spans"]]
+        assert offsets == sorted(offsets)
+        assert all(s["status"] != "ERROR" for s in trace_data["spans"])
+
+
+def test_failures_are_marked_on_their_spans():
+    answer, trace_data = run_agent("broken_lookup", [broken_lookup])
+    (backend_span,) = spans_named(trace_data, "fake_backend.fail")
+    (tool_span,) = spans_named(trace_data, "tool broken_lookup")
+    (node_span,) = spans_named(trace_data, "node tools")
+    assert isinstance(answer, ConnectionError)
+    # The error is marked on every span it went through, up to the request
+    assert all(s["status"] == "ERROR" for s in (backend_span, tool_span, node_span, trace_data["spans"][0]))
+    assert all(s["status"] != "ERROR" for s in spans_named(trace_data, "chat "))
+
+    text = tracing.render_waterfall(trace_data)
+    assert "fake_backend.fail !" in text and text.count("\n") == len(trace_data["spans"])
+
+
+def test_only_recent_traces_are_kept_per_thread():
+    recent = tracing.RecentTraces(max_traces=2, per_thread=2)
+    provider = TracerProvider()
+    provider.add_span_processor(recent)
+    tracer = provider.get_tracer("test")
+    for i in range(3):
+        with tracer.start_as_current_span("request", attributes={"thread_id": "a"}):
+            with tracer.start_as_current_span(f"step {i}"):
+                pass
+    with tracer.start_as_current_span("request", attributes={"thread_id": "b"}):
+        pass
+
+    traces = [tracing.waterfall(spans) for spans in recent.traces("a", limit=5)]
+    # Thread "a" still lists its last two traces, but only the newest is still held
+    assert [t["spans"][1]["name"] for t in traces] == ["step 2"]
+    assert len(recent.traces("b")) == 1 and recent.snapshot() == {"traces": 2, "threads": 2}
+
+
+def test_file_exporter_writes_one_span_per_line():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "traces.jsonl")
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(tracing.FileSpanExporter(path)))
+        tracer = provider.get_tracer("test")
+        with tracer.start_as_current_span("request", attributes={"thread_id": "t1"}):
+            with tracer.start_as_current_span("chroma.query"):
+                pass
+        with open(path, encoding="utf-8") as f:
+            spans = [json.loads(line) for line in f]
+    assert [s["name"] for s in spans] == ["chroma.query", "request"]
+    assert spans[0]["context"]["trace_id"] == spans[1]["context"]["trace_id"]
+    assert spans[1]["attributes"]["thread_id"] == "t1"
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
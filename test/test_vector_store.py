@@ -0,0 +1,100 @@
+"""
+Tests for the memory-mapped NumPy vector store (utils/vector_store.py); no
+services needed:
+
+    python test/test_vector_store.py
+    python -m pytest test/test_vector_store.py
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import tempfile
+
+import numpy as np
+
+from utils import vector_store
+from utils.vector_store import LocalVectorClient
+
+
+def random_vectors(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_hnsw_index_follows_writes_without_rebuilding():
+    vectors = random_vectors(300)
+    with tempfile.TemporaryDirectory() as directory:
+        collection = LocalVectorClient(directory, index_type="hnsw").get_or_create_collection("docs")
+        collection.add(ids=[f"d{i}" for i in range(200)], embeddings=vectors[:200].tolist())
+        assert collection.query(vectors[:1].tolist(), n_results=1)["ids"] == [["d0"]]
+        index = collection._hnsw
+
+        collection.add(ids=[f"d{i}" for i in range(200, 300)], embeddings=vectors[200:].tolist())
+        collection.delete(ids=["d0", "d1"])
+        result = collection.query(vectors[[0, 250]].tolist(), n_results=3)
+        # New rows are searchable and deleted ones gone, on the same graph
+        assert collection._hnsw is index
+        assert result["ids"][1][0] == "d250" and "d0" not in result["ids"][0]
+        assert len(collection.query(vectors[:1].tolist(), n_results=500)["ids"][0]) == 298
+
+
+def test_dead_rows_are_compacted_away():
+    vectors = random_vectors(400)
+    with tempfile.TemporaryDirectory() as directory:
+        client = LocalVectorClient(directory)
+        collection = client.get_or_create_collection("docs")
+        ids = [f"d{i}" for i in range(200)]
+        collection.add(ids=ids, embeddings=vectors[:200].tolist(), documents=ids)
+        # Re-embedding every record leaves 200 dead rows behind
+        collection.upsert(ids=ids, embeddings=vectors[200:].tolist(), documents=ids)
+        collection.delete(ids=ids[:50])
+        assert os.path.getsize(collection.vectors_path) == 400 * 16 * 4
+        assert collection.compact() == 250 and os.path.getsize(collection.vectors_path) == 150 * 16 * 4
+        assert [name for name in os.listdir(directory) if name.endswith(".f32")] == ["docs.1.f32"]
+
+        # Search and stored embeddings follow the renumbered rows, in this client and a fresh one
+        for reader in (collection, LocalVectorClient(directory).get_or_create_collection("docs")):
+            assert reader.query(vectors[[250]].tolist(), n_results=1)["ids"] == [["d50"]]
+            stored = reader.get(ids=["d199"], include=["embeddings"])["embeddings"][0]
+            assert np.allclose(stored, vectors[399] / np.linalg.norm(vectors[399]), atol=1e-6)
+
+
+def test_compaction_runs_once_dead_rows_outnumber_live_ones():
+    vectors = random_vectors(40)
+    min_dead_rows = vector_store.VECTOR_STORE_COMPACT_MIN_DEAD_ROWS
+    vector_store.VECTOR_STORE_COMPACT_MIN_DEAD_ROWS = 10
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            collection = LocalVectorClient(directory).get_or_create_collection("docs")
+            collection.add(ids=[f"d{i}" for i in range(40)], embeddings=vectors.tolist())
+            collection.delete(ids=[f"d{i}" for i in range(19)])
+            assert collection.generation == 0
+            collection.delete(ids=["d19", "d20"])
+            assert collection.generation == 1 and os.path.getsize(collection.vectors_path) == 19 * 16 * 4
+    finally:
+        vector_store.VECTOR_STORE_COMPACT_MIN_DEAD_ROWS = min_dead_rows
+
+
+def test_query_skips_hits_deleted_before_their_records_are_read():
+    vectors = random_vectors(20)
+    with tempfile.TemporaryDirectory() as directory:
+        collection = LocalVectorClient(directory).get_or_create_collection("docs")
+        collection.add(ids=[f"d{i}" for i in range(20)], embeddings=vectors.tolist(), documents=["x"] * 20)
+        read_records = collection.get
+
+        def get_after_a_delete(ids=None, **kwargs):
+            collection.delete(ids=[ids[0]])
+            return read_records(ids=ids, **kwargs)
+
+        collection.get = get_after_a_delete
+        result = collection.query(vectors[:1].tolist(), n_results=3)
+        assert len(result["ids"][0]) == len(result["distances"][0]) == len(result["documents"][0]) == 2
+        assert "d0" not in result["ids"][0]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_") and callable(test):
+            test()
+            print(f"✅ {name}")
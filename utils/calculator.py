@@ -0,0 +1,320 @@
+"""
+Safe arithmetic engine for the calculator tools.
+
+Expressions are parsed with `ast` and only a whitelist of nodes is accepted:
+numbers, + - * / // % and ** (`^` is read as a power, as on calculators),
+unary signs, the constants pi/e/tau, named variables in batch mode and calls
+to whitelisted math functions. Anything else (attributes, subscripts,
+comprehensions, lambdas, strings, ...) is rejected before evaluation.
+
+Evaluation is bounded: expressions have a length and node budget, every
+intermediate result must stay below CALCULATOR_MAX_MAGNITUDE (powers and
+factorials are checked before they are computed, so `9**9**9` fails at once),
+and a deadline aborts anything that still runs too long. In batch mode a row
+that breaks the magnitude limit becomes NaN instead of failing the batch.
+
+Parsed expressions are compiled into closures and cached by text. The same
+compiled tree evaluates one expression over arrays of inputs with NumPy in
+batch mode.
+"""
+
+import os
+import ast
+import math
+import time
+import warnings
+from functools import lru_cache
+
+import numpy as np
+
+# =========================
+# Configuration
+# =========================
+CALCULATOR_MAX_LENGTH = int(os.getenv("CALCULATOR_MAX_LENGTH", "500"))
+CALCULATOR_MAX_NODES = int(os.getenv("CALCULATOR_MAX_NODES", "200"))
+CALCULATOR_MAX_MAGNITUDE = float(os.getenv("CALCULATOR_MAX_MAGNITUDE", "1e300"))
+CALCULATOR_TIMEOUT_SECONDS = float(os.getenv("CALCULATOR_TIMEOUT_SECONDS", "1.0"))
+CALCULATOR_CACHE_SIZE = int(os.getenv("CALCULATOR_CACHE_SIZE", "1024"))
+CALCULATOR_MAX_BATCH = int(os.getenv("CALCULATOR_MAX_BATCH", "1000000"))
+
+_MAX_DIGITS = math.log10(CALCULATOR_MAX_MAGNITUDE)
+
+
+class CalculatorError(ValueError):
+    """The expression is not allowed, or its evaluation broke a limit."""
+
+
+# =========================
+# Whitelists
+# =========================
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau}
+
+
+def _factorial(n):
+    if isinstance(n, float) and n.is_integer():
+        n = int(n)
+    if not isinstance(n, int) or n < 0:
+        raise CalculatorError("factorial() needs a non-negative integer")
+    if math.lgamma(n + 1) / math.log(10) > _MAX_DIGITS:
+        raise CalculatorError("Result too large")
+    return math.factorial(n)
+
+
+def _log(x, base=None):
+    return math.log(x) if base is None else math.log(x, base)
+
+
+def _np_log(x, base=None):
+    return np.log(x) if base is None else np.log(x) / np.log(base)
+
+
+# name: (scalar implementation, NumPy implementation or None, allowed argument counts)
+FUNCTIONS = {
+    "abs": (abs, np.abs, (1,)),
+    "round": (round, np.round, (1, 2)),
+    "floor": (math.floor, np.floor, (1,)),
+    "ceil": (math.ceil, np.ceil, (1,)),
+    "sqrt": (math.sqrt, np.sqrt, (1,)),
+    "exp": (math.exp, np.exp, (1,)),
+    "log": (_log, _np_log, (1, 2)),
+    "log10": (math.log10, np.log10, (1,)),
+    "log2": (math.log2, np.log2, (1,)),
+    "sin": (math.sin, np.sin, (1,)),
+    "cos": (math.cos, np.cos, (1,)),
+    "tan": (math.tan, np.tan, (1,)),
+    "asin": (math.asin, np.arcsin, (1,)),
+    "acos": (math.acos, np.arccos, (1,)),
+    "atan": (math.atan, np.arctan, (1,)),
+    "atan2": (math.atan2, np.arctan2, (2,)),
+    "sinh": (math.sinh, np.sinh, (1,)),
+    "cosh": (math.cosh, np.cosh, (1,)),
+    "tanh": (math.tanh, np.tanh, (1,)),
+    "hypot": (math.hypot, np.hypot, (2,)),
+    "degrees": (math.degrees, np.degrees, (1,)),
+    "radians": (math.radians, np.radians, (1,)),
+    "min": (min, np.minimum, (2,)),
+    "max": (max, np.maximum, (2,)),
+    "factorial": (_factorial, None, (1,)),
+}
+
+_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Name, ast.Call, ast.Load,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.BitXor,
+    ast.UAdd, ast.USub,
+)
+
+
+# =========================
+# Evaluation
+# =========================
+class _Context:
+    __slots__ = ("variables", "deadline")
+
+    def __init__(self, variables: dict, deadline: float):
+        self.variables = variables
+        self.deadline = deadline
+
+
+def _checked(value, ctx: _Context):
+    """Enforce the deadline and the magnitude limit on an intermediate result."""
+    if time.perf_counter() > ctx.deadline:
+        raise CalculatorError("Evaluation took too long")
+    if isinstance(value, (np.ndarray, np.floating)):
+        # In batch mode a row beyond the limit is invalid like any other: NaN, not an error
+        with np.errstate(invalid="ignore"):
+            return np.where(np.abs(value) <= CALCULATOR_MAX_MAGNITUDE, value, np.nan)
+    if isinstance(value, complex):
+        raise CalculatorError("Complex results are not supported")
+    if (isinstance(value, float) and math.isinf(value)) or abs(value) > CALCULATOR_MAX_MAGNITUDE:
+        raise CalculatorError("Result too large")
+    return value
+
+
+def _power(base, exponent):
+    if isinstance(base, np.ndarray) or isinstance(exponent, np.ndarray):
+        with np.errstate(all="ignore"):
+            return np.power(base, exponent)
+    if base == 0:
+        if exponent < 0:
+            raise CalculatorError("Division by zero")
+        return base ** exponent
+    # Reject results beyond the magnitude limit before computing them
+    if exponent * math.log10(abs(base)) > _MAX_DIGITS:
+        raise CalculatorError("Result too large")
+    return base ** exponent
+
+
+_BINARY = {
+    ast.Add: lambda a, b: a + b,
+    ast.Sub: lambda a, b: a - b,
+    ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b,
+    ast.FloorDiv: lambda a, b: a // b,
+    ast.Mod: lambda a, b: a % b,
+    ast.Pow: _power,
+    ast.BitXor: _power,
+}
+
+_UNARY = {
+    ast.UAdd: lambda a: +a,
+    ast.USub: lambda a: -a,
+}
+
+
+def _validate(tree: ast.AST, batch: bool):
+    call_targets = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    count = 0
+    for node in ast.walk(tree):
+        count += 1
+        if count > CALCULATOR_MAX_NODES:
+            raise CalculatorError(f"Expression is too complex (over {CALCULATOR_MAX_NODES} nodes)")
+        if not isinstance(node, _NODES):
+            raise CalculatorError(f"'{type(node).__name__}' is not allowed")
+        if isinstance(node, ast.Constant) and (
+            isinstance(node.value, bool) or not isinstance(node.value, (int, float))
+        ):
+            raise CalculatorError(f"Constant {node.value!r} is not a number")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise CalculatorError(f"Function '{ast.unparse(node.func)}' is not allowed")
+            scalar, vector, arities = FUNCTIONS[node.func.id]
+            if node.keywords or len(node.args) not in arities:
+                raise CalculatorError(f"Wrong arguments for {node.func.id}()")
+            if batch and vector is None:
+                raise CalculatorError(f"{node.func.id}() is not supported in batch mode")
+        if isinstance(node, ast.Name) and node.id in FUNCTIONS and id(node) not in call_targets:
+            raise CalculatorError(f"'{node.id}' is a function")
+
+
+def _compile(node: ast.AST, batch: bool):
+    """Turn a validated AST node into a closure evaluating it against a _Context."""
+    if isinstance(node, ast.Expression):
+        return _compile(node.body, batch)
+
+    if isinstance(node, ast.Constant):
+        value = float(node.value) if batch else node.value
+        return lambda ctx: _checked(value, ctx)
+
+    if isinstance(node, ast.Name):
+        name = node.id
+        if name in CONSTANTS:
+            value = CONSTANTS[name]
+            return lambda ctx: value
+
+        def variable(ctx):
+            try:
+                return ctx.variables[name]
+            except KeyError:
+                raise CalculatorError(f"Unknown name '{name}'") from None
+        return variable
+
+    if isinstance(node, ast.UnaryOp):
+        operand = _compile(node.operand, batch)
+        op = _UNARY[type(node.op)]
+        return lambda ctx: _checked(op(operand(ctx)), ctx)
+
+    if isinstance(node, ast.BinOp):
+        left = _compile(node.left, batch)
+        right = _compile(node.right, batch)
+        op = _BINARY[type(node.op)]
+        return lambda ctx: _checked(op(left(ctx), right(ctx)), ctx)
+
+    if isinstance(node, ast.Call):
+        scalar, vector, _ = FUNCTIONS[node.func.id]
+        function = vector if batch else scalar
+        args = [_compile(arg, batch) for arg in node.args]
+        return lambda ctx: _checked(function(*(arg(ctx) for arg in args)), ctx)
+
+    raise CalculatorError(f"'{type(node).__name__}' is not allowed")
+
+
+@lru_cache(maxsize=CALCULATOR_CACHE_SIZE)
+def compile_expression(expression: str, batch: bool = False):
+    """
+    Parse, validate and compile an expression (cached by text).
+
+    Returns:
+        The compiled closure and the sorted names of its free variables.
+    """
+    if len(expression) > CALCULATOR_MAX_LENGTH:
+        raise CalculatorError(f"Expression is longer than {CALCULATOR_MAX_LENGTH} characters")
+    text = expression.strip().replace("×", "*").replace("÷", "/").rstrip("=").strip()
+    try:
+        with warnings.catch_warnings():
+            # e.g. "1sqrt" warns "invalid decimal literal" before failing
+            warnings.simplefilter("ignore", SyntaxWarning)
+            tree = ast.parse(text, mode="eval")
+    except SyntaxError:
+        raise CalculatorError("Invalid syntax") from None
+    _validate(tree, batch)
+    names = sorted({
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and node.id not in CONSTANTS and node.id not in FUNCTIONS
+    })
+    return _compile(tree, batch), names
+
+
+def _run(function, variables: dict, timeout: float):
+    ctx = _Context(variables, time.perf_counter() + timeout)
+    try:
+        return function(ctx)
+    except CalculatorError:
+        raise
+    except ZeroDivisionError:
+        raise CalculatorError("Division by zero") from None
+    except (ValueError, OverflowError, TypeError) as e:
+        raise CalculatorError(str(e)) from None
+
+
+def evaluate(expression: str, variables: dict = None, timeout: float = CALCULATOR_TIMEOUT_SECONDS):
+    """Evaluate one expression to an int or float."""
+    function, names = compile_expression(expression)
+    variables = variables or {}
+    missing = [name for name in names if name not in variables]
+    if missing:
+        raise CalculatorError(f"Unknown name(s): {', '.join(missing)}")
+    return _run(function, variables, timeout)
+
+
+def evaluate_batch(expression: str, variables: dict, timeout: float = CALCULATOR_TIMEOUT_SECONDS) -> np.ndarray:
+    """
+    Evaluate one expression over arrays of inputs with NumPy.
+
+    Args:
+        expression: Expression over the variable names, e.g. "x**2 + 3*y"
+        variables: Name -> sequence of numbers; all sequences have the same length
+            (scalars are broadcast)
+
+    Returns:
+        A float64 array with one result per input row; invalid rows (e.g. sqrt
+        of a negative number, division by zero or a result beyond
+        CALCULATOR_MAX_MAGNITUDE) are NaN.
+    """
+    function, names = compile_expression(expression, batch=True)
+    missing = [name for name in names if name not in variables]
+    if missing:
+        raise CalculatorError(f"Unknown name(s): {', '.join(missing)}")
+    arrays = {}
+    for name in names:
+        try:
+            arrays[name] = np.asarray(variables[name], dtype=np.float64)
+        except (TypeError, ValueError):
+            raise CalculatorError(f"Variable '{name}' must be numbers") from None
+        if arrays[name].ndim > 1 or arrays[name].size > CALCULATOR_MAX_BATCH:
+            raise CalculatorError(f"Variable '{name}' must be a list of at most {CALCULATOR_MAX_BATCH} numbers")
+    sizes = {array.size for array in arrays.values() if array.ndim == 1}
+    if len(sizes) > 1:
+        raise CalculatorError("All variables must have the same length")
+    size = sizes.pop() if sizes else 1
+    with np.errstate(all="ignore"):
+        result = _run(function, arrays, timeout)
+    return np.broadcast_to(np.asarray(result, dtype=np.float64), (size,)).copy()
+
+
+def format_number(value) -> str:
+    """Render a result without float noise (0.1 + 0.2 -> 0.3)."""
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e16:
+            return str(int(value))
+        return f"{value:.15g}"
+    return str(value)
@@ -0,0 +1,386 @@
+"""
+Pooled, WAL-mode SQLite checkpoint store for the supervisor graph.
+
+One dedicated writer thread owns the only write connection and commits every
+write that queued up while the previous commit was running in a single
+transaction, so the checkpoint and pending writes of a super-step land in one
+commit. Reads go through a small pool of read-only connections, which WAL
+journaling lets run concurrently with the writer.
+"""
+
+import os
+import json
+import queue
+import sqlite3
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import closing, contextmanager
+from typing import Any, Iterator, AsyncIterator, Sequence, cast
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.utils import search_where
+
+from .metrics import checkpoint_commit_duration, checkpoint_write_duration
+from .util import logger
+
+# =========================
+# Configuration
+# =========================
+CHECKPOINT_DB_PATH = os.getenv("CHECKPOINT_DB_PATH", "checkpoints.db")
+CHECKPOINT_READ_POOL_SIZE = int(os.getenv("CHECKPOINT_READ_POOL_SIZE", "4"))
+CHECKPOINT_WRITE_BATCH_MAX = int(os.getenv("CHECKPOINT_WRITE_BATCH_MAX", "256"))
+CHECKPOINT_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_BUSY_TIMEOUT_MS", "5000"))
+
+_STOP = object()
+
+_UPSERT_CHECKPOINT = (
+    "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, "
+    "parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+_UPSERT_WRITES = (
+    "INSERT OR REPLACE INTO writes (thread_id, checkpoint_ns, checkpoint_id, "
+    "task_id, idx, channel, type, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_WRITES = _UPSERT_WRITES.replace("INSERT OR REPLACE", "INSERT OR IGNORE")
+
+
+def _configure_connection(conn: sqlite3.Connection, read_only: bool = False):
+    """Apply the pragmas every checkpoint connection shares."""
+    conn.execute(f"PRAGMA busy_timeout={CHECKPOINT_BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable across application crashes in WAL mode
+    conn.execute("PRAGMA synchronous=NORMAL")
+    if read_only:
+        conn.execute("PRAGMA query_only=ON")
+
+
+class PooledSqliteSaver(SqliteSaver):
+    """SqliteSaver with a dedicated writer thread, group commits and a reader pool."""
+
+    def __init__(
+        self,
+        db_path: str = CHECKPOINT_DB_PATH,
+        pool_size: int = CHECKPOINT_READ_POOL_SIZE,
+        batch_max: int = CHECKPOINT_WRITE_BATCH_MAX,
+        **kwargs,
+    ):
+        if db_path == ":memory:":
+            raise ValueError("PooledSqliteSaver needs a file path; readers cannot share an in-memory database")
+
+        writer = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        _configure_connection(writer)
+        super().__init__(writer, **kwargs)
+        self.setup()
+
+        self.db_path = db_path
+        self.batch_max = batch_max
+        self.commits = 0
+        self.committed_ops = 0
+
+        self._readers = queue.Queue()
+        for _ in range(pool_size):
+            reader = sqlite3.connect(db_path, check_same_thread=False)
+            _configure_connection(reader, read_only=True)
+            self._readers.put(reader)
+        self._pool_size = pool_size
+
+        self._writes = queue.Queue()
+        # Set when the write connection fails in a way a rollback cannot recover from
+        self._broken: BaseException | None = None
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="checkpoint-writer", daemon=True
+        )
+        self._writer_thread.start()
+
+    @classmethod
+    @contextmanager
+    def from_conn_string(cls, conn_string: str, **kwargs) -> Iterator["PooledSqliteSaver"]:
+        """Open a pooled saver on a database path and close it on exit."""
+        saver = cls(conn_string, **kwargs)
+        try:
+            yield saver
+        finally:
+            saver.close()
+
+    def close(self):
+        """Flush queued writes, stop the writer thread and close all connections."""
+        self._writes.put(_STOP)
+        self._writer_thread.join()
+        self.conn.close()
+        for _ in range(self._pool_size):
+            self._readers.get().close()
+
+    # =========================
+    # Writer thread
+    # =========================
+
+    def _writer_loop(self):
+        """Drain the write queue, committing everything that is ready at once."""
+        while True:
+            op = self._writes.get()
+            if op is _STOP:
+                return
+            batch = [op]
+            stop = False
+            while len(batch) < self.batch_max:
+                try:
+                    op = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+                if op is _STOP:
+                    stop = True
+                    break
+                batch.append(op)
+
+            if self._broken is None:
+                try:
+                    self._commit_batch(batch)
+                except Exception as exc:
+                    logger.exception("❌ Checkpoint writer failed; rejecting further writes")
+                    self._broken = exc
+            if self._broken is not None:
+                # Keep draining so no caller waits forever on a write that will never commit
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(self._broken)
+            if stop:
+                return
+
+    def _commit_batch(self, batch):
+        """
+        Run a batch of statements in one transaction, isolating failures per op.
+
+        Raises only when the connection cannot be rolled back to a clean state.
+        """
+        started = time.perf_counter()
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            for statements, _ in batch:
+                for sql, rows in statements:
+                    self.conn.executemany(sql, rows)
+            self.conn.execute("COMMIT")
+        except Exception as exc:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+            if len(batch) == 1:
+                batch[0][1].set_exception(exc)
+                return
+            logger.warning("Checkpoint batch of %s writes failed, retrying one by one: %s", len(batch), exc)
+            for op in batch:
+                self._commit_batch([op])
+            return
+
+        checkpoint_commit_duration.observe(time.perf_counter() - started)
+        self.commits += 1
+        self.committed_ops += len(batch)
+        for _, future in batch:
+            future.set_result(None)
+
+    def _submit(self, statements, op: str) -> Future:
+        """Queue statements for the writer thread and return a future for their commit."""
+        if self._broken is not None:
+            raise RuntimeError("Checkpoint writer is broken") from self._broken
+        future = Future()
+        started = time.perf_counter()
+        future.add_done_callback(lambda _: checkpoint_write_duration.observe(time.perf_counter() - started, op))
+        self._writes.put((statements, future))
+        return future
+
+    # =========================
+    # Statement builders
+    # =========================
+
+    def _checkpoint_statements(self, config, checkpoint, metadata):
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        type_, serialized_checkpoint = self.serde.dumps_typed(checkpoint)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+        row = (
+            str(config["configurable"]["thread_id"]),
+            checkpoint_ns,
+            checkpoint["id"],
+            config["configurable"].get("checkpoint_id"),
+            type_,
+            serialized_checkpoint,
+            serialized_metadata,
+        )
+        next_config = {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+        return [(_UPSERT_CHECKPOINT, [row])], next_config
+
+    def _writes_statements(self, config, writes, task_id):
+        query = _UPSERT_WRITES if all(w[0] in WRITES_IDX_MAP for w in writes) else _INSERT_WRITES
+        rows = [
+            (
+                str(config["configurable"]["thread_id"]),
+                str(config["configurable"]["checkpoint_ns"]),
+                str(config["configurable"]["checkpoint_id"]),
+                task_id,
+                WRITES_IDX_MAP.get(channel, idx),
+                channel,
+                *self.serde.dumps_typed(value),
+            )
+            for idx, (channel, value) in enumerate(writes)
+        ]
+        return [(query, rows)]
+
+    def _delete_statements(self, thread_id):
+        params = [(str(thread_id),)]
+        return [
+            ("DELETE FROM checkpoints WHERE thread_id = ?", params),
+            ("DELETE FROM writes WHERE thread_id = ?", params),
+        ]
+
+    # =========================
+    # Reads
+    # =========================
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        """Borrow a cursor on a pooled read-only connection."""
+        if transaction:
+            raise RuntimeError("PooledSqliteSaver writes go through the writer thread")
+        reader = self._readers.get()
+        cur = reader.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            # End the implicit read transaction so the WAL can be checkpointed
+            reader.rollback()
+            self._readers.put(reader)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints newest first using a pooled reader connection."""
+        where, param_values = search_where(config, filter, before)
+        query = f"""SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata
+        FROM checkpoints
+        {where}
+        ORDER BY checkpoint_id DESC"""
+        if limit is not None:
+            query += " LIMIT ?"
+            param_values = (*param_values, limit)
+        with self.cursor(transaction=False) as cur, closing(cur.connection.cursor()) as wcur:
+            cur.execute(query, param_values)
+            for thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type_, checkpoint, metadata in cur:
+                wcur.execute(
+                    "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+                yield CheckpointTuple(
+                    {
+                        "configurable": {
+                            "thread_id": thread_id,
+                            "checkpoint_ns": checkpoint_ns,
+                            "checkpoint_id": checkpoint_id,
+                        }
+                    },
+                    self.serde.loads_typed((type_, checkpoint)),
+                    cast(CheckpointMetadata, json.loads(metadata) if metadata is not None else {}),
+                    (
+                        {
+                            "configurable": {
+                                "thread_id": thread_id,
+                                "checkpoint_ns": checkpoint_ns,
+                                "checkpoint_id": parent_checkpoint_id,
+                            }
+                        }
+                        if parent_checkpoint_id
+                        else None
+                    ),
+                    [
+                        (task_id, channel, self.serde.loads_typed((wtype, value)))
+                        for task_id, channel, wtype, value in wcur
+                    ],
+                )
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    # =========================
+    # Writes
+    # =========================
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        statements, next_config = self._checkpoint_statements(config, checkpoint, metadata)
+        self._submit(statements, "checkpoint").result()
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._submit(self._writes_statements(config, writes, task_id), "writes").result()
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._submit(self._delete_statements(thread_id), "delete").result()
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        statements, next_config = self._checkpoint_statements(config, checkpoint, metadata)
+        await asyncio.wrap_future(self._submit(statements, "checkpoint"))
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await asyncio.wrap_future(self._submit(self._writes_statements(config, writes, task_id), "writes"))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.wrap_future(self._submit(self._delete_statements(thread_id), "delete"))
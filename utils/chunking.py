@@ -0,0 +1,171 @@
+"""
+Document chunking for ingestion, optionally spread over worker processes.
+
+Splitting text and building chunk metadata is pure CPU work, so on large
+corpora it is fanned out to a process pool in batches of documents. Results
+come back in input order with at most a few batches in flight, so the stage
+streams like the rest of the pipeline.
+
+This module only depends on the text splitter, so worker processes start
+without importing the embedding or LLM clients.
+"""
+
+import os
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+# =========================
+# Configuration
+# =========================
+INGEST_CHUNK_WORKERS = int(os.getenv("INGEST_CHUNK_WORKERS", "1"))
+INGEST_CHUNK_TASK_SIZE = int(os.getenv("INGEST_CHUNK_TASK_SIZE", "64"))
+
+INLINE_SOURCE = "ingestion"
+
+
+@dataclass
+class Chunk:
+    id: str
+    text: str
+    metadata: dict
+
+
+# =========================
+# Content addressing
+# =========================
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_id(source: str, text: str) -> str:
+    """Files are identified by path; in-memory documents by their content."""
+    if source == INLINE_SOURCE:
+        return content_hash(text)[:32]
+    return hashlib.sha256(f"source\0{source}".encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_id(doc_id: str, text: str, occurrence: int) -> str:
+    """
+    Deterministic chunk ID from its document and text.
+
+    `occurrence` numbers repeated identical chunks within one document, so IDs
+    stay unique without depending on position; edits earlier in a document do
+    not change the IDs of the chunks after them.
+    """
+    return hashlib.sha256(f"{doc_id}\0{occurrence}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+# =========================
+# Splitting
+# =========================
+
+def make_text_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+
+def chunk_metadata(source: str, doc_id: str, chunk_index: int, text: str, start: int | None = None) -> dict:
+    """
+    Compact per-chunk metadata.
+
+    The chunk text itself is stored once, as the record's document; metadata
+    only locates it: source, document id, position and character offsets in
+    the document, and a short content hash.
+    """
+    metadata = {
+        "source": source,
+        "doc_id": doc_id,
+        "chunk_index": chunk_index,
+        "chunk_hash": content_hash(text)[:16],
+    }
+    if start is not None:
+        metadata["start"] = start
+        metadata["end"] = start + len(text)
+    return metadata
+
+
+def split_document(source: str, text: str, text_splitter) -> tuple[str, list[Chunk]]:
+    """Chunk one document and assign content-addressed IDs and metadata."""
+    doc_id = document_id(source, text)
+    occurrences = {}
+    result = []
+    search_from = 0
+    for chunk_idx, chunk in enumerate(text_splitter.split_text(text)):
+        occurrence = occurrences.get(chunk, 0)
+        occurrences[chunk] = occurrence + 1
+        # Chunks come in document order and overlap, so each starts after the previous start
+        start = text.find(chunk, search_from)
+        if start < 0:
+            start = text.find(chunk)
+        search_from = start + 1
+        result.append(Chunk(
+            id=chunk_id(doc_id, chunk, occurrence),
+            text=chunk,
+            metadata=chunk_metadata(source, doc_id, chunk_idx, chunk, start if start >= 0 else None),
+        ))
+    return doc_id, result
+
+
+# One splitter per worker process and settings
+_splitters: dict[tuple[int, int], RecursiveCharacterTextSplitter] = {}
+
+
+def _split_task(items: list[tuple[str, str]], chunk_size: int, chunk_overlap: int) -> list[list[Chunk]]:
+    """Worker entry point: split a batch of (source, text) documents."""
+    key = (chunk_size, chunk_overlap)
+    if key not in _splitters:
+        _splitters[key] = make_text_splitter(chunk_size, chunk_overlap)
+    return [split_document(source, text, _splitters[key])[1] for source, text in items]
+
+
+def split_documents(
+    items: Iterable[tuple],
+    chunk_size: int,
+    chunk_overlap: int,
+    workers: int = INGEST_CHUNK_WORKERS,
+    task_size: int = INGEST_CHUNK_TASK_SIZE,
+) -> Iterator[tuple[tuple, list[Chunk]]]:
+    """
+    Chunk documents, in order, using `workers` processes.
+
+    Args:
+        items: Tuples starting with (source, text); extra fields are
+            passed through to the output untouched
+        chunk_size: Maximum size of each text chunk
+        chunk_overlap: Number of characters to overlap between chunks
+        workers: Worker processes; 1 or less chunks in the calling process
+        task_size: Documents sent to a worker per task
+
+    Yields:
+        (item, chunks) pairs in input order.
+    """
+    if workers <= 1:
+        text_splitter = make_text_splitter(chunk_size, chunk_overlap)
+        for item in items:
+            source, text = item[:2]
+            yield item, split_document(source, text, text_splitter)[1]
+        return
+
+    iterator = iter(items)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        # Two tasks per worker keeps every process busy while bounding memory
+        while True:
+            while len(pending) < 2 * workers and (batch := list(islice(iterator, task_size))):
+                task = [item[:2] for item in batch]
+                pending.append((batch, pool.submit(_split_task, task, chunk_size, chunk_overlap)))
+            if not pending:
+                break
+            batch, future = pending.popleft()
+            yield from zip(batch, future.result())
@@ -0,0 +1,316 @@
+"""
+Exact-match cache of LLM completions.
+
+Supervisor routing, and worker calls on identical histories, repeat across
+threads and restarts, and every repeat paid full LLM latency. Completions are
+now cached under a hash of the request payload sent upstream (model,
+parameters, messages and tool schemas), so only byte-identical requests hit:
+
+- memory: an LRU of the LLM_CACHE_MEMORY_ENTRIES most recent completions
+- disk: a SQLite table shared across restarts, capped at LLM_CACHE_MAX_MB by
+  evicting the least recently used entries
+- expiry: entries older than LLM_CACHE_TTL_SECONDS are never served
+
+Calls made for agents in LLM_CACHE_SKIP_AGENTS (the side-effecting email and
+Jira agents by default) are neither served from nor stored in the cache. The
+calling agent comes from the run's `agent` metadata (set by the planner) or
+the first segment of its LangGraph namespace.
+
+Streamed and non-streamed calls share entries; a streamed hit is delivered
+as a single chunk.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import AIMessage, AIMessageChunk, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# =========================
+# Configuration
+# =========================
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.db")
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+# The side-effecting agents (see SIDE_EFFECT_AGENTS in utils/semantic_cache.py)
+LLM_CACHE_SKIP_AGENTS = frozenset(
+    name.strip() for name in os.getenv("LLM_CACHE_SKIP_AGENTS", "email_handler,jira_handler").split(",") if name.strip()
+)
+
+# Run metadata naming the agent an LLM call is made for
+AGENT_METADATA_KEY = "agent"
+# Payload fields that change how a completion is delivered, not what it is
+_DELIVERY_FIELDS = ("stream", "stream_options")
+
+
+def calling_agent(metadata: dict) -> str | None:
+    """Agent an LLM call is made for: explicit metadata, else the top-level graph node running it."""
+    if metadata.get(AGENT_METADATA_KEY):
+        return metadata[AGENT_METADATA_KEY]
+    namespace = metadata.get("langgraph_checkpoint_ns") or ""
+    return namespace.split(":", 1)[0] or None
+
+
+def dump_result(result: ChatResult) -> str:
+    return json.dumps(
+        {
+            "generations": [
+                {"message": message_to_dict(g.message), "generation_info": g.generation_info}
+                for g in result.generations
+            ],
+            "llm_output": result.llm_output,
+        },
+        default=str,
+    )
+
+
+def load_result(text: str) -> ChatResult:
+    """A fresh ChatResult; message ids are cleared so each hit gets its own run id."""
+    data = json.loads(text)
+    generations = []
+    for generation in data["generations"]:
+        message = messages_from_dict([generation["message"]])[0]
+        message.id = None
+        message.response_metadata = {**message.response_metadata, "completion_cache": "hit"}
+        generations.append(ChatGeneration(message=message, generation_info=generation["generation_info"]))
+    return ChatResult(generations=generations, llm_output=data["llm_output"])
+
+
+def result_as_chunk(result: ChatResult) -> ChatGenerationChunk:
+    """A cached completion as one streamed chunk."""
+    message = result.generations[0].message
+    chunk = AIMessageChunk(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        usage_metadata=getattr(message, "usage_metadata", None),
+        tool_call_chunks=[
+            {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": index}
+            for index, call in enumerate(getattr(message, "tool_calls", None) or [])
+        ],
+    )
+    return ChatGenerationChunk(message=chunk, generation_info=result.generations[0].generation_info)
+
+
+def chunks_as_result(chunks: list[ChatGenerationChunk]) -> ChatResult | None:
+    """Merge a finished stream into the ChatResult a non-streamed call would have returned."""
+    if not chunks:
+        return None
+    merged = chunks[0]
+    for chunk in chunks[1:]:
+        merged = merged + chunk
+    message = merged.message
+    ai_message = AIMessage(
+        content=message.content,
+        additional_kwargs=message.additional_kwargs,
+        response_metadata=message.response_metadata,
+        usage_metadata=message.usage_metadata,
+        tool_calls=message.tool_calls,
+        invalid_tool_calls=message.invalid_tool_calls,
+    )
+    return ChatResult(generations=[ChatGeneration(message=ai_message, generation_info=merged.generation_info)])
+
+
+class DiskCompletionStore:
+    """SQLite tier, least recently used entries evicted past `max_bytes`; safe to use from several threads."""
+
+    def __init__(self, db_path: str, max_bytes: int):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS completions_accessed ON completions(accessed_at);
+            """
+        )
+        self.bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM completions").fetchone()[0]
+
+    def get(self, key: str, min_created: float) -> tuple[float, str] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, value FROM completions WHERE key = ? AND created_at >= ?", (key, min_created)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return row
+
+    def put(self, key: str, value: str, created: float) -> int:
+        """Store one entry; returns how many entries were evicted to stay under the size cap."""
+        size = len(value.encode())
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM completions WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, created, created),
+            )
+            self.bytes += size - (old[0] if old else 0)
+            return self._evict() if self.bytes > self.max_bytes else 0
+
+    def _evict(self) -> int:
+        # Down to 90% of the cap, so a full cache does not evict on every write
+        target = self.max_bytes * 0.9
+        evicted = 0
+        while self.bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, size FROM completions ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.bytes = 0
+                break
+            for key, size in rows:
+                if self.bytes <= target:
+                    break
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self.bytes -= size
+                evicted += 1
+        return evicted
+
+    def purge_expired(self, min_created: float) -> int:
+        with self._lock:
+            removed = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions WHERE created_at < ?", (min_created,)
+            ).fetchone()
+            self._conn.execute("DELETE FROM completions WHERE created_at < ?", (min_created,))
+            self.bytes -= removed[1]
+            return removed[0]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM completions")
+            self.bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class CompletionCache:
+    """Memory LRU in front of the SQLite tier; the database is opened on first use."""
+
+    def __init__(
+        self,
+        db_path: str = LLM_CACHE_DB_PATH,
+        ttl: float = LLM_CACHE_TTL_SECONDS,
+        memory_entries: int = LLM_CACHE_MEMORY_ENTRIES,
+        max_mb: float = LLM_CACHE_MAX_MB,
+        skip_agents=LLM_CACHE_SKIP_AGENTS,
+        clock=time.time,
+    ):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.skip_agents = frozenset(skip_agents)
+        self.clock = clock
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        self._puts = 0
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "skipped": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    @property
+    def disk(self) -> DiskCompletionStore:
+        if self._disk is None:
+            with self._disk_lock:
+                if self._disk is None:
+                    self._disk = DiskCompletionStore(self.db_path, self.max_bytes)
+        return self._disk
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        """Hash of everything that decides the completion: model, parameters, messages, tools."""
+        relevant = {name: value for name, value in payload.items() if name not in _DELIVERY_FIELDS}
+        return hashlib.sha256(json.dumps(relevant, sort_keys=True, default=str).encode()).hexdigest()
+
+    def accepts(self, metadata: dict) -> bool:
+        """Whether a call (by its run metadata) may use the cache."""
+        if calling_agent(metadata or {}) in self.skip_agents:
+            self.stats["skipped"] += 1
+            return False
+        return True
+
+    def _min_created(self) -> float:
+        return self.clock() - self.ttl
+
+    def _remember(self, key: str, created: float, value: str):
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def aget(self, key: str) -> ChatResult | None:
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] >= self._min_created():
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return load_result(entry[1])
+            del self._memory[key]
+            self.stats["expired"] += 1
+
+        row = await asyncio.to_thread(self.disk.get, key, self._min_created())
+        if row is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["disk_hits"] += 1
+        self._remember(key, *row)
+        return load_result(row[1])
+
+    async def aput(self, key: str, result: ChatResult):
+        if not result.generations:
+            return
+        created, value = self.clock(), dump_result(result)
+        self._remember(key, created, value)
+        self.stats["evictions"] += await asyncio.to_thread(self.disk.put, key, value, created)
+        self.stats["stores"] += 1
+        self._puts += 1
+        if self._puts % 100 == 0:
+            self.stats["expired"] += await asyncio.to_thread(self.disk.purge_expired, self._min_created())
+
+    def clear(self):
+        self._memory.clear()
+        self.disk.clear()
+
+    def snapshot(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        disk = {"disk_bytes": self._disk.bytes} if self._disk is not None else {}
+        return {
+            **self.stats,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            **disk,
+        }
+
+
+completion_cache = CompletionCache() if LLM_CACHE_ENABLED else None
@@ -0,0 +1,218 @@
+"""
+Content-hash keyed embedding cache wrapping an Embeddings model.
+
+Two tiers sit in front of the embedding API:
+
+- memory: an LRU of recently used vectors
+- disk: one directory per model holding `vectors.f32`, a flat float32 array
+  read through a memory map, and `index.bin`, the sha256 digests of the
+  cached texts in row order. Both files are append-only; a lock file
+  serializes writers across processes (API server and ingestion script),
+  and a writer first cuts off whatever an interrupted write left past the
+  last indexed row.
+
+Keys are sha256(model name + text), so re-embedding unchanged text under the
+same model never calls the API, and switching models never serves stale vectors.
+"""
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+import portalocker
+from langchain_core.embeddings import Embeddings
+
+# =========================
+# Configuration
+# =========================
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+EMBEDDING_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "10000"))
+
+_DIGEST_SIZE = hashlib.sha256().digest_size
+
+
+class DiskEmbeddingStore:
+    """Append-only float32 vector file with a digest index, shared across processes."""
+
+    def __init__(self, directory: str, model_name: str):
+        self.directory = os.path.join(directory, re.sub(r"[^A-Za-z0-9._-]", "_", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self.index_path = os.path.join(self.directory, "index.bin")
+        self.meta_path = os.path.join(self.directory, "meta.json")
+        self.lock_path = os.path.join(self.directory, "lock")
+
+        self.dim = None
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path) as f:
+                self.dim = json.load(f)["dim"]
+
+        self._rows: dict[bytes, int] = {}
+        self._index_bytes_read = 0
+        self._mmap = None
+        self._refresh_index()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _refresh_index(self):
+        """Load digests appended since the last read, possibly by another process."""
+        if not os.path.exists(self.index_path):
+            return
+        size = os.path.getsize(self.index_path)
+        size -= size % _DIGEST_SIZE
+        if size <= self._index_bytes_read:
+            return
+        with open(self.index_path, "rb") as f:
+            f.seek(self._index_bytes_read)
+            data = f.read(size - self._index_bytes_read)
+        first_row = self._index_bytes_read // _DIGEST_SIZE
+        for offset in range(0, len(data), _DIGEST_SIZE):
+            self._rows.setdefault(data[offset:offset + _DIGEST_SIZE], first_row + offset // _DIGEST_SIZE)
+        self._index_bytes_read = size
+
+    def _vectors(self, needed_rows: int) -> np.memmap:
+        if self._mmap is None or self._mmap.shape[0] < needed_rows:
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dim))
+        return self._mmap
+
+    def get_many(self, digests: list[bytes]) -> dict[bytes, np.ndarray]:
+        if any(digest not in self._rows for digest in digests):
+            self._refresh_index()
+        rows = {digest: self._rows[digest] for digest in digests if digest in self._rows}
+        if not rows:
+            return {}
+        vectors = self._vectors(max(rows.values()) + 1)
+        return {digest: np.array(vectors[row]) for digest, row in rows.items()}
+
+    def put_many(self, items: dict[bytes, np.ndarray]):
+        if not items:
+            return
+        with portalocker.Lock(self.lock_path, timeout=30):
+            self._refresh_index()
+            new = {digest: vector for digest, vector in items.items() if digest not in self._rows}
+            if not new:
+                return
+            if self.dim is None:
+                self.dim = len(next(iter(new.values())))
+                with open(self.meta_path, "w") as f:
+                    json.dump({"dim": self.dim}, f)
+
+            # Rows are numbered by their position in the index. A write cut off after
+            # the vectors left orphan rows behind the last indexed one: drop them
+            # (and any partial digest) so new rows land where readers will look
+            first_row = self._index_bytes_read // _DIGEST_SIZE
+            for path, size in (
+                (self.index_path, self._index_bytes_read),
+                (self.vectors_path, first_row * self.dim * 4),
+            ):
+                if os.path.exists(path) and os.path.getsize(path) > size:
+                    os.truncate(path, size)
+
+            # Vectors first, then the index, so every indexed row is fully written
+            with open(self.vectors_path, "ab") as f:
+                f.write(np.stack(list(new.values())).astype(np.float32).tobytes())
+            with open(self.index_path, "ab") as f:
+                f.write(b"".join(new.keys()))
+            for offset, digest in enumerate(new):
+                self._rows[digest] = first_row + offset
+            self._index_bytes_read += len(new) * _DIGEST_SIZE
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper serving repeated texts from memory or disk instead of the API."""
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str = None,
+        cache_dir: str = EMBEDDING_CACHE_DIR,
+        memory_entries: int = EMBEDDING_CACHE_MEMORY_ENTRIES,
+    ):
+        self.underlying = underlying
+        # Key on the model the wrapped client really calls
+        self.model_name = model_name or getattr(underlying, "model_name", None) or "default"
+        self.memory_entries = memory_entries
+        self.disk = DiskEmbeddingStore(cache_dir, self.model_name) if cache_dir else None
+        self._memory: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "embedding_calls": 0,
+        }
+
+    def __getattr__(self, name):
+        # Keep attribute access (e.g. model settings) working as on the wrapped model
+        if name == "underlying":
+            raise AttributeError(name)
+        return getattr(self.underlying, name)
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model_name}\0{text}".encode("utf-8")).digest()
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: list[bytes]) -> dict[bytes, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.stats["memory_hits"] += len(found)
+
+            missing = [key for key in keys if key not in found]
+            if missing and self.disk is not None:
+                from_disk = self.disk.get_many(missing)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+                found.update(from_disk)
+                self.stats["disk_hits"] += len(from_disk)
+        return found
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed each distinct missing text once, in a single API call
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = {key: np.asarray(vector, dtype=np.float32) for key, vector in zip(missing, vectors)}
+            with self._lock:
+                self.stats["misses"] += len(missing)
+                self.stats["embedding_calls"] += 1
+                for key, vector in computed.items():
+                    self._remember(key, vector)
+                if self.disk is not None:
+                    self.disk.put_many(computed)
+            found.update(computed)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key].tolist()
+
+        vector = np.asarray(self.underlying.embed_query(text), dtype=np.float32)
+        with self._lock:
+            self.stats["misses"] += 1
+            self.stats["embedding_calls"] += 1
+            self._remember(key, vector)
+            if self.disk is not None:
+                self.disk.put_many({key: vector})
+        return vector.tolist()
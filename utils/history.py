@@ -0,0 +1,215 @@
+"""
+Conversation-history management for the supervisor graph.
+
+The checkpointer keeps every message of a thread, and every turn resends that
+history to the supervisor and the worker agents. This stage runs once at the
+start of each turn and compacts the stored history in place:
+
+- window: keep only the latest N turns
+- summary: like window, but fold the dropped turns into a rolling LLM summary
+- off: leave the history untouched
+
+In window and summary mode a token budget additionally drops the oldest kept
+turns until the prompt fits. A turn starts at a user message, so tool calls and
+their results are never split. The summary lives in the thread's messages as a
+named system message, so it is stored in the checkpoint with the rest.
+"""
+
+import os
+import uuid
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableLambda
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
+
+from .metrics import history_prompt_tokens
+from .util import llm, logger
+
+# =========================
+# Configuration
+# =========================
+HISTORY_MODE = os.getenv("HISTORY_MODE", "window")
+HISTORY_MAX_TURNS = int(os.getenv("HISTORY_MAX_TURNS", "20"))
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+
+HISTORY_NODE = "history"
+SUMMARY_NAME = "conversation_summary"
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant.\n"
+    "Extend the existing summary with the new conversation lines.\n"
+    "Keep facts, names, email addresses, Jira keys, numbers and open requests. "
+    "Drop greetings and routing chatter. Respond ONLY with the updated summary."
+)
+
+
+def split_turns(messages: list[BaseMessage]) -> list[list[BaseMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns = []
+    current = []
+    for message in messages:
+        if isinstance(message, HumanMessage) and current:
+            turns.append(current)
+            current = []
+        current.append(message)
+    if current:
+        turns.append(current)
+    return turns
+
+
+def format_transcript(messages: list[BaseMessage]) -> str:
+    """Render messages as plain lines for the summarizer, skipping routing-only steps."""
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {message.content}")
+        elif isinstance(message, AIMessage) and message.content:
+            if "Transferring back to" in message.content:
+                continue
+            lines.append(f"{message.name or 'Assistant'}: {message.content}")
+        elif isinstance(message, ToolMessage) and not (message.name or "").startswith("transfer_"):
+            lines.append(f"Tool {message.name}: {str(message.content)[:500]}")
+    return "\n".join(lines)
+
+
+class HistoryManager:
+    """Compacts a thread's message history before each turn."""
+
+    def __init__(
+        self,
+        mode: str = HISTORY_MODE,
+        max_turns: int = HISTORY_MAX_TURNS,
+        max_tokens: int = HISTORY_MAX_TOKENS,
+        model=llm,
+        count_tokens=count_tokens_approximately,
+    ):
+        if mode not in ("off", "window", "summary"):
+            raise ValueError(f"Unknown HISTORY_MODE '{mode}'. Use 'off', 'window' or 'summary'.")
+        self.mode = mode
+        self.max_turns = max_turns
+        self.max_tokens = max_tokens
+        self.model = model
+        self.count_tokens = count_tokens
+        self.stats = {
+            "turns": 0,
+            "compactions": 0,
+            "summaries": 0,
+            "prompt_tokens_before": 0,
+            "prompt_tokens_after": 0,
+            "last_prompt_tokens_before": 0,
+            "last_prompt_tokens_after": 0,
+        }
+
+    def plan(self, messages: list[BaseMessage]):
+        """
+        Decide which turns to keep.
+
+        Returns:
+            The existing summary message (or None), the dropped messages and the kept messages.
+        """
+        summary = None
+        if messages and isinstance(messages[0], SystemMessage) and messages[0].name == SUMMARY_NAME:
+            summary, messages = messages[0], messages[1:]
+
+        turns = split_turns(messages)
+        kept = turns[-self.max_turns:] if self.max_turns > 0 else list(turns)
+        dropped = turns[:len(turns) - len(kept)]
+
+        if self.max_tokens > 0:
+            prefix = [summary] if summary else []
+            while len(kept) > 1 and self.count_tokens(prefix + [m for turn in kept for m in turn]) > self.max_tokens:
+                dropped.append(kept.pop(0))
+
+        return (
+            summary,
+            [m for turn in dropped for m in turn],
+            [m for turn in kept for m in turn],
+        )
+
+    def _summary_request(self, summary, dropped):
+        previous = summary.content if summary else "(empty)"
+        return [
+            SystemMessage(content=SUMMARY_PROMPT),
+            HumanMessage(
+                content=f"Existing summary:\n{previous}\n\nNew conversation lines:\n{format_transcript(dropped)}"
+            ),
+        ]
+
+    def _summary_message(self, content: str) -> SystemMessage:
+        return SystemMessage(
+            content=f"Summary of the earlier conversation:\n{content}",
+            name=SUMMARY_NAME,
+            id=str(uuid.uuid4()),
+        )
+
+    def _record(self, messages, compacted):
+        before = self.count_tokens(messages)
+        after = self.count_tokens(compacted) if compacted is not None else before
+        self.stats["turns"] += 1
+        self.stats["prompt_tokens_before"] += before
+        self.stats["prompt_tokens_after"] += after
+        self.stats["last_prompt_tokens_before"] = before
+        self.stats["last_prompt_tokens_after"] = after
+        history_prompt_tokens.observe(before, "before")
+        history_prompt_tokens.observe(after, "after")
+        if compacted is not None:
+            self.stats["compactions"] += 1
+            logger.info(f"🗜️  History compacted: {before} → {after} prompt tokens")
+
+    def _prepare(self, messages):
+        """Plan a turn's compaction; None (recorded as a no-op turn) when nothing is dropped."""
+        summary, dropped, kept = self.plan(messages)
+        if self.mode == "off" or not dropped:
+            self._record(messages, None)
+            return None
+        return summary, dropped, kept
+
+    def _apply(self, messages, summary, kept, summary_response=None) -> dict:
+        """Build the state update, folding in the summarizer's response in summary mode."""
+        if summary_response is not None:
+            summary = self._summary_message(summary_response.content)
+            self.stats["summaries"] += 1
+        compacted = ([summary] if summary else []) + kept
+        self._record(messages, compacted)
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES), *compacted]}
+
+    def compact(self, state: dict) -> dict:
+        """Graph node: compact the stored history (sync path)."""
+        messages = state["messages"]
+        prepared = self._prepare(messages)
+        if prepared is None:
+            return {}
+        summary, dropped, kept = prepared
+        response = None
+        if self.mode == "summary":
+            response = self.model.invoke(self._summary_request(summary, dropped))
+        return self._apply(messages, summary, kept, response)
+
+    async def acompact(self, state: dict) -> dict:
+        """Graph node: compact the stored history (async path)."""
+        messages = state["messages"]
+        prepared = self._prepare(messages)
+        if prepared is None:
+            return {}
+        summary, dropped, kept = prepared
+        response = None
+        if self.mode == "summary":
+            response = await self.model.ainvoke(self._summary_request(summary, dropped))
+        return self._apply(messages, summary, kept, response)
+
+    def as_node(self) -> RunnableLambda:
+        return RunnableLambda(self.compact, afunc=self.acompact, name=HISTORY_NODE)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "mode": self.mode}
+
+
+history_manager = HistoryManager()
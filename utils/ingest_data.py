@@ -1,16 +1,53 @@
-"""Ingest documents into ChromaDB vector database with text chunking."""
+"""
+Ingest documents into ChromaDB vector database with text chunking.
+
+Ingestion is a streaming pipeline: documents are read lazily (from memory, a
+directory or a glob), chunked (optionally across worker processes), embedded in batches with bounded concurrency
+and upserted batch by batch, so memory stays flat regardless of corpus size.
+
+Chunk IDs are content-addressed (document id + chunk text), and a local
+manifest records each document's content hash and chunk IDs. Incremental
+runs skip unchanged documents, embed only new chunks and delete chunks of
+changed or removed documents, so their cost scales with the diff. Progress is
+checkpointed per document; re-running a full ingestion after a crash resumes
+where it stopped.
+"""
 
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+import argparse
+import glob
+import hashlib
+import json
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from itertools import islice
+from typing import Iterable, Iterator
+
 from dotenv import load_dotenv
-from utils.util import embeddings
-import chromadb
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from utils.util import embeddings, get_chroma_client
+from utils.lexical_index import LEXICAL_INDEX_PATH, LexicalIndex
+from utils.chunking import (
+    INGEST_CHUNK_WORKERS,
+    INLINE_SOURCE,
+    Chunk,
+    content_hash,
+    document_id,
+    split_documents,
+)
 
 load_dotenv()
 
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_STATE_DIR = os.getenv("INGEST_STATE_DIR", ".ingest_state")
+INGEST_FILE_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+
 # Sample knowledge base - replace with your own documents
 TEST_DOCUMENT = """Once upon a time, in a land of computers, there was a young programmer named Alex who loved 
 Python, an interpreted, high-level programming language known for its simplicity and power. 
@@ -35,107 +72,521 @@ With these tools and techniques, Alex’s journey into Python programming became
 filled with discovery, efficiency, and endless possibilities."""
 
 
-def ingest_documents(
-    documents: str | list[str], 
+
+@dataclass
+class DocumentPlan:
+    """What one document needs written to bring the collection up to date."""
+    doc_id: str
+    source: str
+    content_hash: str
+    chunk_ids: list[str]
+    new_chunks: list[Chunk]
+    kept_chunks: list[Chunk]
+    removed_ids: list[str]
+
+
+# =========================
+# Sources
+# =========================
+
+def iter_texts(documents: str | Iterable[str]) -> Iterator[tuple[str, str]]:
+    """Yield (source, text) pairs for in-memory documents."""
+    if isinstance(documents, str):
+        documents = [documents]
+    for doc in documents:
+        yield INLINE_SOURCE, doc
+
+
+def iter_files(path_or_glob: str) -> Iterator[tuple[str, str]]:
+    """Yield (path, text) pairs from a directory or glob, reading each file only when needed."""
+    if os.path.isdir(path_or_glob):
+        paths = (
+            os.path.join(root, name)
+            for root, dirs, files in sorted(os.walk(path_or_glob))
+            for name in sorted(files)
+            if name.lower().endswith(INGEST_FILE_EXTENSIONS)
+        )
+    else:
+        paths = iter(sorted(glob.glob(path_or_glob, recursive=True)))
+
+    for path in paths:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            yield path, f.read()
+
+
+# =========================
+# Manifest
+# =========================
+
+class IngestManifest:
+    """Local SQLite record of ingested documents and their chunk IDs, per collection."""
+
+    def __init__(self, collection_name: str, state_dir: str = INGEST_STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.collection_name = collection_name
+        self.conn = sqlite3.connect(os.path.join(state_dir, "manifest.db"))
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                scope TEXT NOT NULL,
+                source TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                PRIMARY KEY (collection, doc_id)
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                PRIMARY KEY (collection, doc_id, chunk_id)
+            );
+            """
+        )
+
+    def content_hash(self, doc_id: str) -> str | None:
+        row = self.conn.execute(
+            "SELECT content_hash FROM documents WHERE collection = ? AND doc_id = ?",
+            (self.collection_name, doc_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def chunk_ids(self, doc_id: str) -> list[str]:
+        return [
+            row[0] for row in self.conn.execute(
+                "SELECT chunk_id FROM chunks WHERE collection = ? AND doc_id = ?",
+                (self.collection_name, doc_id),
+            )
+        ]
+
+    def doc_ids(self, scope: str) -> set[str]:
+        return {
+            row[0] for row in self.conn.execute(
+                "SELECT doc_id FROM documents WHERE collection = ? AND scope = ?",
+                (self.collection_name, scope),
+            )
+        }
+
+    def record(self, plan: DocumentPlan, scope: str):
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?)",
+                (self.collection_name, plan.doc_id, scope, plan.source, plan.content_hash),
+            )
+            self.conn.execute(
+                "DELETE FROM chunks WHERE collection = ? AND doc_id = ?",
+                (self.collection_name, plan.doc_id),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?, ?)",
+                [(self.collection_name, plan.doc_id, cid) for cid in plan.chunk_ids],
+            )
+
+    def add_chunks(self, doc_id: str, scope: str, source: str, chunk_ids: list[str]):
+        """
+        Record chunks of a document whose content hash is unknown (migrated records).
+
+        The empty hash never matches, so the next run re-chunks the document and
+        diffs its chunk IDs against these.
+        """
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO documents VALUES (?, ?, ?, ?, '')",
+                (self.collection_name, doc_id, scope, source),
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?, ?)",
+                [(self.collection_name, doc_id, cid) for cid in chunk_ids],
+            )
+
+    def remove(self, doc_id: str):
+        with self.conn:
+            for table in ("documents", "chunks"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE collection = ? AND doc_id = ?",
+                    (self.collection_name, doc_id),
+                )
+
+    def close(self):
+        self.conn.close()
+
+
+# =========================
+# Pipeline stages
+# =========================
+
+def plan_documents(
+    documents: Iterable[tuple[str, str]],
+    chunk_size: int,
+    chunk_overlap: int,
+    manifest: IngestManifest,
+    incremental: bool,
+    stats: dict,
+    seen: set,
+    chunk_workers: int = INGEST_CHUNK_WORKERS,
+) -> Iterator[DocumentPlan]:
+    """
+    Diff each document against the manifest.
+
+    Incremental plans only embed chunks the document did not have before and
+    skip unchanged documents entirely (before chunking); full plans re-upsert
+    every chunk. Both delete chunks a changed document no longer produces.
+    A document already planned in this run (the same inline text or file path
+    again) is skipped, so no chunk ID is upserted twice.
+    """
+    def documents_to_split():
+        for source, text in documents:
+            doc_hash = content_hash(text)
+            doc_id = document_id(source, text)
+            if doc_id in seen:
+                # A repeated inline text or file path would upsert the same chunk IDs twice
+                stats["duplicate_documents"] += 1
+                continue
+            seen.add(doc_id)
+            previous_hash = manifest.content_hash(doc_id)
+            if incremental and previous_hash == doc_hash:
+                stats["unchanged_documents"] += 1
+                continue
+            stats["new_documents" if previous_hash is None else "changed_documents"] += 1
+            yield source, text, doc_id, doc_hash, previous_hash
+
+    for (source, _, doc_id, doc_hash, previous_hash), chunks in split_documents(
+        documents_to_split(), chunk_size, chunk_overlap, workers=chunk_workers
+    ):
+        chunk_ids = [chunk.id for chunk in chunks]
+        previous_ids = set(manifest.chunk_ids(doc_id)) if previous_hash is not None else set()
+        if incremental:
+            new_chunks = [chunk for chunk in chunks if chunk.id not in previous_ids]
+            kept_chunks = [chunk for chunk in chunks if chunk.id in previous_ids]
+        else:
+            new_chunks, kept_chunks = chunks, []
+        yield DocumentPlan(
+            doc_id=doc_id,
+            source=source,
+            content_hash=doc_hash,
+            chunk_ids=chunk_ids,
+            new_chunks=new_chunks,
+            kept_chunks=kept_chunks,
+            removed_ids=sorted(previous_ids - set(chunk_ids)),
+        )
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class IngestProgress:
+    """Persisted count of documents fully ingested by one ingestion job."""
+
+    def __init__(self, job_key: str | None, state_dir: str = INGEST_STATE_DIR):
+        self.path = None
+        self.documents_done = 0
+        if job_key is None:
+            return
+        digest = hashlib.sha256(job_key.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(state_dir, f"{digest}.json")
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.documents_done = json.load(f)["documents_done"]
+
+    def save(self, documents_done: int):
+        self.documents_done = documents_done
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"documents_done": documents_done}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def upsert_batches(
+    plans: Iterable[DocumentPlan],
+    collection,
+    embedder,
+    batch_size: int,
+    concurrency: int,
+    on_document_done,
+    stats: dict,
+    lexical_index: LexicalIndex | None = None,
+):
+    """
+    Embed new chunks in concurrent batches and upsert them in order.
+
+    At most `concurrency` batches are in flight, which bounds memory use. Once
+    every new chunk of a document is upserted, its kept chunks get their
+    metadata refreshed, its stale chunks are deleted and `on_document_done`
+    commits it, always in document order. The lexical index, if given, is
+    kept in step with every upsert and delete.
+    """
+    # [plan, new chunks not yet upserted], in document order
+    open_plans = deque()
+
+    def chunk_stream():
+        for plan in plans:
+            open_plans.append([plan, len(plan.new_chunks)])
+            yield from plan.new_chunks
+
+    def complete_ready_plans():
+        while open_plans and open_plans[0][1] == 0:
+            plan, _ = open_plans.popleft()
+            if plan.kept_chunks:
+                collection.update(
+                    ids=[chunk.id for chunk in plan.kept_chunks],
+                    metadatas=[chunk.metadata for chunk in plan.kept_chunks],
+                )
+                stats["metadata_updates"] += len(plan.kept_chunks)
+            if plan.removed_ids:
+                collection.delete(ids=plan.removed_ids)
+                if lexical_index is not None:
+                    lexical_index.delete(plan.removed_ids)
+                stats["deleted_chunks"] += len(plan.removed_ids)
+            on_document_done(plan)
+
+    def flush_oldest():
+        batch, future = pending.popleft()
+        collection.upsert(
+            ids=[chunk.id for chunk in batch],
+            embeddings=future.result(),
+            documents=[chunk.text for chunk in batch],
+            metadatas=[chunk.metadata for chunk in batch],
+        )
+        if lexical_index is not None:
+            lexical_index.add([chunk.id for chunk in batch], [chunk.text for chunk in batch])
+        stats["upserted_chunks"] += len(batch)
+        # Chunks arrive in document order, so each belongs to the oldest unfinished plan
+        for _ in batch:
+            next(entry for entry in open_plans if entry[1] > 0)[1] -= 1
+        complete_ready_plans()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        pending = deque()
+        for batch in batched(chunk_stream(), batch_size):
+            pending.append((batch, pool.submit(embedder.embed_documents, [chunk.text for chunk in batch])))
+            complete_ready_plans()
+            if len(pending) >= concurrency:
+                flush_oldest()
+        while pending:
+            flush_oldest()
+        complete_ready_plans()
+
+
+def get_collection(collection_name: str):
+    """Get or create the cosine collection on the configured vector-store backend."""
+    client = get_chroma_client()
+    collection = client.get_or_create_collection(
+        name=collection_name,
+        metadata={"hnsw:space": "cosine"}
+    )
+    return client, collection
+
+
+# =========================
+# Entry points
+# =========================
+
+def run_ingestion(
+    documents: Iterable[tuple[str, str]],
     collection_name: str = None,
     chunk_size: int = 250,
-    chunk_overlap: int = 50
-):
+    chunk_overlap: int = 50,
+    batch_size: int = INGEST_BATCH_SIZE,
+    concurrency: int = INGEST_CONCURRENCY,
+    chunk_workers: int = INGEST_CHUNK_WORKERS,
+    scope: str = INLINE_SOURCE,
+    job_key: str | None = None,
+    incremental: bool = False,
+    embedder=embeddings,
+    collection=None,
+    state_dir: str = INGEST_STATE_DIR,
+    lexical_index_path: str | None = LEXICAL_INDEX_PATH,
+) -> dict:
     """
-    Ingest documents into ChromaDB collection with automatic text chunking.
-    
+    Run the streaming ingestion pipeline over (source, text) pairs.
+
     Args:
-        documents: Single document (string) or list of documents to ingest
+        documents: Iterable of (source, text) pairs, consumed lazily and in a stable order
         collection_name: Name of the collection (uses env var if not provided)
-        chunk_size: Maximum size of each text chunk (default: 500 characters)
-        chunk_overlap: Number of characters to overlap between chunks (default: 50)
+        chunk_size: Maximum size of each text chunk
+        chunk_overlap: Number of characters to overlap between chunks
+        batch_size: Chunks per embedding call and per upsert
+        concurrency: Maximum embedding batches in flight
+        chunk_workers: Processes splitting documents into chunks (1 splits in-process)
+        scope: Groups the documents of one source; incremental runs delete
+            manifest documents of this scope that are no longer present
+        job_key: Identifies a full run for resuming; None disables progress checkpoints
+        incremental: Only write the diff against the manifest
+        embedder: Embeddings used for chunks (defaults to the shared cached embeddings)
+        collection: Pre-resolved collection (connects to ChromaDB if not provided)
+        state_dir: Directory holding the manifest and progress checkpoints
+        lexical_index_path: BM25 index file kept in step with the collection; None skips it
+
+    Returns:
+        Counters for documents and chunks written, updated and deleted.
     """
     if collection_name is None:
         collection_name = os.getenv("CHROMA_COLLECTION_NAME", "my_collection")
-    
-    # Convert single string to list for uniform processing
-    if isinstance(documents, str):
-        documents = [documents]
-    
-    print(f"🚀 Starting data ingestion to collection '{collection_name}'...")
-    print(f"📄 Processing {len(documents)} document(s)")
+
+    print(f"🚀 Starting {'incremental' if incremental else 'full'} ingestion to collection '{collection_name}'...")
     print(f"✂️  Chunk settings: size={chunk_size}, overlap={chunk_overlap}")
-    
-    # Initialize ChromaDB client
-    client = chromadb.HttpClient(
-        host=os.getenv("CHROMA_HOST", "localhost"),
-        port=int(os.getenv("CHROMA_PORT", "8000")),
-        settings=chromadb.config.Settings(anonymized_telemetry=False)
-    )
-    
-    # Get or create collection
-    collection = client.get_or_create_collection(
-        name=collection_name,
-        metadata={"hnsw:space": "cosine"}
-    )
+    print(f"📦 Batch settings: size={batch_size}, concurrency={concurrency}, chunk workers={chunk_workers}")
+
+    if collection is None:
+        _, collection = get_collection(collection_name)
     print(f"✅ Collection ready")
-    
-    # Initialize text splitter
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
+
+    manifest = IngestManifest(collection_name, state_dir)
+    lexical_index = LexicalIndex(collection_name, lexical_index_path) if lexical_index_path else None
+    # Incremental runs resume through the manifest; a document offset would hide
+    # skipped documents from removal detection
+    progress = IngestProgress(
+        None if job_key is None or incremental
+        else json.dumps([job_key, collection_name, chunk_size, chunk_overlap]),
+        state_dir,
     )
-    
-    # Chunk all documents
-    all_chunks = []
-    all_metadata = []
-    
-    for doc_idx, doc in enumerate(documents):
-        chunks = text_splitter.split_text(doc)
-        all_chunks.extend(chunks)
-        
-        # Track metadata for each chunk
-        for chunk_idx, chunk in enumerate(chunks):
-            all_metadata.append({
-                "source": "ingestion",
-                "doc_index": doc_idx,
-                "chunk_index": chunk_idx,
-                "total_chunks": len(chunks),
-                "doc": chunk
-            })
-
-    print(f"✂️  Split into {len(all_chunks)} chunks")
-    print(f"Sample Chunk {all_chunks[0]}")    
-    # Generate embeddings
-    print(f"🔄 Generating embeddings...")
-    chunk_embeddings = embeddings.embed_documents(all_chunks)
-    print(f"✅ Embeddings generated (dimension: {len(chunk_embeddings[0])})")
-    
-    # Insert chunks into ChromaDB
-    print(f"💾 Inserting chunks into ChromaDB...")
-    collection.add(
-        ids=[str(idx) for idx in range(len(all_chunks))],
-        embeddings=chunk_embeddings,
-        documents=all_chunks,
-        metadatas=all_metadata
+    if progress.documents_done:
+        print(f"⏩ Resuming after {progress.documents_done} already ingested documents")
+
+    stats = dict.fromkeys(
+        ["new_documents", "changed_documents", "unchanged_documents", "duplicate_documents", "removed_documents",
+         "upserted_chunks", "metadata_updates", "deleted_chunks"],
+        0,
     )
-    
-    print(f"✅ Successfully ingested {len(all_chunks)} chunks from {len(documents)} document(s)!")
-    print(f"\n📊 Collections in database: {[col.name for col in client.list_collections()]}")
-    
-    return len(all_chunks)
+    seen = set()
+
+    def on_document_done(plan):
+        manifest.record(plan, scope)
+        progress.save(progress.documents_done + 1)
 
+    started = time.perf_counter()
+    try:
+        plans = plan_documents(
+            islice(documents, progress.documents_done, None),
+            chunk_size,
+            chunk_overlap,
+            manifest,
+            incremental,
+            stats,
+            seen,
+            chunk_workers=chunk_workers,
+        )
+        upsert_batches(
+            plans, collection, embedder, batch_size, concurrency, on_document_done, stats, lexical_index
+        )
+
+        if incremental:
+            for doc_id in manifest.doc_ids(scope) - seen:
+                stale_ids = manifest.chunk_ids(doc_id)
+                for ids in batched(stale_ids, batch_size):
+                    collection.delete(ids=ids)
+                if lexical_index is not None:
+                    lexical_index.delete(stale_ids)
+                stats["deleted_chunks"] += len(stale_ids)
+                stats["removed_documents"] += 1
+                manifest.remove(doc_id)
+        progress.clear()
+    finally:
+        manifest.close()
+        if lexical_index is not None:
+            lexical_index.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Ingestion finished in {elapsed:.1f}s "
+          f"({stats['upserted_chunks'] / elapsed if elapsed else 0:.1f} chunks/s)")
+    print(f"📊 {stats}")
+    if hasattr(embedder, "stats"):
+        print(f"🗃️  Embedding cache: {embedder.stats}")
+    return stats
+
+
+def ingest_documents(
+    documents: str | Iterable[str],
+    collection_name: str = None,
+    chunk_size: int = 250,
+    chunk_overlap: int = 50,
+    **kwargs,
+) -> int:
+    """
+    Ingest in-memory documents into ChromaDB collection with automatic text chunking.
+
+    Args:
+        documents: Single document (string) or an iterable of documents to ingest
+        collection_name: Name of the collection (uses env var if not provided)
+        chunk_size: Maximum size of each text chunk (default: 250 characters)
+        chunk_overlap: Number of characters to overlap between chunks (default: 50)
+        **kwargs: Pipeline options passed to run_ingestion (batch_size, concurrency, incremental, ...)
+
+    Returns:
+        Number of chunks upserted.
+    """
+    # Lists can be fingerprinted for resuming; one-shot iterables cannot
+    if isinstance(documents, (str, list, tuple)):
+        texts = [documents] if isinstance(documents, str) else documents
+        kwargs.setdefault("job_key", hashlib.sha256("\0".join(texts).encode("utf-8")).hexdigest())
+    stats = run_ingestion(iter_texts(documents), collection_name, chunk_size, chunk_overlap, **kwargs)
+    return stats["upserted_chunks"]
+
+
+def ingest_path(
+    path_or_glob: str,
+    collection_name: str = None,
+    chunk_size: int = 250,
+    chunk_overlap: int = 50,
+    **kwargs,
+) -> int:
+    """
+    Ingest every text file under a directory or matching a glob, reading files lazily.
+
+    Returns:
+        Number of chunks upserted.
+    """
+    scope = os.path.abspath(path_or_glob)
+    kwargs.setdefault("job_key", scope)
+    stats = run_ingestion(
+        iter_files(path_or_glob), collection_name, chunk_size, chunk_overlap, scope=scope, **kwargs
+    )
+    return stats["upserted_chunks"]
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest documents into ChromaDB.")
+    parser.add_argument("path", nargs="?", help="Directory or glob of text files (default: sample document)")
+    parser.add_argument("--collection", default=None)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--chunk-overlap", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY)
+    parser.add_argument("--chunk-workers", type=int, default=INGEST_CHUNK_WORKERS, help="Processes used for chunking")
+    parser.add_argument("--incremental", action="store_true", help="Only write new/changed chunks and delete removed ones")
+    args = parser.parse_args()
+
     print("=" * 60)
     print("ChromaDB Data Ingestion Script with Text Chunking")
     print("=" * 60)
-    
-    # Ingest sample document (will be automatically chunked)
-    total_chunks = ingest_documents(
-        documents=TEST_DOCUMENT,
-        chunk_size=250,  # Adjust based on your needs
-        chunk_overlap=50
+
+    options = dict(
+        collection_name=args.collection,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        chunk_workers=args.chunk_workers,
+        incremental=args.incremental,
     )
-    
+    if args.path:
+        total_chunks = ingest_path(args.path, **options)
+    else:
+        # Ingest sample document (will be automatically chunked)
+        total_chunks = ingest_documents(documents=TEST_DOCUMENT, **options)
+
     print("\n" + "=" * 60)
-    print(f"✅ Ingestion complete! {total_chunks} chunks stored.")
+    print(f"✅ Ingestion complete! {total_chunks} chunks written.")
     print("💡 Test with: python test/test_chroma.py")
     print("=" * 60)
@@ -0,0 +1,307 @@
+"""
+Process-wide Jira client and a TTL cache for Jira metadata.
+
+Every Jira tool call used to build a new `atlassian.Jira`, with a new HTTP
+session and TLS handshake, and `jira_get_projects` downloaded the full
+project list each time. Now:
+
+- client: one `Jira` per process, on a keep-alive `requests.Session` whose
+  connection pool holds up to JIRA_POOL_SIZE connections, so concurrent
+  tool calls reuse warm connections; it is rebuilt if the credentials change
+- metadata: projects, per-project issue types and field definitions are
+  cached for JIRA_METADATA_TTL_SECONDS (0 disables caching); concurrent
+  misses for the same entry make a single request, and `invalidate()`
+  drops entries explicitly (DELETE /cache/jira, failed issue creation)
+- bulk: many issues are created through Jira's bulk endpoint, in chunks of
+  JIRA_BULK_CREATE_CHUNK, and many comments are posted with at most
+  JIRA_BULK_CONCURRENCY requests in flight; every item gets its own result
+  so a partial failure names exactly what did not go through
+"""
+
+import os
+import time
+import asyncio
+import threading
+from dataclasses import dataclass
+
+import requests
+from requests.adapters import HTTPAdapter
+from atlassian import Jira
+
+from .tracing import traced_client
+from .util import logger
+
+# =========================
+# Configuration
+# =========================
+JIRA_TIMEOUT_SECONDS = int(os.getenv("JIRA_TIMEOUT_SECONDS", "75"))
+JIRA_POOL_SIZE = int(os.getenv("JIRA_POOL_SIZE", "8"))
+JIRA_METADATA_TTL_SECONDS = float(os.getenv("JIRA_METADATA_TTL_SECONDS", "600"))
+# Jira accepts at most 50 issues per bulk-create request
+JIRA_BULK_CREATE_CHUNK = min(50, int(os.getenv("JIRA_BULK_CREATE_CHUNK", "50")))
+JIRA_BULK_CONCURRENCY = int(os.getenv("JIRA_BULK_CONCURRENCY", "4"))
+JIRA_BULK_MAX_ITEMS = int(os.getenv("JIRA_BULK_MAX_ITEMS", "100"))
+
+# Metadata kinds held by the cache
+METADATA_KINDS = ("projects", "issue_types", "fields")
+
+
+def jira_credentials() -> tuple[str, str, str]:
+    jira_url = os.getenv("JIRA_INSTANCE_URL")
+    jira_username = os.getenv("JIRA_USERNAME")
+    jira_password = os.getenv("JIRA_PASSWORD")
+
+    if not all([jira_url, jira_username, jira_password]):
+        raise ValueError(
+            "Missing Jira credentials. Please set JIRA_INSTANCE_URL, "
+            "JIRA_USERNAME, and JIRA_PASSWORD environment variables."
+        )
+    return jira_url, jira_username, jira_password
+
+
+def create_session(pool_size: int = JIRA_POOL_SIZE) -> requests.Session:
+    """A keep-alive session holding up to `pool_size` connections to the Jira host."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# =========================
+# Client
+# =========================
+_jira_client = None
+_jira_credentials = None
+_jira_lock = threading.Lock()
+
+
+def get_jira_client() -> Jira:
+    """
+    Shared Jira client with username/password authentication.
+
+    Built on first use and reused by every tool call; `requests.Session` is
+    safe to share between the threads the tools run in.
+    """
+    global _jira_client, _jira_credentials
+    credentials = jira_credentials()
+    client = _jira_client
+    if client is not None and _jira_credentials == credentials:
+        return client
+
+    with _jira_lock:
+        if _jira_client is None or _jira_credentials != credentials:
+            if _jira_client is not None:
+                _jira_client.close()
+            jira_url, jira_username, jira_password = credentials
+            # Every REST call the tools make is recorded as a span
+            _jira_client = traced_client(
+                Jira(
+                    url=jira_url,
+                    username=jira_username,
+                    password=jira_password,
+                    timeout=JIRA_TIMEOUT_SECONDS,
+                    session=create_session(JIRA_POOL_SIZE),
+                ),
+                "jira",
+            )
+            _jira_credentials = credentials
+            logger.info("Jira client created for %s (pool size %s)", jira_url, JIRA_POOL_SIZE)
+        return _jira_client
+
+
+def reset_jira_client():
+    """Close the shared client so the next call opens a new session."""
+    global _jira_client, _jira_credentials
+    with _jira_lock:
+        if _jira_client is not None:
+            _jira_client.close()
+        _jira_client = None
+        _jira_credentials = None
+
+
+# =========================
+# Metadata cache
+# =========================
+_MISSING = object()
+
+
+class JiraMetadataCache:
+    """
+    Projects, issue types and fields, each kept for `ttl` seconds.
+
+    Entries are keyed by (kind, project key). Cache hits never leave the
+    event loop; misses are fetched in a thread, one request per entry even
+    when several tool calls miss at once.
+    """
+
+    def __init__(self, client_factory=get_jira_client, ttl: float = JIRA_METADATA_TTL_SECONDS, clock=time.monotonic):
+        self.client_factory = client_factory
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _cached(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > self.clock():
+            self.stats["hits"] += 1
+            return entry[1]
+        return _MISSING
+
+    def _get(self, key, loader):
+        value = self._cached(key)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            loading = self._loading.setdefault(key, threading.Lock())
+        with loading:
+            # Another thread may have fetched it while we waited
+            value = self._cached(key)
+            if value is not _MISSING:
+                return value
+            try:
+                value = loader(self.client_factory())
+                with self._lock:
+                    self.stats["misses"] += 1
+                    if self.ttl > 0:
+                        self._entries[key] = (self.clock() + self.ttl, value)
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            return value
+
+    def projects(self) -> list[dict]:
+        """Every project visible to the Jira user."""
+        return self._get(("projects", None), lambda jira: jira.projects() or [])
+
+    def issue_types(self, project_key: str) -> list[dict]:
+        """Issue types available in one project."""
+        project_key = project_key.upper()
+        return self._get(("issue_types", project_key), lambda jira: jira.project(project_key).get("issueTypes") or [])
+
+    def fields(self) -> list[dict]:
+        """System and custom field definitions."""
+        return self._get(("fields", None), lambda jira: jira.get_all_fields() or [])
+
+    async def aprojects(self) -> list[dict]:
+        value = self._cached(("projects", None))
+        return value if value is not _MISSING else await asyncio.to_thread(self.projects)
+
+    async def aissue_types(self, project_key: str) -> list[dict]:
+        value = self._cached(("issue_types", project_key.upper()))
+        return value if value is not _MISSING else await asyncio.to_thread(self.issue_types, project_key)
+
+    async def afields(self) -> list[dict]:
+        value = self._cached(("fields", None))
+        return value if value is not _MISSING else await asyncio.to_thread(self.fields)
+
+    def invalidate(self, kind: str = None, project_key: str = None) -> int:
+        """Drop every entry, one kind, or one project's entries; returns how many were dropped."""
+        if kind is not None and kind not in METADATA_KINDS:
+            raise ValueError(f"Unknown Jira metadata kind '{kind}'. Use one of {', '.join(METADATA_KINDS)}.")
+        project_key = project_key.upper() if project_key else None
+        with self._lock:
+            keys = [
+                key for key in self._entries
+                if (kind is None or key[0] == kind) and (project_key is None or key[1] == project_key)
+            ]
+            for key in keys:
+                del self._entries[key]
+            self.stats["invalidations"] += 1
+        if keys:
+            logger.info("Jira metadata cache: dropped %s entr%s", len(keys), "y" if len(keys) == 1 else "ies")
+        return len(keys)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "entries": len(self._entries), "ttl_seconds": self.ttl}
+
+
+jira_metadata = JiraMetadataCache()
+
+
+# =========================
+# Bulk operations
+# =========================
+@dataclass
+class BulkResult:
+    """Outcome of one item of a bulk operation, by its position in the request."""
+    index: int
+    key: str = None
+    error: str = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _element_error(error: dict) -> str:
+    """Readable message from one entry of a bulk-create `errors` list."""
+    element = error.get("elementErrors") or {}
+    messages = list(element.get("errorMessages") or [])
+    messages += [f"{field}: {message}" for field, message in (element.get("errors") or {}).items()]
+    return "; ".join(messages) or f"Rejected with status {error.get('status', 'unknown')}"
+
+
+def _bulk_response(exc: requests.HTTPError) -> dict:
+    """The per-item body Jira sends with a 400 when every issue in the request failed."""
+    try:
+        body = exc.response.json()
+    except Exception:
+        return None
+    return body if isinstance(body, dict) and isinstance(body.get("errors"), list) else None
+
+
+def create_issues_bulk(jira: Jira, issues: list[dict], chunk_size: int = JIRA_BULK_CREATE_CHUNK) -> list[BulkResult]:
+    """
+    Create issues (each a `fields` dict) with one bulk request per chunk.
+
+    Jira creates the valid issues of a request and reports the others by
+    position, so results line up with `issues` whatever fails.
+    """
+    results = []
+    for start in range(0, len(issues), max(1, chunk_size)):
+        chunk = issues[start:start + chunk_size]
+        try:
+            response = jira.create_issues([{"fields": fields} for fields in chunk]) or {}
+        except requests.HTTPError as e:
+            response = _bulk_response(e)
+            if response is None:
+                results += [BulkResult(start + offset, error=str(e)) for offset in range(len(chunk))]
+                continue
+        except Exception as e:
+            results += [BulkResult(start + offset, error=str(e)) for offset in range(len(chunk))]
+            continue
+
+        failed = {error.get("failedElementNumber"): _element_error(error) for error in response.get("errors") or []}
+        # Created issues come back in request order, skipping the failed ones
+        created = iter(response.get("issues") or [])
+        for offset in range(len(chunk)):
+            if offset in failed:
+                results.append(BulkResult(start + offset, error=failed[offset]))
+                continue
+            issue = next(created, None)
+            if issue is None:
+                results.append(BulkResult(start + offset, error="Jira returned no issue for this item"))
+            else:
+                results.append(BulkResult(start + offset, key=issue.get("key")))
+    return results
+
+
+async def add_comments_bulk(
+    jira: Jira, comments: list[tuple[str, str]], concurrency: int = JIRA_BULK_CONCURRENCY
+) -> list[BulkResult]:
+    """Post (issue key, comment) pairs, at most `concurrency` at a time."""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def post(index: int, issue_key: str, comment: str) -> BulkResult:
+        async with semaphore:
+            try:
+                await asyncio.to_thread(jira.issue_add_comment, issue_key, comment)
+                return BulkResult(index, key=issue_key)
+            except Exception as e:
+                return BulkResult(index, key=issue_key, error=str(e))
+
+    return await asyncio.gather(*(post(i, key, comment) for i, (key, comment) in enumerate(comments)))
@@ -0,0 +1,188 @@
+"""
+Local BM25 inverted index over ingested chunks.
+
+Vector search misses exact identifiers, names and rare terms that a keyword
+search finds easily. Ingestion keeps this index in step with the vector
+store: chunks are indexed when upserted and removed when deleted. It lives
+in a SQLite file next to the ingestion manifest, so the API process can query
+it without a network hop.
+
+Only postings and document lengths are stored; chunk texts stay in the vector
+store.
+
+Usage (rebuild from an existing collection):
+    python utils/lexical_index.py --collection my_collection
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from typing import Iterable
+
+# =========================
+# Configuration
+# =========================
+LEXICAL_INDEX_PATH = os.getenv(
+    "LEXICAL_INDEX_PATH",
+    os.path.join(os.getenv("INGEST_STATE_DIR", ".ingest_state"), "lexical.db"),
+)
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9_]+")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his how i if in into is it its "
+    "me my of on or our she so that the their them then there these they this to was we "
+    "were what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+class LexicalIndex:
+    """BM25 index per collection, stored as postings in SQLite."""
+
+    def __init__(self, collection_name: str, path: str = LEXICAL_INDEX_PATH, k1: float = BM25_K1, b: float = BM25_B):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.collection_name = collection_name
+        self.k1 = k1
+        self.b = b
+        # Shared by the ingestion thread and tool threads; SQLite serializes the rest
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS lexical_docs (
+                collection TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                length INTEGER NOT NULL,
+                PRIMARY KEY (collection, chunk_id)
+            );
+            CREATE TABLE IF NOT EXISTS lexical_postings (
+                collection TEXT NOT NULL,
+                term TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                tf INTEGER NOT NULL,
+                PRIMARY KEY (collection, term, chunk_id)
+            );
+            CREATE INDEX IF NOT EXISTS lexical_postings_chunk
+                ON lexical_postings (collection, chunk_id);
+            """
+        )
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM lexical_docs WHERE collection = ?", (self.collection_name,)
+            ).fetchone()[0]
+
+    def _delete(self, ids: list[str]):
+        for table in ("lexical_docs", "lexical_postings"):
+            self.conn.executemany(
+                f"DELETE FROM {table} WHERE collection = ? AND chunk_id = ?",
+                [(self.collection_name, chunk_id) for chunk_id in ids],
+            )
+
+    def add(self, ids: list[str], texts: list[str]):
+        """Index (or re-index) chunks."""
+        with self._lock, self.conn:
+            self._delete(ids)
+            docs = []
+            postings = []
+            for chunk_id, text in zip(ids, texts):
+                counts = Counter(tokenize(text))
+                docs.append((self.collection_name, chunk_id, sum(counts.values())))
+                postings.extend((self.collection_name, term, chunk_id, tf) for term, tf in counts.items())
+            self.conn.executemany("INSERT INTO lexical_docs VALUES (?, ?, ?)", docs)
+            self.conn.executemany("INSERT INTO lexical_postings VALUES (?, ?, ?, ?)", postings)
+
+    def delete(self, ids: Iterable[str]):
+        with self._lock, self.conn:
+            self._delete(list(ids))
+
+    def clear(self):
+        with self._lock, self.conn:
+            for table in ("lexical_docs", "lexical_postings"):
+                self.conn.execute(f"DELETE FROM {table} WHERE collection = ?", (self.collection_name,))
+
+    def search(self, query: str, k: int) -> list[tuple[str, float]]:
+        """
+        Rank chunks by BM25 against the query.
+
+        Returns:
+            Up to k (chunk_id, score) pairs, best first.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        with self._lock:
+            n_docs, total_length = self.conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0) FROM lexical_docs WHERE collection = ?",
+                (self.collection_name,),
+            ).fetchone()
+            if not n_docs:
+                return []
+            avg_length = total_length / n_docs
+
+            scores = Counter()
+            for term in terms:
+                postings = self.conn.execute(
+                    """
+                    SELECT p.chunk_id, p.tf, d.length
+                    FROM lexical_postings p
+                    JOIN lexical_docs d ON d.collection = p.collection AND d.chunk_id = p.chunk_id
+                    WHERE p.collection = ? AND p.term = ?
+                    """,
+                    (self.collection_name, term),
+                ).fetchall()
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf, length in postings:
+                    norm = tf + self.k1 * (1 - self.b + self.b * length / avg_length)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+        return scores.most_common(k)
+
+    def close(self):
+        self.conn.close()
+
+
+def rebuild_from_collection(index: LexicalIndex, collection, page_size: int = 1000) -> int:
+    """Re-index every chunk of a vector-store collection."""
+    index.clear()
+    total = 0
+    offset = 0
+    while True:
+        page = collection.get(include=["documents"], limit=page_size, offset=offset)
+        if not page["ids"]:
+            return total
+        index.add(page["ids"], [document or "" for document in page["documents"]])
+        total += len(page["ids"])
+        offset += page_size
+
+
+if __name__ == "__main__":
+    from utils.ingest_data import get_collection
+
+    parser = argparse.ArgumentParser(description="Rebuild the BM25 index from a collection.")
+    parser.add_argument("--collection", default=os.getenv("CHROMA_COLLECTION_NAME", "my_collection"))
+    parser.add_argument("--path", default=LEXICAL_INDEX_PATH)
+    args = parser.parse_args()
+
+    _, collection = get_collection(args.collection)
+    index = LexicalIndex(args.collection, args.path)
+    print(f"✅ Indexed {rebuild_from_collection(index, collection)} chunks into {args.path}")
+    index.close()
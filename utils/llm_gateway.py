@@ -0,0 +1,323 @@
+"""
+Gateway in front of the OpenAI-compatible LLM endpoint.
+
+Every agent shares one chat model. The gateway gives that model:
+
+- pool: a keep-alive HTTP connection pool of LLM_POOL_SIZE connections,
+  reused across calls instead of the client defaults
+- limit: at most LLM_MAX_CONCURRENCY requests in flight; the rest queue, and
+  the queue length and waiting time are reported in /health
+- coalescing: identical requests in flight at the same time (e.g. two users
+  triggering the same routing prompt) share one upstream call
+- retries: 429, 5xx and connection errors are retried up to LLM_MAX_RETRIES
+  times with full-jitter exponential backoff, honoring Retry-After; a
+  streamed response is only retried before its first chunk
+
+Streamed calls hold a slot for the whole stream and are never coalesced.
+Repeated requests are answered from utils/completion_cache.py before they
+reach the gateway.
+"""
+
+import os
+import copy
+import json
+import time
+import random
+import asyncio
+import hashlib
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+
+from .completion_cache import chunks_as_result, completion_cache as shared_completion_cache, result_as_chunk
+
+# =========================
+# Configuration
+# =========================
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))
+LLM_KEEPALIVE_SECONDS = float(os.getenv("LLM_KEEPALIVE_SECONDS", "60"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "0.5"))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", "20"))
+LLM_COALESCE = os.getenv("LLM_COALESCE", "true").lower() == "true"
+
+# Rate limits, server errors and dropped connections; anything else (400, 401, ...) fails at once
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+
+def retry_after(error: Exception) -> float | None:
+    """Seconds the server asked us to wait, from a Retry-After header."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class LLMGateway:
+    """Concurrency limit, request coalescing and retries for async LLM calls."""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base: float = LLM_RETRY_BASE_SECONDS,
+        retry_max: float = LLM_RETRY_MAX_SECONDS,
+        coalesce: bool = LLM_COALESCE,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.coalesce = coalesce
+        # asyncio primitives belong to one event loop; they are created on first use in it
+        self._loop = None
+        self._semaphore = None
+        self._inflight: dict[str, asyncio.Task] = {}
+        self.stats = {
+            "requests": 0,
+            "upstream_calls": 0,
+            "coalesced": 0,
+            "retries": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "max_in_flight": 0,
+            "queued": 0,
+            "max_queued": 0,
+            "queue_wait_seconds": 0.0,
+            "max_queue_wait_seconds": 0.0,
+        }
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._inflight = {}
+        return loop
+
+    @staticmethod
+    def request_key(payload: dict) -> str:
+        """Identity of a request: the full payload sent upstream."""
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def backoff(self, attempt: int, error: Exception = None) -> float:
+        """Full-jitter exponential backoff; a Retry-After header sets the minimum."""
+        delay = random.uniform(0, min(self.retry_max, self.retry_base * 2 ** attempt))
+        requested = retry_after(error) if error is not None else None
+        return min(self.retry_max, max(delay, requested)) if requested is not None else delay
+
+    @asynccontextmanager
+    async def _slot(self):
+        """Hold one of the concurrency slots, recording how long we queued for it."""
+        self._bind_loop()
+        stats = self.stats
+        stats["queued"] += 1
+        stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+        started = time.monotonic()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            stats["queued"] -= 1
+        waited = time.monotonic() - started
+        stats["queue_wait_seconds"] += waited
+        stats["max_queue_wait_seconds"] = max(stats["max_queue_wait_seconds"], waited)
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        try:
+            yield
+        finally:
+            stats["in_flight"] -= 1
+            self._semaphore.release()
+
+    async def _retry_wait(self, attempt: int, error: Exception) -> bool:
+        """Sleep before the next attempt; False when the error is final."""
+        if attempt >= self.max_retries:
+            self.stats["errors"] += 1
+            return False
+        # utils.util builds the shared model from this module, so its logger is imported on use
+        from .util import logger
+
+        delay = self.backoff(attempt, error)
+        self.stats["retries"] += 1
+        logger.warning(
+            f"LLM call failed ({error.__class__.__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.2f}s"
+        )
+        await asyncio.sleep(delay)
+        return True
+
+    async def _call_with_retries(self, request):
+        attempt = 0
+        while True:
+            try:
+                async with self._slot():
+                    self.stats["upstream_calls"] += 1
+                    return await request()
+            except RETRYABLE_ERRORS as e:
+                if not await self._retry_wait(attempt, e):
+                    raise
+                attempt += 1
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    async def call(self, request, key: str = None):
+        """
+        Run `request()` (a coroutine factory) through the gateway.
+
+        Callers with the same `key` while a call is in flight wait for that
+        call and get a copy of its result. The shared call runs as its own
+        task, so one caller being cancelled does not cancel it for the others.
+        """
+        loop = self._bind_loop()
+        self.stats["requests"] += 1
+        if key is None or not self.coalesce:
+            return await self._call_with_retries(request)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = loop.create_task(self._call_with_retries(request))
+        self._inflight[key] = task
+
+        def finished(done: asyncio.Task):
+            if self._inflight.get(key) is done:
+                del self._inflight[key]
+            if not done.cancelled():
+                done.exception()  # retrieved here in case every caller was cancelled
+
+        task.add_done_callback(finished)
+        return await asyncio.shield(task)
+
+    async def stream(self, open_stream):
+        """Yield from `open_stream()` (an async iterator factory), retrying only before the first chunk."""
+        self._bind_loop()
+        self.stats["requests"] += 1
+        attempt = 0
+        while True:
+            started = False
+            try:
+                async with self._slot():
+                    self.stats["upstream_calls"] += 1
+                    async for chunk in open_stream():
+                        started = True
+                        yield chunk
+                return
+            except RETRYABLE_ERRORS as e:
+                if started or not await self._retry_wait(attempt, e):
+                    if started:
+                        self.stats["errors"] += 1
+                    raise
+                attempt += 1
+            except Exception:
+                self.stats["errors"] += 1
+                raise
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "queue_wait_seconds": round(self.stats["queue_wait_seconds"], 3),
+            "max_queue_wait_seconds": round(self.stats["max_queue_wait_seconds"], 3),
+            "max_concurrency": self.max_concurrency,
+        }
+
+
+class GatewayChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose async calls go through an LLMGateway, behind an optional CompletionCache."""
+
+    gateway: Any = None
+    completion_cache: Any = None
+
+    def _cache_key(self, messages, stop, run_manager, **kwargs) -> str | None:
+        """Cache key of this call, or None when it must not use the completion cache."""
+        cache = self.completion_cache
+        if cache is None or not cache.accepts(run_manager.metadata if run_manager is not None else {}):
+            return None
+        return cache.key(self._get_request_payload(messages, stop=stop, **kwargs))
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        cache_key = self._cache_key(messages, stop, run_manager, **kwargs)
+        if cache_key is not None:
+            cached = await self.completion_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        parent = super(GatewayChatOpenAI, self)
+        if self.gateway is None:
+            result = await parent._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        else:
+            key = self.gateway.request_key(self._get_request_payload(messages, stop=stop, **kwargs))
+            result = await self.gateway.call(
+                lambda: parent._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs), key=key
+            )
+        if cache_key is not None:
+            await self.completion_cache.aput(cache_key, result)
+        return result
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        cache_key = self._cache_key(messages, stop, run_manager, **kwargs)
+        if cache_key is not None:
+            cached = await self.completion_cache.aget(cache_key)
+            if cached is not None:
+                chunk = result_as_chunk(cached)
+                if run_manager is not None:
+                    await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+                yield chunk
+                return
+
+        parent = super(GatewayChatOpenAI, self)
+        open_stream = lambda: parent._astream(messages, stop=stop, run_manager=run_manager, **kwargs)
+        stream = open_stream() if self.gateway is None else self.gateway.stream(open_stream)
+        chunks = []
+        async for chunk in stream:
+            chunks.append(chunk)
+            yield chunk
+        if cache_key is not None:
+            result = chunks_as_result(chunks)
+            if result is not None:
+                await self.completion_cache.aput(cache_key, result)
+
+
+def create_http_client(pool_size: int = LLM_POOL_SIZE) -> httpx.AsyncClient:
+    """Async HTTP client with a keep-alive pool sized for the gateway's concurrency."""
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=LLM_KEEPALIVE_SECONDS,
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS),
+    )
+
+
+def create_chat_model(gateway: LLMGateway = None, **kwargs) -> GatewayChatOpenAI:
+    """
+    The shared chat model, configured from LLM_API_KEY, LLM_BASE_URL and LLM_MODEL_NAME.
+
+    The OpenAI client's own retries are off: the gateway retries instead.
+    Completions are cached in the shared CompletionCache unless
+    `completion_cache=None` is passed (or LLM_CACHE_ENABLED=false).
+    """
+    options = {
+        "api_key": os.getenv("LLM_API_KEY"),
+        "base_url": os.getenv("LLM_BASE_URL"),
+        "model": os.getenv("LLM_MODEL_NAME"),
+        "max_retries": 0,
+        "http_async_client": create_http_client(),
+        "gateway": gateway if gateway is not None else llm_gateway,
+        "completion_cache": shared_completion_cache,
+    }
+    options.update(kwargs)
+    return GatewayChatOpenAI(**options)
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,503 @@
+"""
+Outbound email: a durable SQLite queue drained by a background sender.
+
+Sending used to open an SMTP_SSL connection, handshake TLS and log in for
+every email, inside the agent run, so a slow mail server stalled /query.
+Now the email tool only validates and enqueues the message; the API's
+background sender delivers it:
+
+- queue: one SQLite row per email (pending -> sending -> sent | failed);
+  a claim holds its rows for MAIL_CLAIM_LEASE_SECONDS, and rows a crashed
+  sender left in `sending` are requeued once their lease has expired, so a
+  second sender (e.g. `--drain` next to the API) never takes them over
+- pool: up to SMTP_POOL_SIZE logged-in, keep-alive connections, reused
+  across emails and checked with NOOP after being idle
+- bulk: due emails are claimed in batches and spread over the pool
+- retries: transient errors back off exponentially (with jitter) up to
+  MAIL_MAX_ATTEMPTS; refused senders/recipients fail at once
+
+Usage (deliver what is queued without the API running):
+    python utils/mail_queue.py --drain
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from email_validator import EmailNotValidError, validate_email
+
+from utils.tracing import span
+from utils.util import logger
+
+# =========================
+# Configuration
+# =========================
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+# ssl: implicit TLS (port 465) | starttls: upgrade a plain connection (port 587) | plain: no TLS (local relays, tests)
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl")
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "30"))
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.getenv("SMTP_IDLE_TIMEOUT_SECONDS", "120"))
+SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+MAIL_QUEUE_DB_PATH = os.getenv("MAIL_QUEUE_DB_PATH", "mail_queue.db")
+MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "50"))
+MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "6"))
+MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "5"))
+MAIL_RETRY_MAX_SECONDS = float(os.getenv("MAIL_RETRY_MAX_SECONDS", "900"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "5"))
+# How long claimed emails stay reserved for their sender; must outlast sending one batch
+MAIL_CLAIM_LEASE_SECONDS = float(os.getenv("MAIL_CLAIM_LEASE_SECONDS", "900"))
+
+# Connections idle for longer than this are checked with NOOP before reuse
+_NOOP_AFTER_SECONDS = 5.0
+
+# The server refused the message itself: retrying cannot help
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPNotSupportedError)
+
+
+def smtp_credentials() -> tuple[str, str]:
+    smtp_email = os.getenv("SMTP_EMAIL")
+    smtp_password = os.getenv("SMTP_PASSWORD")
+    if not smtp_email or not smtp_password:
+        raise ValueError("SMTP_EMAIL and SMTP_PASSWORD must be set in environment")
+    return smtp_email, smtp_password
+
+
+def build_message(sender: str, to: str, subject: str, body: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    return msg
+
+
+# =========================
+# Connection pool
+# =========================
+@dataclass
+class _PooledConnection:
+    smtp: smtplib.SMTP
+    last_used: float
+    sent: int = 0
+
+
+class SMTPConnectionPool:
+    """Bounded pool of logged-in SMTP connections kept open between emails."""
+
+    def __init__(
+        self,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: str = None,
+        password: str = None,
+        security: str = SMTP_SECURITY,
+        size: int = SMTP_POOL_SIZE,
+        idle_timeout: float = SMTP_IDLE_TIMEOUT_SECONDS,
+        max_messages: int = SMTP_MAX_MESSAGES_PER_CONNECTION,
+        timeout: float = SMTP_TIMEOUT_SECONDS,
+    ):
+        if security not in ("ssl", "starttls", "plain"):
+            raise ValueError(f"Unknown SMTP_SECURITY '{security}'. Use 'ssl', 'starttls' or 'plain'.")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.security = security
+        self.size = max(1, size)
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._idle: list[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self.stats = {"opened": 0, "reused": 0, "closed": 0}
+
+    def _open(self) -> _PooledConnection:
+        with span("smtp.connect", **{"peer.service": "smtp", "smtp.security": self.security}):
+            if self.security == "ssl":
+                smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+            else:
+                smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+                if self.security == "starttls":
+                    smtp.starttls()
+            try:
+                if self.username:
+                    smtp.login(self.username, self.password)
+            except Exception:
+                self._close(smtp)
+                raise
+        with self._lock:
+            self.stats["opened"] += 1
+        return _PooledConnection(smtp, time.monotonic())
+
+    def _close(self, smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+        with self._lock:
+            self.stats["closed"] += 1
+
+    def _take_idle(self) -> _PooledConnection | None:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                pooled = self._idle.pop()
+            idle_for = time.monotonic() - pooled.last_used
+            if idle_for > self.idle_timeout:
+                self._close(pooled.smtp)
+                continue
+            if idle_for > _NOOP_AFTER_SECONDS:
+                try:
+                    if pooled.smtp.noop()[0] != 250:
+                        raise smtplib.SMTPServerDisconnected("NOOP failed")
+                except Exception:
+                    self._close(pooled.smtp)
+                    continue
+            with self._lock:
+                self.stats["reused"] += 1
+            return pooled
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a connection; it returns to the pool unless the block raised.
+
+        At most `size` connections are in use at once.
+        """
+        with self._slots:
+            pooled = self._take_idle() or self._open()
+            try:
+                yield pooled.smtp
+            except BaseException:
+                self._close(pooled.smtp)
+                raise
+            pooled.sent += 1
+            pooled.last_used = time.monotonic()
+            if pooled.sent >= self.max_messages:
+                self._close(pooled.smtp)
+            else:
+                with self._lock:
+                    self._idle.append(pooled)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled.smtp)
+
+
+# =========================
+# Durable queue
+# =========================
+@dataclass
+class QueuedMail:
+    id: int
+    recipient: str
+    subject: str
+    body: str
+    attempts: int
+
+
+class MailQueue:
+    """SQLite outbox; safe to use from several threads."""
+
+    def __init__(self, db_path: str = MAIL_QUEUE_DB_PATH, lease_seconds: float = MAIL_CLAIM_LEASE_SECONDS):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                claimed_until REAL
+            );
+            CREATE INDEX IF NOT EXISTS outbox_due ON outbox(status, next_attempt_at);
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}
+        if "claimed_until" not in columns:
+            # Queues created before claims had leases
+            self._conn.execute("ALTER TABLE outbox ADD COLUMN claimed_until REAL")
+
+    def enqueue(self, recipient: str, subject: str, body: str) -> int:
+        now = time.time()
+        with self._lock:
+            return self._conn.execute(
+                "INSERT INTO outbox (recipient, subject, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+                (recipient, subject, body, now, now),
+            ).lastrowid
+
+    def requeue_interrupted(self, now: float = None) -> int:
+        """
+        Return emails whose claim expired in `sending` to the queue (delivery is at-least-once).
+
+        Claims still within their lease belong to a sender that may be delivering them right now.
+        """
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE outbox SET status = 'pending' "
+                "WHERE status = 'sending' AND (claimed_until IS NULL OR claimed_until <= ?)",
+                (now or time.time(),),
+            ).rowcount
+
+    def claim(self, limit: int, now: float = None) -> list[QueuedMail]:
+        """Mark up to `limit` due emails as sending for the lease period and return them, oldest first."""
+        now = now or time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, recipient, subject, body, attempts FROM outbox "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sending', claimed_until = ? WHERE id = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows],
+            )
+            self._conn.execute("COMMIT")
+        return [QueuedMail(*row) for row in rows]
+
+    def mark_sent(self, mail_id: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'sent', attempts = attempts + 1, sent_at = ?, last_error = NULL WHERE id = ?",
+                (time.time(), mail_id),
+            )
+
+    def mark_retry(self, mail_id: int, error: str, delay: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = attempts + 1, next_attempt_at = ?, last_error = ? "
+                "WHERE id = ?",
+                (time.time() + delay, error, mail_id),
+            )
+
+    def mark_failed(self, mail_id: int, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, mail_id),
+            )
+
+    def next_due(self) -> float | None:
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        return row[0]
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def status(self, mail_id: int) -> tuple | None:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, attempts, last_error FROM outbox WHERE id = ?", (mail_id,)
+            ).fetchone()
+
+    def close(self):
+        self._conn.close()
+
+
+# =========================
+# Background sender
+# =========================
+class MailSender:
+    """Delivers queued emails over the connection pool, with retries and backoff."""
+
+    def __init__(
+        self,
+        queue: MailQueue = None,
+        pool: SMTPConnectionPool = None,
+        sender: str = None,
+        batch_size: int = MAIL_BATCH_SIZE,
+        max_attempts: int = MAIL_MAX_ATTEMPTS,
+        retry_base: float = MAIL_RETRY_BASE_SECONDS,
+        retry_max: float = MAIL_RETRY_MAX_SECONDS,
+        poll_seconds: float = MAIL_POLL_SECONDS,
+    ):
+        self._queue = queue
+        self._pool = pool
+        self._sender = sender
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.poll_seconds = poll_seconds
+        self._wake = None
+        self.stats = {"enqueued": 0, "sent": 0, "retried": 0, "failed": 0}
+
+    # The queue and pool open lazily, so importing the tools needs no database or credentials
+    @property
+    def queue(self) -> MailQueue:
+        if self._queue is None:
+            self._queue = MailQueue()
+        return self._queue
+
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        if self._pool is None:
+            username, password = smtp_credentials()
+            self._pool = SMTPConnectionPool(username=username, password=password)
+        return self._pool
+
+    @property
+    def sender(self) -> str:
+        return self._sender or smtp_credentials()[0]
+
+    def _wake_event(self) -> asyncio.Event:
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        return self._wake
+
+    async def enqueue(self, to: str, subject: str, body: str) -> int:
+        """Validate and store an email; the background sender delivers it."""
+        if self._sender is None:
+            smtp_credentials()  # fail now, not in the background, when SMTP is not configured
+        try:
+            to = validate_email(to, check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            raise ValueError(f"Invalid recipient address '{to}': {e}") from None
+        mail_id = await asyncio.to_thread(self.queue.enqueue, to, subject, body)
+        self.stats["enqueued"] += 1
+        self._wake_event().set()
+        return mail_id
+
+    def backoff(self, attempts: int) -> float:
+        """Exponential backoff with jitter for the given number of failed attempts."""
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _retry(self, mail: QueuedMail, error: Exception):
+        attempts = mail.attempts + 1
+        if attempts >= self.max_attempts:
+            self.queue.mark_failed(mail.id, str(error))
+            self.stats["failed"] += 1
+            logger.error(f"📧 Giving up on email {mail.id} to {mail.recipient} after {attempts} attempts: {error}")
+        else:
+            delay = self.backoff(attempts)
+            self.queue.mark_retry(mail.id, str(error), delay)
+            self.stats["retried"] += 1
+            logger.warning(f"📧 Email {mail.id} failed ({error}), retrying in {delay:.1f}s")
+
+    def _send_one(self, smtp: smtplib.SMTP, mail: QueuedMail):
+        try:
+            with span("smtp.send_message", **{"peer.service": "smtp", "mail.id": mail.id}):
+                smtp.send_message(build_message(self.sender, mail.recipient, mail.subject, mail.body))
+        except PERMANENT_ERRORS as e:
+            self.queue.mark_failed(mail.id, str(e))
+            self.stats["failed"] += 1
+            logger.error(f"📧 Email {mail.id} to {mail.recipient} refused: {e}")
+        except smtplib.SMTPResponseException as e:
+            # The server answered with an error but the connection is still usable
+            self._retry(mail, e)
+        else:
+            self.queue.mark_sent(mail.id)
+            self.stats["sent"] += 1
+
+    def _send_chunk(self, mails: list[QueuedMail]):
+        """Send emails one after another over pooled connections (runs in a worker thread)."""
+        for i, mail in enumerate(mails):
+            try:
+                with self.pool.connection() as smtp:
+                    self._send_one(smtp, mail)
+            except Exception as e:
+                # Connecting, logging in or the connection itself failed: back off the rest too
+                for waiting in mails[i:]:
+                    self._retry(waiting, e)
+                return
+
+    async def deliver_due(self) -> int:
+        """Claim due emails and send them spread over the pool; returns how many were claimed."""
+        pool = self.pool
+        mails = await asyncio.to_thread(self.queue.claim, self.batch_size)
+        if not mails:
+            return 0
+        chunks = [mails[i::pool.size] for i in range(min(pool.size, len(mails)))]
+        await asyncio.gather(*(asyncio.to_thread(self._send_chunk, chunk) for chunk in chunks))
+        return len(mails)
+
+    async def run(self):
+        """Background task: deliver due emails until cancelled."""
+        wake = self._wake_event()
+        try:
+            while True:
+                wake.clear()
+                try:
+                    # A crashed sender's claims come back once their lease runs out
+                    requeued = await asyncio.to_thread(self.queue.requeue_interrupted)
+                    if requeued:
+                        logger.info(f"📧 Requeued {requeued} email(s) whose sender was interrupted")
+                    if await self.deliver_due():
+                        continue
+                except ValueError as e:
+                    # SMTP credentials missing: keep the mail queued until they are configured
+                    logger.error(f"📧 Mail sender is not configured: {e}")
+                except Exception:
+                    logger.exception("❌ Mail sender failed")
+
+                next_due = await asyncio.to_thread(self.queue.next_due)
+                timeout = self.poll_seconds if next_due is None else min(self.poll_seconds, max(0.0, next_due - time.time()))
+                try:
+                    await asyncio.wait_for(wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._pool is not None:
+                await asyncio.to_thread(self._pool.close)
+
+    async def drain(self):
+        """Deliver everything that is due now (CLI and tests)."""
+        await asyncio.to_thread(self.queue.requeue_interrupted)
+        while await self.deliver_due():
+            pass
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.close)
+
+    def snapshot(self) -> dict:
+        pool = self._pool.stats if self._pool is not None else {}
+        queue = self.queue.counts() if self._queue is not None else {}
+        return {**self.stats, "connections": dict(pool), "queue": queue}
+
+
+mail_sender = MailSender()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or deliver the outbound email queue.")
+    parser.add_argument("--db", default=MAIL_QUEUE_DB_PATH, help="Path to the mail queue database")
+    parser.add_argument("--drain", action="store_true", help="Send every email that is due now")
+    args = parser.parse_args()
+
+    sender = MailSender(queue=MailQueue(args.db))
+    if args.drain:
+        asyncio.run(sender.drain())
+    print(sender.snapshot())
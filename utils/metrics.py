@@ -0,0 +1,426 @@
+"""
+Prometheus metrics for the API, served in the text exposition format at /metrics.
+
+- HTTP: request count, in-flight requests and latency per endpoint
+- agents and tools: calls, errors and durations per agent / tool
+- LLM: calls, errors, durations and prompt/completion tokens per agent
+- embeddings: API calls and cache lookups (read from the embedding cache's stats)
+- response cache: lookups by result and the agent latency hits saved
+- checkpoints: write latency (queueing + group commit) and commit time
+
+Updates are lock-free: each thread writes to its own shard of a metric, and a
+scrape sums the shards. Request threads never wait on each other or on a
+scrape, so the hooks stay on in production; METRICS_ENABLED=false turns off
+the HTTP and graph hooks.
+
+Graph metrics come from `GraphMetricsHandler`, a LangChain callback handler
+passed with the graph config; HTTP metrics from `MetricsMiddleware`.
+"""
+
+import os
+import math
+import time
+import bisect
+import threading
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.errors import GraphBubbleUp
+from starlette.routing import Match
+
+from .completion_cache import calling_agent
+
+# =========================
+# Configuration
+# =========================
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.getenv("METRICS_NAMESPACE", "assistant")
+
+# Seconds; requests and agent runs take from milliseconds (cache hits) to minutes
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Seconds; SQLite commits and queued checkpoint writes
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+# Prompt tokens; a thread's history from its first turn to well past HISTORY_MAX_TOKENS
+TOKEN_BUCKETS = (250, 500, 1000, 2000, 4000, 6000, 8000, 12000, 16000, 32000, 64000, 128000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    """The metrics a /metrics scrape renders, in registration order."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class _ShardedMetric:
+    """Base of metrics updated lock-free through per-thread shards."""
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labels=(), registry: Registry = registry):
+        self.name = f"{METRICS_NAMESPACE}_{name}" if METRICS_NAMESPACE else name
+        self.help = help
+        self.labels = tuple(labels)
+        # thread ident -> {label values: value}; only the owning thread writes its shard
+        self._shards: dict[int, dict] = {}
+        if registry is not None:
+            registry.register(self)
+
+    def _shard(self) -> dict:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            shard = self._shards.setdefault(ident, {})
+        return shard
+
+    def _snapshots(self) -> list[dict]:
+        # dict.copy() is atomic, so a scrape never sees a shard mid-resize
+        return [shard.copy() for shard in list(self._shards.values())]
+
+
+class Counter(_ShardedMetric):
+    type = "counter"
+
+    def inc(self, *labels, amount: float = 1.0):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def values(self) -> dict[tuple, float]:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def value(self, *labels) -> float:
+        return self.values().get(labels, 0.0)
+
+    def samples(self):
+        for labels, value in sorted(self.values().items()):
+            yield f"{self.name}{_label_text(self.labels, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Up/down gauge; shards hold deltas, so inc and dec may come from different threads."""
+
+    type = "gauge"
+
+    def dec(self, *labels, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_ShardedMetric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS, registry: Registry = registry):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        shard = self._shard()
+        entry = shard.get(labels)
+        if entry is None:
+            # One count per bucket plus +Inf, then sum and count
+            entry = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        entry[bisect.bisect_left(self.buckets, value)] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    def values(self) -> dict[tuple, list]:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, entry in shard.items():
+                entry = list(entry)
+                total = totals.get(labels)
+                totals[labels] = entry if total is None else [a + b for a, b in zip(total, entry)]
+        return totals
+
+    def count(self, *labels) -> int:
+        entry = self.values().get(labels)
+        return entry[-1] if entry else 0
+
+    def samples(self):
+        for labels, entry in sorted(self.values().items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), entry):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labels, labels)} {_format_value(entry[-2])}"
+            yield f"{self.name}_count{_label_text(self.labels, labels)} {entry[-1]}"
+
+
+class CallbackMetric:
+    """Metric read from existing stats at scrape time; `read()` returns {label values: value}."""
+
+    def __init__(self, name: str, help: str, type: str, labels, read, registry: Registry = registry):
+        self.name = f"{METRICS_NAMESPACE}_{name}" if METRICS_NAMESPACE else name
+        self.help = help
+        self.type = type
+        self.labels = tuple(labels)
+        self.read = read
+        if registry is not None:
+            registry.register(self)
+
+    def samples(self):
+        for labels, value in sorted(self.read().items()):
+            yield f"{self.name}{_label_text(self.labels, labels)} {_format_value(value)}"
+
+
+# =========================
+# Metrics
+# =========================
+http_requests = Counter("http_requests_total", "HTTP requests handled.", ("method", "endpoint", "status"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests being handled.", ("endpoint",))
+http_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency, until the last body byte.", ("method", "endpoint")
+)
+
+agent_calls = Counter("agent_calls_total", "Agent runs (supervisor turns and worker delegations).", ("agent",))
+agent_errors = Counter("agent_errors_total", "Agent runs that raised.", ("agent",))
+agent_duration = Histogram("agent_duration_seconds", "Agent run duration.", ("agent",))
+
+tool_calls = Counter("tool_calls_total", "Tool calls.", ("tool", "agent"))
+tool_errors = Counter("tool_errors_total", "Tool calls that raised.", ("tool", "agent"))
+tool_duration = Histogram("tool_duration_seconds", "Tool call duration.", ("tool",))
+
+llm_calls = Counter("llm_calls_total", "LLM calls; cache is 'hit' when served by the completion cache.", ("agent", "cache"))
+llm_errors = Counter("llm_errors_total", "LLM calls that failed.", ("agent",))
+llm_duration = Histogram("llm_duration_seconds", "LLM call duration.", ("agent",))
+llm_tokens = Counter(
+    "llm_tokens_total", "LLM tokens spent by agent, cache hits excluded; type is prompt or completion.", ("agent", "type")
+)
+
+checkpoint_write_duration = Histogram(
+    "checkpoint_write_seconds",
+    "Checkpoint write latency: queueing for the writer thread plus its group commit.",
+    ("op",),
+    buckets=FAST_BUCKETS,
+)
+checkpoint_commit_duration = Histogram(
+    "checkpoint_commit_seconds", "Duration of one checkpoint group commit.", buckets=FAST_BUCKETS
+)
+
+history_prompt_tokens = Histogram(
+    "history_prompt_tokens",
+    "Prompt tokens of a thread's history per turn; stage is before or after compaction.",
+    ("stage",),
+    buckets=TOKEN_BUCKETS,
+)
+
+
+def register_embedding_metrics(embeddings, registry: Registry = registry):
+    """Expose a CachedEmbeddings' call and lookup counts."""
+    stats = embeddings.stats
+    CallbackMetric(
+        "embedding_calls_total", "Embedding API calls (cache misses, batched).", "counter", (),
+        lambda: {(): stats["embedding_calls"]}, registry,
+    )
+    CallbackMetric(
+        "embedding_texts_total", "Texts looked up in the embedding cache, by result.", "counter", ("result",),
+        lambda: {("memory_hit",): stats["memory_hits"], ("disk_hit",): stats["disk_hits"], ("miss",): stats["misses"]},
+        registry,
+    )
+
+
+def register_response_cache_metrics(cache, registry: Registry = registry):
+    """Expose a SemanticCache's lookups by result and the latency its hits saved."""
+    stats = cache.stats
+    CallbackMetric(
+        "response_cache_lookups_total", "Semantic response cache lookups, by result.", "counter", ("result",),
+        lambda: {("hit",): stats["hits"], ("miss",): stats["misses"], ("bypass",): stats["bypassed"]},
+        registry,
+    )
+    CallbackMetric(
+        "response_cache_latency_saved_seconds_total", "Graph run time the cached answers would have taken.",
+        "counter", (), lambda: {(): stats["latency_saved_seconds"]}, registry,
+    )
+
+
+def register_history_metrics(manager, registry: Registry = registry):
+    """Expose a HistoryManager's compactions and the rolling summaries they wrote."""
+    stats = manager.stats
+    CallbackMetric(
+        "history_compactions_total", "Turns whose stored history was compacted.", "counter", (),
+        lambda: {(): stats["compactions"]}, registry,
+    )
+    CallbackMetric(
+        "history_summaries_total", "Rolling summaries written for dropped turns.", "counter", (),
+        lambda: {(): stats["summaries"]}, registry,
+    )
+
+
+
+# =========================
+# Hooks
+# =========================
+class GraphMetricsHandler(BaseCallbackHandler):
+    """
+    Records agent, tool and LLM metrics from LangChain run events.
+
+    An agent run is a graph node named after one of `agents`, or a worker the
+    planner runs (named in its `agent` metadata). A node wrapping a compiled
+    agent graph of the same name counts once.
+    """
+
+    run_inline = True
+
+    def __init__(self, agents=()):
+        self.agents = frozenset(agents)
+        # run id -> (kind, labels, started); open agent runs by (agent, namespace)
+        self._runs = {}
+        self._open_agents = set()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        if name not in self.agents or name not in (metadata.get("langgraph_node"), metadata.get("agent")):
+            return
+        key = (name, metadata.get("langgraph_checkpoint_ns"))
+        if key in self._open_agents:
+            return
+        self._open_agents.add(key)
+        self._runs[run_id] = ("agent", key, time.perf_counter())
+
+    def _end_agent(self, run_id, error: BaseException = None):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        _, key, started = run
+        self._open_agents.discard(key)
+        agent = key[0]
+        agent_calls.inc(agent)
+        agent_duration.observe(time.perf_counter() - started, agent)
+        if error is not None and not isinstance(error, GraphBubbleUp):
+            agent_errors.inc(agent)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_agent(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_agent(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._runs[run_id] = ("llm", calling_agent(metadata or {}) or "unknown", time.perf_counter())
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        _, agent, started = run
+        llm_duration.observe(time.perf_counter() - started, agent)
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        cached = (getattr(message, "response_metadata", None) or {}).get("completion_cache") == "hit"
+        llm_calls.inc(agent, "hit" if cached else "miss")
+        if cached:
+            # A cached completion keeps its original usage, but spent no tokens this time
+            return
+        usage = getattr(message, "usage_metadata", None) or {}
+        if usage.get("input_tokens"):
+            llm_tokens.inc(agent, "prompt", amount=usage["input_tokens"])
+        if usage.get("output_tokens"):
+            llm_tokens.inc(agent, "completion", amount=usage["output_tokens"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        if run is not None:
+            llm_calls.inc(run[1], "miss")
+            llm_errors.inc(run[1])
+            llm_duration.observe(time.perf_counter() - run[2], run[1])
+
+    def on_tool_start(self, serialized, input_str, *, run_id, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        self._runs[run_id] = ("tool", (name, calling_agent(metadata or {}) or "unknown"), time.perf_counter())
+
+    def _end_tool(self, run_id, error: BaseException = None):
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        _, (tool, agent), started = run
+        tool_calls.inc(tool, agent)
+        tool_duration.observe(time.perf_counter() - started, tool)
+        if error is not None and not isinstance(error, GraphBubbleUp):
+            tool_errors.inc(tool, agent)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_tool(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_tool(run_id, error)
+
+
+def route_template(scope) -> str:
+    """The matched route's path template, so path parameters do not become labels."""
+    app = scope.get("app")
+    for route in getattr(getattr(app, "router", None), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting and timing HTTP requests, streamed responses until their last chunk."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            return await self.app(scope, receive, send)
+
+        endpoint = route_template(scope)
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+        http_in_flight.inc(endpoint)
+
+        async def send_and_record(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            http_in_flight.dec(endpoint)
+            http_requests.inc(method, endpoint, str(status))
+            http_duration.observe(time.perf_counter() - started, method, endpoint)
+
+
+def render() -> str:
+    return registry.render()
@@ -0,0 +1,254 @@
+"""
+Rewrite an existing collection's chunk metadata to the compact schema.
+
+Collections ingested before the compact schema carry the chunk text twice:
+as the record's document and again as `metadata["doc"]`, next to position
+fields (`doc_index`, `total_chunks`). This tool rewrites every record in place
+with the compact metadata from `utils.chunking.chunk_metadata` (source,
+doc_id, chunk_index, chunk_hash and, when already known, start/end offsets),
+keeping embeddings and documents unchanged, so nothing is re-embedded.
+
+Records also move from legacy positional ids to the content-addressed
+`chunk_id`s, and the ingestion manifest is seeded with them, so the next
+ingestion of the same files only writes the diff. The manifest cannot know
+the documents' content hashes, so that next run re-chunks every migrated
+document once (without re-embedding chunks it already has). Inline documents
+were only identified by their position, which their content-addressed ids
+cannot be derived from: re-ingest such a corpus with `--incremental`, which
+replaces the migrated copies, or rebuild the collection.
+
+ChromaDB merges metadata on update and cannot drop keys, so each page of
+records is deleted and re-added with its stored embeddings. The page is first
+written to a journal in INGEST_STATE_DIR and the journal is removed once the
+page is re-added; a journal left by an interrupted run is replayed before
+anything else. Records already in the compact schema are skipped, so an
+interrupted migration can simply be run again.
+
+Usage:
+    python utils/migrate_metadata.py --collection my_collection
+    python utils/migrate_metadata.py --dry-run
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+
+from utils.chunking import INLINE_SOURCE, chunk_id, chunk_metadata, document_id
+from utils.ingest_data import INGEST_STATE_DIR, IngestManifest, batched, get_collection
+from utils.lexical_index import LEXICAL_INDEX_PATH, LexicalIndex
+
+# Keys of the legacy schema that the compact schema drops
+LEGACY_METADATA_KEYS = ("doc", "doc_index", "total_chunks")
+
+
+def compact_legacy_metadata(metadata: dict, document: str) -> dict:
+    """Map one legacy metadata dict to the compact schema."""
+    source = metadata.get("source", INLINE_SOURCE)
+    doc_id = metadata.get("doc_id")
+    if doc_id is None:
+        # File documents are identified by path; inline ones only by their full
+        # text, which a chunk alone cannot recover, so use the ingestion position
+        doc_id = (
+            document_id(source, "") if source != INLINE_SOURCE
+            else document_id(INLINE_SOURCE, f"legacy\0{metadata.get('doc_index', 0)}")
+        )
+    return chunk_metadata(
+        source,
+        doc_id,
+        metadata.get("chunk_index", 0),
+        document,
+        metadata.get("start"),
+    )
+
+
+def is_legacy(metadata: dict | None) -> bool:
+    return metadata is None or any(key in metadata for key in LEGACY_METADATA_KEYS)
+
+
+def payload_bytes(ids, documents, metadatas) -> int:
+    """Serialized size of records as they travel in a ChromaDB response."""
+    return len(json.dumps({"ids": ids, "documents": documents, "metadatas": metadatas}).encode("utf-8"))
+
+
+def chunk_occurrences(collection, all_ids: list[str], page_size: int) -> dict[str, int]:
+    """
+    Occurrence number of each legacy record's text within its document.
+
+    `chunk_id` numbers repeated identical chunks of one document in order, and
+    repeats can be pages apart, so this pass sees every legacy record first.
+    """
+    records = []
+    for ids in batched(all_ids, page_size):
+        page = collection.get(ids=ids, include=["documents", "metadatas"])
+        for record_id, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            if not is_legacy(metadata):
+                continue
+            metadata = metadata or {}
+            document = document or metadata.get("doc", "")
+            compact = compact_legacy_metadata(metadata, document)
+            records.append((compact["doc_id"], compact["chunk_index"], record_id, document))
+
+    occurrences = {}
+    seen = {}
+    for doc_id, _, record_id, document in sorted(records):
+        key = (doc_id, document)
+        occurrences[record_id] = seen.get(key, 0)
+        seen[key] = occurrences[record_id] + 1
+    return occurrences
+
+
+class MigrationJournal:
+    """The page being rewritten, kept on disk until it is back in the collection."""
+
+    def __init__(self, collection_name: str, state_dir: str = INGEST_STATE_DIR):
+        os.makedirs(state_dir, exist_ok=True)
+        self.path = os.path.join(state_dir, f"migrate_{collection_name}.json")
+
+    def write(self, page: dict):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(page, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def read(self) -> dict | None:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as f:
+            return json.load(f)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def apply_page(collection, page: dict, manifest: IngestManifest | None, lexical_index: LexicalIndex | None):
+    """
+    Replace a page's legacy records with their migrated copies.
+
+    Idempotent, so a journaled page can be applied again after a crash at any step.
+    """
+    collection.delete(ids=sorted(set(page["old_ids"]) | set(page["ids"])))
+    collection.add(
+        ids=page["ids"],
+        embeddings=page["embeddings"],
+        documents=page["documents"],
+        metadatas=page["metadatas"],
+    )
+    if lexical_index is not None:
+        lexical_index.delete(page["old_ids"])
+        lexical_index.add(page["ids"], page["documents"])
+    if manifest is not None:
+        documents = {}
+        for record_id, metadata in zip(page["ids"], page["metadatas"]):
+            documents.setdefault((metadata["doc_id"], metadata["source"]), []).append(record_id)
+        for (doc_id, source), chunk_ids in documents.items():
+            manifest.add_chunks(doc_id, source, source, chunk_ids)
+
+
+def migrate_collection(
+    collection,
+    page_size: int = 256,
+    dry_run: bool = False,
+    state_dir: str = INGEST_STATE_DIR,
+    lexical_index: LexicalIndex | None = None,
+) -> dict:
+    """
+    Rewrite legacy records of a collection to the compact metadata schema and content-addressed ids.
+
+    Args:
+        collection: Collection to migrate
+        page_size: Records rewritten per round trip
+        dry_run: Only report what would change
+        state_dir: Directory holding the ingestion manifest and the migration journal
+        lexical_index: BM25 index of the collection, moved to the new ids; None leaves it alone
+
+    Returns:
+        A report with records scanned and migrated, and payload bytes
+        (ids + documents + metadatas) before and after.
+    """
+    report = {
+        "records": 0,
+        "migrated": 0,
+        "replayed": 0,
+        "payload_bytes_before": 0,
+        "payload_bytes_after": 0,
+        "dry_run": dry_run,
+    }
+    journal = manifest = None
+    if not dry_run:
+        journal = MigrationJournal(collection.name, state_dir)
+        manifest = IngestManifest(collection.name, state_dir)
+    try:
+        leftover = journal.read() if journal is not None else None
+        if leftover is not None:
+            apply_page(collection, leftover, manifest, lexical_index)
+            journal.clear()
+            report["replayed"] = len(leftover["ids"])
+
+        # Re-added records move within the collection, so page over a fixed id list
+        all_ids = collection.get(include=[])["ids"]
+        occurrences = chunk_occurrences(collection, all_ids, page_size)
+        for ids in batched(all_ids, page_size):
+            page = collection.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+            report["records"] += len(page["ids"])
+            report["payload_bytes_before"] += payload_bytes(page["ids"], page["documents"], page["metadatas"])
+
+            legacy = [i for i, metadata in enumerate(page["metadatas"]) if is_legacy(metadata)]
+            record_ids = list(page["ids"])
+            metadatas = list(page["metadatas"])
+            documents = list(page["documents"])
+            for i in legacy:
+                metadata = metadatas[i] or {}
+                # Older records may only have the text in metadata
+                documents[i] = documents[i] or metadata.get("doc", "")
+                metadatas[i] = compact_legacy_metadata(metadata, documents[i])
+                record_ids[i] = chunk_id(metadatas[i]["doc_id"], documents[i], occurrences[page["ids"][i]])
+            report["payload_bytes_after"] += payload_bytes(record_ids, documents, metadatas)
+
+            if legacy and not dry_run:
+                migrated = {
+                    "old_ids": [page["ids"][i] for i in legacy],
+                    "ids": [record_ids[i] for i in legacy],
+                    "embeddings": [[float(x) for x in page["embeddings"][i]] for i in legacy],
+                    "documents": [documents[i] for i in legacy],
+                    "metadatas": [metadatas[i] for i in legacy],
+                }
+                journal.write(migrated)
+                apply_page(collection, migrated, manifest, lexical_index)
+                journal.clear()
+            report["migrated"] += len(legacy)
+    finally:
+        if manifest is not None:
+            manifest.close()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate chunk metadata to the compact schema.")
+    parser.add_argument("--collection", default=os.getenv("CHROMA_COLLECTION_NAME", "my_collection"))
+    parser.add_argument("--page-size", type=int, default=256, help="Records rewritten per round trip")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would change")
+    args = parser.parse_args()
+
+    _, collection = get_collection(args.collection)
+    # Move the BM25 index along, if the collection has one
+    lexical_index = LexicalIndex(args.collection) if os.path.exists(LEXICAL_INDEX_PATH) else None
+    if lexical_index is not None and not len(lexical_index):
+        lexical_index.close()
+        lexical_index = None
+    try:
+        report = migrate_collection(
+            collection, page_size=args.page_size, dry_run=args.dry_run, lexical_index=lexical_index
+        )
+    finally:
+        if lexical_index is not None:
+            lexical_index.close()
+    for key, value in report.items():
+        print(f"{key:>22}: {value}")
+    if report["payload_bytes_before"]:
+        print(f"{'payload reduction':>22}: {1 - report['payload_bytes_after'] / report['payload_bytes_before']:.1%}")
@@ -1,20 +1,20 @@
 """Node definitions for multi-agent system with supervisor."""
 
+from contextlib import asynccontextmanager
 from langchain.agents import create_agent
+from langgraph.graph import START, END
 from langgraph_supervisor import create_supervisor
-from langgraph.checkpoint.sqlite import SqliteSaver
-import sqlite3
+from .checkpoint import PooledSqliteSaver, CHECKPOINT_DB_PATH
 from .tools import (
-    calculator_tool, gmail_send_tool, 
-    jira_get_projects, jira_create_issue, jira_add_comment, search_in_knowledge
+    calculator_tool, calculator_batch_tool, gmail_send_tool, 
+    jira_get_projects, jira_create_issue, jira_add_comment, jira_create_issues_bulk, jira_add_comments_bulk,
+    search_in_knowledge, search_in_knowledge_batch
 )
+from .history import history_manager, HISTORY_NODE
+from .router import router, after_worker, ROUTER_NODE
+from .planner import planner, PLANNER_NODE
 from utils.util import llm
 
-# Initialize persistent memory checkpointer
-# Memory will persist even after server restarts
-conn = sqlite3.connect("checkpoints.db", check_same_thread=False)
-memory = SqliteSaver(conn)
-
 # =========================
 # Worker Agents
 # =========================
@@ -22,12 +22,14 @@ memory = SqliteSaver(conn)
 # Research agent - handles knowledge searches and factual queries
 research_agent = create_agent(
     model=llm,
-    tools=[search_in_knowledge], 
+    tools=[search_in_knowledge, search_in_knowledge_batch], 
     system_prompt=(
         "You are a research agent specialized in finding information.\n\n"
         "INSTRUCTIONS:\n"
         "- Assist ONLY with research-related tasks, including looking up factual information, "
         "- Use the search_in_knowledge tool to find relevant information.\n"
+        "- When you need several facts, call search_in_knowledge_batch ONCE with all the queries "
+        "instead of calling search_in_knowledge once per query.\n"
         "- After you're done with your tasks, respond to the supervisor directly with your findings.\n"
         "- Respond ONLY with the results of your work, do NOT include ANY other text.\n"
     ),
@@ -53,12 +55,13 @@ email_handler_agent = create_agent(
 # Calculator agent - handles mathematical calculations
 calculator_agent = create_agent(
     model=llm,
-    tools=[calculator_tool],
+    tools=[calculator_tool, calculator_batch_tool],
     system_prompt=(
         "You are a calculator agent specialized in mathematical computations.\n\n"
         "INSTRUCTIONS:\n"
         "- Assist ONLY with mathematical calculations and problem-solving.\n"
         "- Use the calculator_tool to evaluate mathematical expressions.\n"
+        "- To evaluate the same formula for many inputs, call calculator_batch_tool once with lists of values.\n"
         "- After you're done with your tasks, respond to the supervisor directly.\n"
         "- Respond ONLY with the results of your work, do NOT include ANY other text.\n"
     ),
@@ -68,7 +71,7 @@ calculator_agent = create_agent(
 # Jira agent - handles Jira ticket management
 jira_agent = create_agent(
     model=llm,
-    tools=[jira_get_projects, jira_create_issue, jira_add_comment],
+    tools=[jira_get_projects, jira_create_issue, jira_add_comment, jira_create_issues_bulk, jira_add_comments_bulk],
     system_prompt=(
         "You are a Jira agent specialized in managing Jira tickets and projects.\n\n"
         "INSTRUCTIONS:\n"
@@ -76,6 +79,8 @@ jira_agent = create_agent(
         "- Use jira_get_projects to list all available projects.\n"
         "- Use jira_create_issue to create new issues (requires JSON format with project, summary, issuetype).\n"
         "- Use jira_add_comment to add comments to existing issues.\n"
+        "- To create several issues or add several comments, call jira_create_issues_bulk or "
+        "jira_add_comments_bulk ONCE with all of them instead of one call per item; report any items that failed.\n"
         "- When creating issues, ensure proper JSON formatting with required fields.\n"
         "- After you're done with your tasks, respond to the supervisor directly with the results.\n"
         "- Respond ONLY with the results of your work, do NOT include ANY other text.\n"
@@ -87,16 +92,24 @@ jira_agent = create_agent(
 # Supervisor Agent
 # =========================
 
+WORKERS = [research_agent, email_handler_agent, calculator_agent, jira_agent]
+
+# What each worker is for; shown to the supervisor and the planner
+WORKER_DESCRIPTIONS = {
+    "researcher": "Assign knowledge search and any questions user wonders to this agent.",
+    "email_handler": "Assign email sending tasks to this agent.",
+    "calculator": "Assign mathematical calculations and computations to this agent.",
+    "jira_handler": "Assign Jira-related tasks (list projects, create tickets, add comments) to this agent.",
+}
+
 # Create supervisor multi-agent that delegates tasks to worker agents
-agent_executor = create_supervisor(
+supervisor_workflow = create_supervisor(
     model=llm,
-    agents=[research_agent, email_handler_agent, calculator_agent, jira_agent],
+    agents=WORKERS,
     prompt=(
         "You are a supervisor managing four specialized agents:\n"
-        "- researcher: Assign knowledge search and any questions user wonders to this agent.\n"
-        "- email_handler: Assign email sending tasks to this agent.\n"
-        "- calculator: Assign mathematical calculations and computations to this agent.\n"
-        "- jira_handler: Assign Jira-related tasks (list projects, create tickets, add comments) to this agent.\n\n"
+        + "".join(f"- {name}: {description}\n" for name, description in WORKER_DESCRIPTIONS.items())
+        + "\n"
         "CRITICAL RULES:\n"
         "- Delegate tasks to the appropriate agent and let them complete the work.\n"
         "- DO NOT tell the user you are delegating - just delegate silently.\n"
@@ -106,4 +119,44 @@ agent_executor = create_supervisor(
     ),
     add_handoff_back_messages=True,
     output_mode="last_message",
-).compile(checkpointer=memory)
\ No newline at end of file
+)
+
+# Compact the stored conversation once per turn, before the supervisor sees it,
+# so the supervisor and every worker receive the capped history
+if history_manager.mode != "off":
+    supervisor_workflow.add_node(HISTORY_NODE, history_manager.as_node())
+    supervisor_workflow.edges.discard((START, "supervisor"))
+    supervisor_workflow.add_edge(START, HISTORY_NODE)
+    supervisor_workflow.add_edge(HISTORY_NODE, "supervisor")
+
+# Send confident, single-intent requests straight to a worker; its answer ends the turn
+if router.enabled:
+    first_node = HISTORY_NODE if history_manager.mode != "off" else START
+    worker_names = [agent.name for agent in WORKERS]
+    supervisor_workflow.add_node(ROUTER_NODE, router.as_node(), destinations=("supervisor", *worker_names))
+    supervisor_workflow.edges.discard((first_node, "supervisor"))
+    supervisor_workflow.add_edge(first_node, ROUTER_NODE)
+    for name in worker_names:
+        supervisor_workflow.edges.discard((name, "supervisor"))
+        supervisor_workflow.add_conditional_edges(name, after_worker, ["supervisor", END])
+
+# Plan compound requests into a task graph and run independent tasks concurrently; ahead of the router
+if planner.mode != "off":
+    first_node = HISTORY_NODE if history_manager.mode != "off" else START
+    next_node = ROUTER_NODE if router.enabled else "supervisor"
+    planner.bind({agent.name: agent for agent in WORKERS}, WORKER_DESCRIPTIONS, next_node)
+    supervisor_workflow.add_node(PLANNER_NODE, planner.as_node(), destinations=(next_node, END))
+    supervisor_workflow.edges.discard((first_node, next_node))
+    supervisor_workflow.add_edge(first_node, PLANNER_NODE)
+
+
+@asynccontextmanager
+async def open_agent_executor(db_path: str = CHECKPOINT_DB_PATH):
+    """
+    Compile the supervisor graph against the pooled SQLite checkpointer.
+
+    Memory persists even after server restarts; the checkpointer's writer
+    thread and reader pool live for the duration of this context.
+    """
+    with PooledSqliteSaver.from_conn_string(db_path) as memory:
+        yield supervisor_workflow.compile(checkpointer=memory)
\ No newline at end of file
@@ -0,0 +1,312 @@
+"""
+Planning mode: run the worker agents of a compound request concurrently.
+
+The supervisor hands work to one worker at a time, with an LLM round between
+each, so "look up X, compute Y and file a Jira ticket" runs the researcher,
+calculator and jira_handler one after another. For requests that look
+compound, this stage runs first instead:
+
+- plan: one LLM call turns the request into a small task graph, each task
+  naming a worker, a self-contained instruction and the tasks it depends on
+- fan out: tasks whose dependencies are done run concurrently (at most
+  PLANNER_MAX_PARALLEL at once); a task sees its dependencies' results
+- join: one LLM call combines the results into the answer, ending the turn
+
+Plans with fewer than two tasks, invalid plans and planner errors hand the
+turn to the next stage (router or supervisor) as if planning were off.
+
+A planned turn is announced on the graph's custom stream, followed by task
+start/finish events; the join call is tagged in its run metadata, so a
+streaming client shows only the join's tokens as the answer.
+
+PLANNER_MODE: multi_intent (plan requests that look compound) | always | off
+"""
+
+import os
+import re
+import json
+import asyncio
+
+from langgraph.graph import END
+from langgraph.types import Command
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+
+from .completion_cache import AGENT_METADATA_KEY
+from .router import (
+    MULTI_INTENT_PATTERN, ROUTE_RULES, MENTION_PATTERNS, ROUTER_MAX_CHARS, SUPERVISOR,
+    emit_stream_event, latest_user_message,
+)
+from .util import llm, logger
+
+# =========================
+# Configuration
+# =========================
+PLANNER_MODE = os.getenv("PLANNER_MODE", "multi_intent")
+PLANNER_MAX_TASKS = int(os.getenv("PLANNER_MAX_TASKS", "6"))
+PLANNER_MAX_PARALLEL = int(os.getenv("PLANNER_MAX_PARALLEL", "4"))
+PLANNER_TASK_TIMEOUT_SECONDS = float(os.getenv("PLANNER_TASK_TIMEOUT_SECONDS", "120"))
+
+PLANNER_NODE = "planner"
+# Run metadata naming the planner's own LLM calls: "plan" or "join"
+PLANNER_STEP_METADATA_KEY = "planner_step"
+
+# Separate requests in one sentence: "look up X, compute Y and file a ticket"
+ACTION_PATTERN = re.compile(
+    r"(?:^|[,;.]|\band\b)\s*(?:please\s+|then\s+|also\s+)?"
+    r"(?:look up|search|find|research|calculate|compute|work out|send|e-?mail|mail|"
+    r"create|file|open|raise|comment|add a comment|list)\b",
+    re.IGNORECASE,
+)
+
+PLAN_PROMPT = (
+    "You are a planner for a team of specialized agents:\n"
+    "{workers}\n\n"
+    "Split the user's latest request into tasks for these agents.\n"
+    "RULES:\n"
+    "- Each task goes to exactly one agent and must be self-contained: include every name, number, "
+    "email address and issue key it needs from the conversation.\n"
+    "- List in depends_on the ids of tasks whose results a task needs; independent tasks have an empty list.\n"
+    "- Use at most {max_tasks} tasks. If the request needs only one agent, or needs clarification, "
+    "return an empty task list.\n"
+    "Respond ONLY with JSON of the form:\n"
+    '{{"tasks": [{{"id": "t1", "agent": "<agent>", "task": "<instruction>", "depends_on": []}}]}}'
+)
+
+JOIN_PROMPT = (
+    "You are the supervisor of a team of agents. They have finished the tasks planned for the user's "
+    "request. Answer the user using their results: present what was done and found, report any task "
+    "that failed, and do NOT mention the agents or the plan."
+)
+
+
+class PlanError(ValueError):
+    """The planner's output is not a usable task graph."""
+
+
+def parse_plan(text: str, workers, max_tasks: int = PLANNER_MAX_TASKS) -> list[dict]:
+    """
+    Validate the planner's JSON into tasks ordered so dependencies come first.
+
+    Raises PlanError for malformed JSON, unknown agents or ids, too many
+    tasks and dependency cycles.
+    """
+    match = re.search(r"\{.*\}", text or "", re.DOTALL)
+    if not match:
+        raise PlanError("no JSON object in the plan")
+    try:
+        tasks = json.loads(match.group(0)).get("tasks")
+    except (json.JSONDecodeError, AttributeError) as e:
+        raise PlanError(f"invalid plan JSON: {e}")
+    if not isinstance(tasks, list):
+        raise PlanError("'tasks' is not a list")
+    if len(tasks) > max_tasks:
+        raise PlanError(f"{len(tasks)} tasks, at most {max_tasks} allowed")
+
+    by_id = {}
+    for position, task in enumerate(tasks, 1):
+        if not isinstance(task, dict) or not isinstance(task.get("task"), str) or not task["task"].strip():
+            raise PlanError(f"task {position} has no instruction")
+        if task.get("agent") not in workers:
+            raise PlanError(f"task {position} names unknown agent {task.get('agent')!r}")
+        task_id = str(task.get("id") or f"t{position}")
+        if task_id in by_id:
+            raise PlanError(f"duplicate task id {task_id!r}")
+        depends_on = task.get("depends_on") or []
+        if not isinstance(depends_on, list):
+            raise PlanError(f"task {task_id!r} has an invalid depends_on")
+        by_id[task_id] = {"id": task_id, "agent": task["agent"], "task": task["task"].strip(),
+                          "depends_on": [str(dep) for dep in depends_on]}
+
+    ordered, done = [], set()
+    while len(ordered) < len(by_id):
+        ready = [task for task in by_id.values() if task["id"] not in done and set(task["depends_on"]) <= done]
+        if not ready:
+            unknown = {dep for task in by_id.values() for dep in task["depends_on"]} - set(by_id)
+            raise PlanError(f"unknown dependencies {sorted(unknown)}" if unknown else "dependency cycle")
+        ordered += ready
+        done |= {task["id"] for task in ready}
+    return ordered
+
+
+def final_text(result: dict) -> str:
+    """The last non-empty AI answer of a worker run."""
+    for message in reversed(result.get("messages", [])):
+        if isinstance(message, AIMessage) and isinstance(message.content, str) and message.content.strip():
+            return message.content
+    return ""
+
+
+class Planner:
+    """Plans compound requests into a task graph and runs independent tasks concurrently."""
+
+    def __init__(
+        self,
+        model=llm,
+        mode: str = PLANNER_MODE,
+        max_tasks: int = PLANNER_MAX_TASKS,
+        max_parallel: int = PLANNER_MAX_PARALLEL,
+        task_timeout: float = PLANNER_TASK_TIMEOUT_SECONDS,
+    ):
+        if mode not in ("multi_intent", "always", "off"):
+            raise ValueError(f"Unknown PLANNER_MODE '{mode}'. Use 'multi_intent', 'always' or 'off'.")
+        self.model = model
+        self.mode = mode
+        self.max_tasks = max_tasks
+        self.max_parallel = max_parallel
+        self.task_timeout = task_timeout
+        # Set by the graph builder: worker agents by name, and the stage that handles unplanned turns
+        self.workers = {}
+        self.descriptions = {}
+        self.next_node = SUPERVISOR
+        self.stats = {
+            "requests": 0,
+            "planned": 0,
+            "fallbacks": 0,
+            "plan_errors": 0,
+            "tasks": 0,
+            "failed_tasks": 0,
+            "waves": 0,
+        }
+
+    def bind(self, workers: dict, descriptions: dict[str, str], next_node: str):
+        self.workers = dict(workers)
+        self.descriptions = dict(descriptions)
+        self.next_node = next_node
+
+    def looks_compound(self, text: str) -> bool:
+        """Whether a message asks for several things, possibly from different agents."""
+        if len(text) > ROUTER_MAX_CHARS:
+            # Too long for the router's rules to run on the event loop; the supervisor handles it
+            return False
+        if MULTI_INTENT_PATTERN.search(text) or len(ACTION_PATTERN.findall(text)) >= 2:
+            return True
+        agents = {agent for agent, patterns in ROUTE_RULES.items() if any(p.search(text) for p in patterns)}
+        agents |= {agent for agent, pattern in MENTION_PATTERNS.items() if pattern.search(text)}
+        return len(agents) >= 2
+
+    async def plan(self, messages) -> list[dict]:
+        workers = "\n".join(f"- {name}: {self.descriptions.get(name, '')}" for name in self.workers)
+        prompt = PLAN_PROMPT.format(workers=workers, max_tasks=self.max_tasks)
+        response = await self.model.ainvoke(
+            [SystemMessage(content=prompt), *messages],
+            config={"metadata": {PLANNER_STEP_METADATA_KEY: "plan"}},
+        )
+        return parse_plan(response.content, self.workers, self.max_tasks)
+
+    async def run_task(self, task: dict, results: dict, semaphore: asyncio.Semaphore) -> str:
+        """Run one task on its worker; raises if the worker fails or times out."""
+        context = "\n".join(f"- {dep}: {results[dep]}" for dep in task["depends_on"])
+        content = task["task"] if not context else f"{task['task']}\n\nResults of earlier steps:\n{context}"
+        async with semaphore:
+            emit_stream_event("task", id=task["id"], agent=task["agent"], status="started")
+            try:
+                result = await asyncio.wait_for(
+                    self.workers[task["agent"]].ainvoke(
+                        {"messages": [HumanMessage(content=content)]},
+                        # Workers run inside the planner node; name the agent for the completion cache
+                        config={"metadata": {AGENT_METADATA_KEY: task["agent"]}},
+                    ),
+                    self.task_timeout,
+                )
+            except BaseException:
+                emit_stream_event("task", id=task["id"], agent=task["agent"], status="failed")
+                raise
+        emit_stream_event("task", id=task["id"], agent=task["agent"], status="done")
+        return final_text(result) or "(no answer)"
+
+    async def execute(self, tasks: list[dict]) -> tuple[dict, dict]:
+        """Run the task graph wave by wave; returns answers and errors by task id."""
+        semaphore = asyncio.Semaphore(max(1, self.max_parallel))
+        results, errors = {}, {}
+        pending = list(tasks)
+        while pending:
+            # A task whose dependency failed cannot run
+            blocked = [task for task in pending if set(task["depends_on"]) & set(errors)]
+            for task in blocked:
+                errors[task["id"]] = "skipped: a task it depends on failed"
+            pending = [task for task in pending if task not in blocked]
+            wave = [task for task in pending if set(task["depends_on"]) <= set(results)]
+            if not wave:
+                break
+            self.stats["waves"] += 1
+            logger.info(f"🗺️ Planner wave: {', '.join(task['id'] + '→' + task['agent'] for task in wave)}")
+            outcomes = await asyncio.gather(
+                *(self.run_task(task, results, semaphore) for task in wave), return_exceptions=True
+            )
+            for task, outcome in zip(wave, outcomes):
+                if isinstance(outcome, BaseException):
+                    message = "timed out" if isinstance(outcome, asyncio.TimeoutError) else str(outcome)
+                    errors[task["id"]] = message or outcome.__class__.__name__
+                    logger.warning(f"   ❌ Task {task['id']} ({task['agent']}) failed: {errors[task['id']]}")
+                else:
+                    results[task["id"]] = outcome
+            pending = [task for task in pending if task not in wave]
+        return results, errors
+
+    async def join(self, messages, tasks: list[dict], results: dict, errors: dict) -> str:
+        lines = []
+        for task in tasks:
+            outcome = results.get(task["id"], f"FAILED: {errors.get(task['id'])}")
+            lines.append(f"[{task['id']}] {task['agent']}: {task['task']}\nResult: {outcome}")
+        response = await self.model.ainvoke(
+            [
+                SystemMessage(content=JOIN_PROMPT),
+                *messages,
+                HumanMessage(content="Task results:\n\n" + "\n\n".join(lines)),
+            ],
+            # The join's tokens are the answer; a streaming client tells them apart by this tag
+            config={"metadata": {PLANNER_STEP_METADATA_KEY: "join"}},
+        )
+        return response.content
+
+    async def arun(self, state: dict) -> Command:
+        """Graph node: plan, fan out and join a compound request, or pass the turn on."""
+        messages = state["messages"]
+        text = latest_user_message(messages)
+        if self.mode == "off" or text is None or not self.workers:
+            return Command(goto=self.next_node)
+        if self.mode == "multi_intent" and not self.looks_compound(text):
+            return Command(goto=self.next_node)
+
+        self.stats["requests"] += 1
+        try:
+            tasks = await self.plan(messages)
+        except Exception as e:
+            self.stats["plan_errors"] += 1
+            logger.warning(f"Planner failed, handing the turn to {self.next_node}: {e}")
+            return Command(goto=self.next_node)
+        if len(tasks) < 2:
+            self.stats["fallbacks"] += 1
+            logger.info(f"🗺️ Planner: {len(tasks)} task(s), handing the turn to {self.next_node}")
+            return Command(goto=self.next_node)
+
+        self.stats["planned"] += 1
+        self.stats["tasks"] += len(tasks)
+        logger.info(f"🗺️ Planner: {len(tasks)} tasks")
+        emit_stream_event("route", to=PLANNER_NODE, reason="planned")
+        results, errors = await self.execute(tasks)
+        self.stats["failed_tasks"] += len(errors)
+        answer = await self.join(messages, tasks, results, errors)
+
+        # Worker answers are kept under their agent's name, like the supervisor's handoffs
+        worker_messages = [
+            AIMessage(content=results[task["id"]], name=task["agent"]) for task in tasks if task["id"] in results
+        ]
+        return Command(
+            goto=END,
+            update={"messages": [*worker_messages, AIMessage(content=answer, name=PLANNER_NODE)]},
+        )
+
+    def run(self, state: dict) -> Command:
+        # The graph runs on the async path; the sync path leaves planning off
+        return Command(goto=self.next_node)
+
+    def as_node(self) -> RunnableLambda:
+        return RunnableLambda(self.run, afunc=self.arun, name=PLANNER_NODE)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "mode": self.mode}
+
+
+planner = Planner()
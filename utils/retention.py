@@ -0,0 +1,207 @@
+"""
+Checkpoint retention: compaction, idle-thread expiry and scheduled VACUUM.
+
+Every turn appends checkpoints for its thread_id, so without pruning the
+checkpoint database grows without bound. Retention keeps only the latest N
+checkpoints per thread and namespace, drops threads idle for longer than a
+TTL, deletes pending writes orphaned by either, and periodically VACUUMs the
+file so freed pages are returned to the filesystem.
+
+Usage:
+    python utils/retention.py --keep-last 20 --ttl-hours 720 --vacuum
+"""
+
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import asyncio
+import sqlite3
+import time
+import uuid
+
+from utils.util import logger
+from utils.checkpoint import CHECKPOINT_DB_PATH, CHECKPOINT_BUSY_TIMEOUT_MS
+
+# =========================
+# Configuration
+# =========================
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "20"))
+CHECKPOINT_THREAD_TTL_HOURS = float(os.getenv("CHECKPOINT_THREAD_TTL_HOURS", "720"))
+CHECKPOINT_RETENTION_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_RETENTION_INTERVAL_SECONDS", "3600"))
+CHECKPOINT_VACUUM_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_VACUUM_INTERVAL_SECONDS", "86400"))
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+
+def checkpoint_timestamp(checkpoint_id: str) -> float:
+    """Recover the Unix creation time encoded in a uuid6 checkpoint id."""
+    value = uuid.UUID(checkpoint_id).int
+    timestamp = (((value >> 80) & 0xFFFFFFFFFFFF) << 12) | ((value >> 64) & 0x0FFF)
+    return (timestamp - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def _file_size(db_path: str) -> int:
+    """Size on disk of the database plus its WAL file."""
+    return sum(
+        os.path.getsize(path)
+        for path in (db_path, f"{db_path}-wal")
+        if os.path.exists(path)
+    )
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout={CHECKPOINT_BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def expire_idle_threads(conn: sqlite3.Connection, ttl_hours: float, now: float = None) -> list[str]:
+    """Delete every checkpoint and write of threads idle for longer than the TTL."""
+    if ttl_hours <= 0:
+        return []
+    cutoff = (now or time.time()) - ttl_hours * 3600
+
+    expired = []
+    for thread_id, latest_id in conn.execute(
+        "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+    ):
+        try:
+            if checkpoint_timestamp(latest_id) < cutoff:
+                expired.append(thread_id)
+        except ValueError:
+            logger.warning("Skipping thread %s with non-uuid checkpoint id %s", thread_id, latest_id)
+
+    for thread_id in expired:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        conn.execute("COMMIT")
+    return expired
+
+
+def compact_threads(conn: sqlite3.Connection, keep_last: int) -> tuple[int, int]:
+    """
+    Keep only the latest `keep_last` checkpoints per thread and namespace.
+
+    Returns:
+        The number of deleted checkpoints and orphaned writes.
+    """
+    if keep_last < 1:
+        raise ValueError("keep_last must be at least 1 so every thread keeps its latest state")
+
+    conn.execute("BEGIN IMMEDIATE")
+    deleted_checkpoints = conn.execute(
+        """
+        DELETE FROM checkpoints WHERE rowid IN (
+            SELECT rowid FROM (
+                SELECT rowid, ROW_NUMBER() OVER (
+                    PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                ) AS position
+                FROM checkpoints
+            ) WHERE position > ?
+        )
+        """,
+        (keep_last,),
+    ).rowcount
+    deleted_writes = conn.execute(
+        """
+        DELETE FROM writes WHERE NOT EXISTS (
+            SELECT 1 FROM checkpoints c
+            WHERE c.thread_id = writes.thread_id
+              AND c.checkpoint_ns = writes.checkpoint_ns
+              AND c.checkpoint_id = writes.checkpoint_id
+        )
+        """
+    ).rowcount
+    conn.execute("COMMIT")
+    return deleted_checkpoints, deleted_writes
+
+
+def run_retention(
+    db_path: str = CHECKPOINT_DB_PATH,
+    keep_last: int = CHECKPOINT_KEEP_LAST,
+    ttl_hours: float = CHECKPOINT_THREAD_TTL_HOURS,
+    vacuum: bool = False,
+) -> dict:
+    """
+    Apply the retention policy to a checkpoint database.
+
+    Returns:
+        A report with the expired threads, deleted rows and bytes reclaimed.
+    """
+    if not os.path.exists(db_path):
+        return {"db_path": db_path, "skipped": "database does not exist"}
+
+    size_before = _file_size(db_path)
+    conn = _connect(db_path)
+    try:
+        expired = expire_idle_threads(conn, ttl_hours)
+        deleted_checkpoints, deleted_writes = compact_threads(conn, keep_last)
+
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        freed_bytes = conn.execute("PRAGMA freelist_count").fetchone()[0] * page_size
+        if vacuum:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+
+    size_after = _file_size(db_path)
+    report = {
+        "db_path": db_path,
+        "expired_threads": len(expired),
+        "deleted_checkpoints": deleted_checkpoints,
+        "deleted_writes": deleted_writes,
+        "free_page_bytes": freed_bytes,
+        "vacuumed": vacuum,
+        "size_before": size_before,
+        "size_after": size_after,
+        "bytes_reclaimed": max(size_before - size_after, 0),
+    }
+    logger.info(
+        "🧹 Checkpoint retention: expired %s thread(s), deleted %s checkpoint(s) and %s write(s), "
+        "reclaimed %s bytes%s",
+        report["expired_threads"],
+        deleted_checkpoints,
+        deleted_writes,
+        report["bytes_reclaimed"],
+        " (vacuumed)" if vacuum else "",
+    )
+    return report
+
+
+async def retention_loop(
+    db_path: str = CHECKPOINT_DB_PATH,
+    interval_seconds: float = CHECKPOINT_RETENTION_INTERVAL_SECONDS,
+    vacuum_interval_seconds: float = CHECKPOINT_VACUUM_INTERVAL_SECONDS,
+):
+    """Run retention periodically off the event loop, vacuuming on its own schedule."""
+    last_vacuum = time.monotonic()
+    while True:
+        await asyncio.sleep(interval_seconds)
+        vacuum = (
+            vacuum_interval_seconds > 0
+            and time.monotonic() - last_vacuum >= vacuum_interval_seconds
+        )
+        try:
+            await asyncio.to_thread(run_retention, db_path, vacuum=vacuum)
+            if vacuum:
+                last_vacuum = time.monotonic()
+        except Exception:
+            logger.exception("❌ Checkpoint retention failed")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prune and compact the checkpoint database.")
+    parser.add_argument("--db", default=CHECKPOINT_DB_PATH, help="Path to the checkpoint database")
+    parser.add_argument("--keep-last", type=int, default=CHECKPOINT_KEEP_LAST, help="Checkpoints to keep per thread")
+    parser.add_argument("--ttl-hours", type=float, default=CHECKPOINT_THREAD_TTL_HOURS, help="Expire threads idle for longer than this (0 disables)")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the database after pruning")
+    args = parser.parse_args()
+
+    report = run_retention(args.db, keep_last=args.keep_last, ttl_hours=args.ttl_hours, vacuum=args.vacuum)
+    for key, value in report.items():
+        print(f"{key:>20}: {value}")
@@ -0,0 +1,308 @@
+"""
+Hybrid retrieval for the knowledge-base tools.
+
+A query runs against two retrievers:
+
+- vector: the collection's nearest neighbours of the query embedding
+- lexical: the local BM25 index built at ingest time (utils.lexical_index)
+
+Their rankings are merged with reciprocal-rank fusion, optionally reordered
+by a reranker, and the top-k chunks are packed into one context string under
+a token budget. Overlapping chunks of the same document are merged by their
+character offsets, so the agent gets contiguous passages instead of repeated
+fragments.
+"""
+
+import os
+import asyncio
+from dataclasses import dataclass, field, replace
+
+from .lexical_index import LEXICAL_INDEX_PATH, LexicalIndex
+from .util import embeddings, logger
+
+# =========================
+# Configuration
+# =========================
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_RRF_K = int(os.getenv("RETRIEVAL_RRF_K", "60"))
+RETRIEVAL_HYBRID = os.getenv("RETRIEVAL_HYBRID", "true").lower() == "true"
+RETRIEVAL_RERANK = os.getenv("RETRIEVAL_RERANK", "none")
+RETRIEVAL_RERANK_MODEL = os.getenv("RETRIEVAL_RERANK_MODEL", "jina-reranker-v2-base-multilingual")
+RETRIEVAL_CONTEXT_TOKENS = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "1500"))
+RETRIEVAL_MAX_BATCH_QUERIES = int(os.getenv("RETRIEVAL_MAX_BATCH_QUERIES", "8"))
+
+NO_RESULTS = "No results in my mind about it."
+
+
+def approx_tokens(text: str) -> int:
+    """Same ~4 characters per token estimate as the history token counter."""
+    return max(1, len(text) // 4)
+
+
+@dataclass
+class RetrievedChunk:
+    id: str
+    text: str
+    metadata: dict = field(default_factory=dict)
+    score: float = 0.0
+    vector_rank: int | None = None
+    lexical_rank: int | None = None
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], rrf_k: int = RETRIEVAL_RRF_K) -> dict[str, float]:
+    """Fuse ranked id lists: each list adds 1 / (rrf_k + rank) to its ids."""
+    scores = {}
+    for ranking in rankings:
+        for rank, chunk_id in enumerate(ranking, start=1):
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + 1.0 / (rrf_k + rank)
+    return scores
+
+
+class JinaReranker:
+    """Reranks candidates with the Jina rerank API, using the embedding API key."""
+
+    def __init__(self, model: str = RETRIEVAL_RERANK_MODEL):
+        from langchain_community.document_compressors import JinaRerank
+
+        self.client = JinaRerank(jina_api_key=os.getenv("JINA_EMBEDDING_API_KEY"), model=model)
+
+    def __call__(self, query: str, texts: list[str]) -> list[float]:
+        scores = [0.0] * len(texts)
+        for result in self.client.rerank(texts, query, top_n=len(texts)):
+            scores[result["index"]] = result["relevance_score"]
+        return scores
+
+
+def make_reranker(name: str = RETRIEVAL_RERANK):
+    if name == "none":
+        return None
+    if name == "jina":
+        return JinaReranker()
+    raise ValueError(f"Unknown RETRIEVAL_RERANK '{name}'. Use 'none' or 'jina'.")
+
+
+def merge_passages(chunks: list[RetrievedChunk]) -> list[RetrievedChunk]:
+    """
+    Merge chunks of the same document whose character ranges overlap or touch.
+
+    Passages keep the order of their best-ranked chunk; chunks without
+    offsets are kept as they are.
+    """
+    groups: dict[str, list[RetrievedChunk]] = {}
+    order = []
+    for chunk in chunks:
+        key = chunk.metadata.get("doc_id") if "start" in chunk.metadata else chunk.id
+        if key not in groups:
+            groups[key] = []
+            order.append(key)
+        groups[key].append(chunk)
+
+    passages = []
+    for key in order:
+        group = sorted(groups[key], key=lambda c: c.metadata.get("start", 0))
+        merged = [group[0]]
+        for chunk in group[1:]:
+            last = merged[-1]
+            if "start" in chunk.metadata and chunk.metadata["start"] <= last.metadata["end"]:
+                overlap = last.metadata["end"] - chunk.metadata["start"]
+                merged[-1] = RetrievedChunk(
+                    id=last.id,
+                    text=last.text + chunk.text[overlap:],
+                    metadata={**last.metadata, "end": max(last.metadata["end"], chunk.metadata["end"])},
+                    score=max(last.score, chunk.score),
+                )
+            else:
+                merged.append(chunk)
+        passages.extend(merged)
+    return sorted(passages, key=lambda c: -c.score)
+
+
+def pack_context(chunks: list[RetrievedChunk], max_tokens: int = RETRIEVAL_CONTEXT_TOKENS) -> str:
+    """Render ranked chunks as numbered passages until the token budget is used."""
+    parts = []
+    used = 0
+    for passage in merge_passages(chunks):
+        header = f"[{len(parts) + 1}] {passage.metadata.get('source', 'knowledge base')}"
+        text = passage.text
+        cost = approx_tokens(header) + approx_tokens(text)
+        if used + cost > max_tokens:
+            if parts:
+                break
+            # Always return something: trim the best passage to the budget
+            text = text[:max(0, (max_tokens - approx_tokens(header)) * 4)]
+            cost = max_tokens
+        parts.append(f"{header}\n{text}")
+        used += cost
+    return "\n\n".join(parts)
+
+
+class HybridRetriever:
+    """Top-k retrieval fusing vector and BM25 rankings, with optional reranking."""
+
+    def __init__(
+        self,
+        top_k: int = RETRIEVAL_TOP_K,
+        candidates: int = RETRIEVAL_CANDIDATES,
+        rrf_k: int = RETRIEVAL_RRF_K,
+        hybrid: bool = RETRIEVAL_HYBRID,
+        reranker=None,
+        context_tokens: int = RETRIEVAL_CONTEXT_TOKENS,
+        embedder=embeddings,
+        lexical_index_path: str = LEXICAL_INDEX_PATH,
+    ):
+        self.top_k = top_k
+        self.candidates = max(candidates, top_k)
+        self.rrf_k = rrf_k
+        self.hybrid = hybrid
+        self.reranker = reranker
+        self.context_tokens = context_tokens
+        self.embedder = embedder
+        self.lexical_index_path = lexical_index_path
+        self._lexical_indexes: dict[str, LexicalIndex] = {}
+
+    def lexical_index(self, collection_name: str) -> LexicalIndex | None:
+        """The BM25 index of a collection, or None when it was never built."""
+        if not self.hybrid or not os.path.exists(self.lexical_index_path):
+            return None
+        if collection_name not in self._lexical_indexes:
+            self._lexical_indexes[collection_name] = LexicalIndex(collection_name, self.lexical_index_path)
+        return self._lexical_indexes[collection_name]
+
+    def _vector_search(self, collection, vectors: list) -> list[list[RetrievedChunk]]:
+        """Nearest neighbours of every query vector, in one collection.query call."""
+        result = collection.query(query_embeddings=vectors, n_results=self.candidates)
+        if not result or not result["ids"]:
+            return [[] for _ in vectors]
+        hits = []
+        for i, ids in enumerate(result["ids"]):
+            documents = (result.get("documents") or [None] * len(vectors))[i] or [None] * len(ids)
+            metadatas = (result.get("metadatas") or [None] * len(vectors))[i] or [None] * len(ids)
+            hits.append([
+                RetrievedChunk(id=chunk_id, text=document or "", metadata=metadata or {}, vector_rank=rank)
+                for rank, (chunk_id, document, metadata) in enumerate(zip(ids, documents, metadatas), start=1)
+            ])
+        return hits
+
+    def _lexical_search(self, collection_name: str, query: str) -> list[str]:
+        index = self.lexical_index(collection_name)
+        if index is None:
+            return []
+        return [chunk_id for chunk_id, _ in index.search(query, self.candidates)]
+
+    def _fetch(self, collection, ids: list[str]) -> dict[str, RetrievedChunk]:
+        """Load texts of lexical-only hits from the vector store."""
+        if not ids:
+            return {}
+        result = collection.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: RetrievedChunk(id=chunk_id, text=document or "", metadata=metadata or {})
+            for chunk_id, document, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+
+    def _fuse(self, vector_hits: list[RetrievedChunk], lexical_ids: list[str]):
+        """Fuse both rankings; returns the known chunks, fused scores and the id pool to finalize."""
+        chunks = {hit.id: hit for hit in vector_hits}
+        scores = reciprocal_rank_fusion([[hit.id for hit in vector_hits], lexical_ids], self.rrf_k)
+        ranked = sorted(scores, key=lambda chunk_id: -scores[chunk_id])
+        # Rerank a slightly larger pool than we return, so it can promote lower candidates
+        pool = ranked[:self.top_k * 2 if self.reranker else self.top_k]
+        return chunks, scores, pool
+
+    async def _finalize(self, query, chunks, scores, pool, lexical_ids) -> list[RetrievedChunk]:
+        """Score the pool, rerank it if configured and cut it to top-k."""
+        pool = [chunk_id for chunk_id in pool if chunk_id in chunks]
+        for rank, chunk_id in enumerate(lexical_ids, start=1):
+            if chunk_id in chunks:
+                chunks[chunk_id].lexical_rank = rank
+        for chunk_id in pool:
+            chunks[chunk_id].score = scores[chunk_id]
+
+        if self.reranker and len(pool) > 1:
+            try:
+                rerank_scores = await asyncio.to_thread(self.reranker, query, [chunks[i].text for i in pool])
+                for chunk_id, score in zip(pool, rerank_scores):
+                    chunks[chunk_id].score = score
+                pool.sort(key=lambda chunk_id: -chunks[chunk_id].score)
+            except Exception as e:
+                logger.warning(f"Rerank failed, keeping fused order: {e}")
+
+        return [chunks[chunk_id] for chunk_id in pool[:self.top_k]]
+
+    async def aretrieve(self, query: str, collection, collection_name: str, vector=None) -> list[RetrievedChunk]:
+        """
+        Retrieve the top-k chunks for a query.
+
+        Args:
+            query: The user text query
+            collection: Vector-store collection to search
+            collection_name: Name of the collection, selecting its lexical index
+            vector: Precomputed query embedding (embedded here if not provided)
+        """
+        if vector is None:
+            vector = await self.embedder.aembed_query(query)
+        (vector_hits,), lexical_ids = await asyncio.gather(
+            asyncio.to_thread(self._vector_search, collection, [vector]),
+            asyncio.to_thread(self._lexical_search, collection_name, query),
+        )
+
+        chunks, scores, pool = self._fuse(vector_hits, lexical_ids)
+        missing = [chunk_id for chunk_id in pool if chunk_id not in chunks]
+        if missing:
+            chunks.update(await asyncio.to_thread(self._fetch, collection, missing))
+        return await self._finalize(query, chunks, scores, pool, lexical_ids)
+
+    async def aretrieve_many(self, queries: list[str], collection, collection_name: str) -> list[list[RetrievedChunk]]:
+        """
+        Retrieve the top-k chunks for several queries with one round trip per backend.
+
+        All queries are embedded in one embed_documents call and searched with
+        one multi-vector collection.query; lexical-only hits of every query are
+        loaded with one collection.get. Results are in the order of `queries`.
+        """
+        if not queries:
+            return []
+        vectors = await self.embedder.aembed_documents(queries)
+
+        def lexical_search_all():
+            return [self._lexical_search(collection_name, query) for query in queries]
+
+        vector_hits, lexical_ids = await asyncio.gather(
+            asyncio.to_thread(self._vector_search, collection, vectors),
+            asyncio.to_thread(lexical_search_all),
+        )
+
+        fused = [self._fuse(hits, ids) for hits, ids in zip(vector_hits, lexical_ids)]
+        missing = list(dict.fromkeys(
+            chunk_id for chunks, _, pool in fused for chunk_id in pool if chunk_id not in chunks
+        ))
+        fetched = await asyncio.to_thread(self._fetch, collection, missing) if missing else {}
+        for chunks, _, pool in fused:
+            for chunk_id in pool:
+                if chunk_id not in chunks and chunk_id in fetched:
+                    # Each query scores its own copy
+                    chunks[chunk_id] = replace(fetched[chunk_id])
+
+        return await asyncio.gather(*(
+            self._finalize(query, chunks, scores, pool, ids)
+            for query, (chunks, scores, pool), ids in zip(queries, fused, lexical_ids)
+        ))
+
+    async def asearch(self, query: str, collection, collection_name: str, vector=None) -> str:
+        """Retrieve and pack the top-k chunks into a context string for the agent."""
+        chunks = await self.aretrieve(query, collection, collection_name, vector)
+        if not chunks:
+            return NO_RESULTS
+        return pack_context(chunks, self.context_tokens)
+
+    async def asearch_many(self, queries: list[str], collection, collection_name: str) -> str:
+        """Retrieve several queries at once and pack each one's chunks under its own heading."""
+        results = await self.aretrieve_many(queries, collection, collection_name)
+        sections = [
+            f"### Query {i}: {query}\n" + (pack_context(chunks, self.context_tokens) if chunks else NO_RESULTS)
+            for i, (query, chunks) in enumerate(zip(queries, results), start=1)
+        ]
+        return "\n\n".join(sections)
+
+
+retriever = HybridRetriever(reranker=make_reranker())
@@ -0,0 +1,280 @@
+"""
+Fast-path routing in front of the supervisor.
+
+Every request otherwise pays for a supervisor LLM call to pick a worker, and
+another one to relay the worker's answer. This stage classifies the user's
+message locally and, when it is confident, sends it straight to the worker,
+whose answer ends the turn:
+
+- rules: keyword patterns for unambiguous intents (an arithmetic expression,
+  a Jira issue key, an email address with a send verb)
+- centroid: nearest centroid of labeled example embeddings, accepted only
+  above a similarity threshold and with a margin over the runner-up
+
+Anything else, including messages matching several intents or longer than
+ROUTER_MAX_CHARS, goes to the supervisor as before. Side-effecting agents (email, Jira) are only reached
+through rules, never through the centroid guess. A routed turn is announced
+on the graph's custom stream, so a streaming client knows the worker's tokens
+are the answer.
+"""
+
+import os
+import re
+
+import numpy as np
+from langgraph.config import get_stream_writer
+from langgraph.graph import END
+from langgraph.types import Command
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+
+from .semantic_cache import SIDE_EFFECT_AGENTS
+from .util import embeddings, logger
+
+# =========================
+# Configuration
+# =========================
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").lower() == "true"
+ROUTER_THRESHOLD = float(os.getenv("ROUTER_THRESHOLD", "0.80"))
+ROUTER_MARGIN = float(os.getenv("ROUTER_MARGIN", "0.05"))
+# Longer messages skip local classification: the rules backtrack quadratically on long text
+ROUTER_MAX_CHARS = int(os.getenv("ROUTER_MAX_CHARS", "2000"))
+
+ROUTER_NODE = "router"
+SUPERVISOR = "supervisor"
+
+# Supervisor calls skipped by a fast-path turn: the routing call and the relay of the answer
+SUPERVISOR_CALLS_PER_TURN = 2
+
+ROUTE_RULES = {
+    "calculator": [
+        re.compile(r"^\s*(?:what(?:'s| is)|calculate|compute|evaluate|solve)?\s*[-+*/%^().\d\s]*\d\s*[-+*/%^]\s*[-+*/%^().\d\s]*\??\s*$", re.IGNORECASE),
+        re.compile(r"^\s*(?:add|sum|multiply|subtract|divide)\s+[\d.,]+\s+(?:and|by|from|to|with)\s+[\d.,]+\s*\??\s*$", re.IGNORECASE),
+        re.compile(r"^\s*(?:what(?:'s| is)|how much is|calculate|compute)?\s*[\d.,]+\s*(?:%|percent)?\s*(?:times|plus|minus|divided by|multiplied by|of)\s+[\d.,]+\s*\??\s*$", re.IGNORECASE),
+    ],
+    "jira_handler": [
+        re.compile(r"\b(?:list|show|create|open|file|raise|add)\b.*\bjira\b", re.IGNORECASE | re.DOTALL),
+        re.compile(r"\bjira\b.*\b(?:projects?|tickets?|issues?|bugs?|tasks?)\b", re.IGNORECASE | re.DOTALL),
+        re.compile(r"\b(?:projects?|tickets?|issues?)\b.*\bjira\b", re.IGNORECASE | re.DOTALL),
+        # An issue key (e.g. TEST-123) next to a ticket verb; bare keys also look like "COVID-19"
+        re.compile(r"\b(?:comment|ticket|issue)\b.*\b[A-Z][A-Z0-9]+-\d+\b|\b[A-Z][A-Z0-9]+-\d+\b.*\b(?:comment|ticket|issue)\b", re.IGNORECASE | re.DOTALL),
+    ],
+    "email_handler": [
+        re.compile(r"\b(?:send|e-?mail|mail)\b.*\b[\w.+-]+@[\w-]+\.[\w.-]+\b", re.IGNORECASE | re.DOTALL),
+        re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b.*\b(?:send|e-?mail|mail)\b", re.IGNORECASE | re.DOTALL),
+    ],
+}
+
+# Loose mentions of a side-effecting agent's domain; a route elsewhere is not trusted when they appear
+MENTION_PATTERNS = {
+    "jira_handler": re.compile(r"\b(?i:jira)\b|\b[A-Z][A-Z0-9]+-\d+\b"),
+    "email_handler": re.compile(r"\be-?mail\b|\b[\w.+-]+@[\w-]+\.[\w.-]+\b", re.IGNORECASE),
+}
+
+# Several requests in one message need the supervisor to sequence them
+MULTI_INTENT_PATTERN = re.compile(r"\b(?:and then|then|also|after that|afterwards)\b", re.IGNORECASE)
+
+ROUTE_EXAMPLES = {
+    "researcher": [
+        "What is a decorator in Python?",
+        "Explain how our deployment pipeline works",
+        "What does the onboarding document say about laptops?",
+        "Who is responsible for the billing service?",
+        "Summarize the security policy",
+        "How do I configure the VPN?",
+        "What are the office working hours?",
+        "Tell me about the vacation policy",
+        "What is the difference between a list and a tuple?",
+        "Find information about the API rate limits",
+    ],
+    "calculator": [
+        "What is 15% of 240?",
+        "Calculate 4*4",
+        "How much is 1200 divided by 12?",
+        "Compute the square of 17",
+        "What's 3.5 times 8 plus 2?",
+        "Add 45 and 78",
+        "Multiply 12 by 9",
+        "What is 2 to the power of 10?",
+    ],
+    "jira_handler": [
+        "List my Jira projects",
+        "Create a bug ticket for the login page",
+        "Add a comment to the ticket saying it is fixed",
+        "Open a new task in the backend project",
+        "Show me all projects I have access to",
+        "File an issue about the broken export",
+    ],
+    "email_handler": [
+        "Send an email to the team about the release",
+        "Email my manager that I will be late",
+        "Write and send a mail to HR asking for my payslip",
+        "Send a message to the client with the meeting notes",
+        "Mail the report to finance",
+    ],
+}
+
+
+def latest_user_message(messages) -> str | None:
+    """Text of the newest user message, or None when the turn did not start with one."""
+    if messages and isinstance(messages[-1], HumanMessage) and isinstance(messages[-1].content, str):
+        return messages[-1].content
+    return None
+
+
+def emit_stream_event(event: str, **data):
+    """Write an event to the graph's custom stream (stream_mode="custom"); no-op outside a graph run."""
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer({"event": event, **data})
+
+
+def supervisor_acted(messages) -> bool:
+    """Whether the supervisor spoke since the newest user message (i.e. the turn was not fast-routed)."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return False
+        if isinstance(message, AIMessage) and message.name == SUPERVISOR:
+            return True
+    return False
+
+
+class FastRouter:
+    """Local keyword + nearest-centroid classifier choosing a worker, or the supervisor."""
+
+    def __init__(
+        self,
+        examples: dict[str, list[str]] = ROUTE_EXAMPLES,
+        rules: dict[str, list[re.Pattern]] = ROUTE_RULES,
+        threshold: float = ROUTER_THRESHOLD,
+        margin: float = ROUTER_MARGIN,
+        embedder=embeddings,
+        enabled: bool = ROUTER_ENABLED,
+        max_chars: int = ROUTER_MAX_CHARS,
+    ):
+        self.examples = examples
+        self.rules = rules
+        self.threshold = threshold
+        self.margin = margin
+        self.embedder = embedder
+        self.enabled = enabled
+        self.max_chars = max_chars
+        self._labels: list[str] = []
+        self._centroids = None
+        self.stats = {
+            "requests": 0,
+            "rule_routes": 0,
+            "centroid_routes": 0,
+            "fallbacks": 0,
+            "errors": 0,
+            "supervisor_calls_saved": 0,
+            "routes": {},
+        }
+
+    def match_rules(self, text: str) -> set[str]:
+        return {agent for agent, patterns in self.rules.items() if any(p.search(text) for p in patterns)}
+
+    def _build_centroids(self, vectors_by_label: dict[str, list]):
+        labels = sorted(vectors_by_label)
+        centroids = []
+        for label in labels:
+            centroid = np.asarray(vectors_by_label[label], dtype=np.float32).mean(axis=0)
+            centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+        self._labels = labels
+        self._centroids = np.vstack(centroids)
+
+    async def _ensure_centroids(self):
+        if self._centroids is not None:
+            return
+        texts = [(label, text) for label, items in self.examples.items() for text in items]
+        vectors = await self.embedder.aembed_documents([text for _, text in texts])
+        by_label = {}
+        for (label, _), vector in zip(texts, vectors):
+            by_label.setdefault(label, []).append(vector)
+        self._build_centroids(by_label)
+
+    def nearest(self, vector) -> tuple[str, float, float]:
+        """Best label, its cosine similarity and its margin over the runner-up."""
+        vector = np.asarray(vector, dtype=np.float32)
+        vector = vector / (np.linalg.norm(vector) or 1.0)
+        scores = self._centroids @ vector
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        second = float(scores[order[1]]) if len(order) > 1 else -1.0
+        return self._labels[order[0]], best, best - second
+
+    async def classify(self, text: str) -> tuple[str, str]:
+        """
+        Pick a destination for a message.
+
+        Returns:
+            The worker name or SUPERVISOR, and how it was decided
+            ("rule", "centroid", "ambiguous", "multi_intent", "low_confidence", "too_long").
+        """
+        if len(text) > self.max_chars:
+            return SUPERVISOR, "too_long"
+        if MULTI_INTENT_PATTERN.search(text):
+            return SUPERVISOR, "multi_intent"
+
+        mentioned = {agent for agent, pattern in MENTION_PATTERNS.items() if pattern.search(text)}
+        matched = self.match_rules(text)
+        if len(matched) == 1:
+            agent = matched.pop()
+            if mentioned - {agent}:
+                return SUPERVISOR, "ambiguous"
+            return agent, "rule"
+        if len(matched) > 1:
+            return SUPERVISOR, "ambiguous"
+
+        await self._ensure_centroids()
+        label, score, margin = self.nearest(await self.embedder.aembed_query(text))
+        if score < self.threshold or margin < self.margin or label in SIDE_EFFECT_AGENTS:
+            return SUPERVISOR, "low_confidence"
+        if mentioned:
+            return SUPERVISOR, "ambiguous"
+        return label, "centroid"
+
+    async def aroute(self, state: dict) -> Command:
+        """Graph node: jump to a worker for confident intents, otherwise to the supervisor."""
+        text = latest_user_message(state["messages"])
+        if not self.enabled or text is None:
+            return Command(goto=SUPERVISOR)
+
+        self.stats["requests"] += 1
+        try:
+            destination, reason = await self.classify(text)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Router failed, falling back to the supervisor: {e}")
+            destination, reason = SUPERVISOR, "error"
+
+        if destination == SUPERVISOR:
+            self.stats["fallbacks"] += 1
+        else:
+            self.stats[f"{reason}_routes"] += 1
+            self.stats["supervisor_calls_saved"] += SUPERVISOR_CALLS_PER_TURN
+            self.stats["routes"][destination] = self.stats["routes"].get(destination, 0) + 1
+            # The worker's answer ends the turn, so its tokens are the answer
+            emit_stream_event("route", to=destination, reason=reason)
+        logger.info(f"🧭 Router: {destination} ({reason})")
+        return Command(goto=destination)
+
+    def route(self, state: dict) -> Command:
+        # The graph runs on the async path; the sync path keeps the supervisor in charge
+        return Command(goto=SUPERVISOR)
+
+    def as_node(self) -> RunnableLambda:
+        return RunnableLambda(self.route, afunc=self.aroute, name=ROUTER_NODE)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "routes": dict(self.stats["routes"]), "enabled": self.enabled}
+
+
+def after_worker(state: dict) -> str:
+    """Edge after a worker: a fast-routed turn ends with the worker's answer, others return to the supervisor."""
+    return SUPERVISOR if supervisor_acted(state["messages"]) else END
+
+
+router = FastRouter()
@@ -0,0 +1,189 @@
+"""
+Semantic response cache in front of the supervisor graph.
+
+Near-duplicate questions ("what is a def in python", "what's def in Python?")
+otherwise run the full supervisor -> researcher -> search -> LLM chain. The
+cache embeds each query with the shared `embeddings`, and when a previous
+query is similar enough it returns the stored answer. Entries expire after a
+TTL and the least recently used entry is evicted when the cache is full.
+
+Entries are scoped to the conversation they answered: each one records a hash
+of the thread's earlier messages, and only matches a query asked after the
+same history. Fresh threads share one scope, so a repeated opening question is
+served across threads, while a follow-up ("what about the second one?") is
+never answered from another conversation.
+
+Side-effecting flows (email, Jira) are never cached: such queries skip the
+lookup, and answers from runs that reached a side-effecting agent are not stored.
+"""
+
+import os
+import re
+import time
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from .util import embeddings, logger
+
+# =========================
+# Configuration
+# =========================
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+
+# Agents whose runs change the outside world and must never be replayed
+SIDE_EFFECT_AGENTS = frozenset({"email_handler", "jira_handler"})
+SIDE_EFFECT_PATTERN = re.compile(
+    r"\b(e-?mails?|mail|send|sent|jira|tickets?|issues?|comments?|projects?)\b",
+    re.IGNORECASE,
+)
+
+
+def context_key(messages) -> str:
+    """Hash of a thread's earlier messages; the empty history has its own key."""
+    digest = hashlib.sha256()
+    for message in messages:
+        digest.update(f"{message.type}\x1f{message.content}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+EMPTY_CONTEXT = context_key(())
+
+
+@dataclass
+class CacheEntry:
+    context: str
+    query: str
+    response: str
+    vector: np.ndarray
+    created_at: float
+    latency: float
+
+
+class SemanticCache:
+    """LRU cache of agent responses keyed on normalized query embeddings."""
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        embedder=embeddings,
+        enabled: bool = SEMANTIC_CACHE_ENABLED,
+    ):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.enabled = enabled
+        self._entries: OrderedDict[int, CacheEntry] = OrderedDict()
+        self._next_id = 0
+        self._matrix = None
+        self._matrix_ids = []
+        self._matrix_contexts = None
+        self.stats = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "latency_saved_seconds": 0.0,
+        }
+
+    def is_cacheable_query(self, query: str) -> bool:
+        """Queries that look like email or Jira requests always run the graph."""
+        return self.enabled and not SIDE_EFFECT_PATTERN.search(query)
+
+    async def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(await self.embedder.aembed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now: float):
+        expired = [key for key, entry in self._entries.items() if now - entry.created_at > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self.stats["expirations"] += len(expired)
+            self._matrix = None
+
+    def _similarities(self, vector: np.ndarray, context: str):
+        if self._matrix is None:
+            self._matrix_ids = list(self._entries.keys())
+            self._matrix = np.stack([self._entries[key].vector for key in self._matrix_ids])
+            self._matrix_contexts = np.array([self._entries[key].context for key in self._matrix_ids], dtype=object)
+        # Entries from another conversation never match
+        return np.where(self._matrix_contexts == context, self._matrix @ vector, -np.inf)
+
+    async def lookup(self, query: str, context: str = EMPTY_CONTEXT):
+        """
+        Find a cached answer for a semantically equivalent query asked after the same history.
+
+        Args:
+            query: The user's message
+            context: `context_key` of the thread's earlier messages
+
+        Returns:
+            A tuple of (entry or None, query vector or None). The vector is reused by `store`.
+        """
+        if not self.is_cacheable_query(query):
+            self.stats["bypassed"] += 1
+            return None, None
+
+        self.stats["lookups"] += 1
+        try:
+            vector = await self.embed(query)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed, bypassing cache: {e}")
+            self.stats["bypassed"] += 1
+            return None, None
+
+        self._expire(time.time())
+        if self._entries:
+            scores = self._similarities(vector, context)
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                key = self._matrix_ids[best]
+                entry = self._entries[key]
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                self.stats["latency_saved_seconds"] += entry.latency
+                logger.info(f"⚡ Semantic cache hit ({scores[best]:.3f}): '{entry.query[:80]}'")
+                return entry, vector
+
+        self.stats["misses"] += 1
+        return None, vector
+
+    def store(self, query: str, vector, response: str | None, agents: set, latency: float, context: str = EMPTY_CONTEXT):
+        """Cache a response for `context` unless the run gave no answer (None) or touched a side-effecting agent."""
+        if vector is None or not response or agents & SIDE_EFFECT_AGENTS:
+            return
+        self._entries[self._next_id] = CacheEntry(context, query, response, vector, time.time(), latency)
+        self._next_id += 1
+        self._matrix = None
+        self.stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+
+    def snapshot(self) -> dict:
+        lookups = self.stats["lookups"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+        }
+
+
+response_cache = SemanticCache()
@@ -2,18 +2,34 @@
 
 import os
 import json
-from .util import logger, send_email_smtp, embeddings, get_jira_client, get_chroma_client, DEFAULT_COLLECTION
+import math
+import asyncio
+import numpy as np
+from .util import logger, chroma_collections, DEFAULT_COLLECTION
+from .jira_client import (
+    JIRA_BULK_MAX_ITEMS, add_comments_bulk, create_issues_bulk, get_jira_client, jira_metadata,
+)
+from .mail_queue import mail_sender
+from .retrieval import retriever, RETRIEVAL_MAX_BATCH_QUERIES
+from .calculator import CalculatorError, evaluate, evaluate_batch, format_number
 from langchain_core.tools import tool
 
 # =========================
 # Calculator
 # =========================
 
+# Batch results listed in full; longer batches are summarized
+CALCULATOR_BATCH_PREVIEW = 100
+
 @tool
 def calculator_tool(expression: str) -> str:
     """
     Evaluate a mathematical expression.
     
+    Supports + - * / // % ** (or ^), parentheses, pi, e, tau and the functions
+    sqrt, exp, log, log10, log2, sin, cos, tan, asin, acos, atan, atan2, sinh,
+    cosh, tanh, hypot, degrees, radians, abs, round, floor, ceil, min, max, factorial.
+
     Args:
         expression: The mathematical expression to evaluate (e.g., "4*4", "10+5")
         
@@ -23,37 +39,74 @@ def calculator_tool(expression: str) -> str:
     logger.info(f"🧮 TOOL CALL: calculator_tool")
     logger.info(f"   Expression: {expression}")
     try:
-        result = eval(expression)
+        result = format_number(evaluate(expression))
         logger.info(f"   ✅ Result: {result}")
-        return str(result)
-    except Exception as e:
+        return result
+    except CalculatorError as e:
         logger.error(f"   ❌ Error: {e}")
-        return "Invalid mathematical expression"
+        return f"Invalid mathematical expression: {e}"
+
+
+@tool
+def calculator_batch_tool(expression: str, variables: dict[str, list[float]]) -> str:
+    """
+    Evaluate one expression for many inputs at once.
+
+    Use this instead of calling calculator_tool repeatedly with different numbers.
+
+    Args:
+        expression: Expression over variable names, e.g. "price * qty * (1 + tax)"
+        variables: Values per variable, all lists of the same length,
+                   e.g. {"price": [10, 20], "qty": [3, 1], "tax": [0.14, 0.14]}
+
+    Returns:
+        A JSON list with one result per input row (null where a row is invalid)
+    """
+    logger.info(f"🧮 TOOL CALL: calculator_batch_tool")
+    logger.info(f"   Expression: {expression} | Variables: {list(variables)}")
+    try:
+        results = evaluate_batch(expression, variables)
+        values = [None if math.isnan(v) else float(f"{v:.15g}") for v in results[:CALCULATOR_BATCH_PREVIEW].tolist()]
+        output = json.dumps(values)
+        if len(results) > CALCULATOR_BATCH_PREVIEW:
+            valid = results[~np.isnan(results)]
+            output += (
+                f"\n... {len(results)} results in total (first {CALCULATOR_BATCH_PREVIEW} shown); "
+                f"sum={format_number(float(valid.sum()))}, min={format_number(float(valid.min(initial=np.inf)))}, "
+                f"max={format_number(float(valid.max(initial=-np.inf)))}"
+            )
+        logger.info(f"   ✅ Result: {len(results)} value(s)")
+        return output
+    except CalculatorError as e:
+        logger.error(f"   ❌ Error: {e}")
+        return f"Invalid mathematical expression: {e}"
     
 # =========================
 # Send Mail to Someone
 # =========================
 
 @tool
-def gmail_send_tool(to: str, subject: str, body: str) -> str:
+async def gmail_send_tool(to: str, subject: str, body: str) -> str:
     """
     Send an email using Gmail SMTP.
+
+    The email is queued and delivered in the background, with retries.
     """
     logger.info(f"📧 TOOL CALL: gmail_send_tool")
     logger.info(f"   To: {to}")
     logger.info(f"   Subject: {subject}")
 
     try:
-        result = send_email_smtp(to=to, subject=subject, body=body)
-        logger.info(f"   ✅ Email sent successfully")
-        return f"✅ {result}"
+        mail_id = await mail_sender.enqueue(to=to, subject=subject, body=body)
+        logger.info(f"   ✅ Email queued (id {mail_id})")
+        return f"✅ Email to {to} queued for delivery (id {mail_id})"
 
     except ValueError as e:
         logger.error(f"   ❌ Configuration error: {e}")
         return f"❌ Configuration error: {e}"
 
     except Exception as e:
-        logger.exception("   ❌ Email send failed")
+        logger.exception("   ❌ Email enqueue failed")
         return f"❌ Failed to send email: {e}"
 
 # =========================
@@ -62,9 +115,12 @@ def gmail_send_tool(to: str, subject: str, body: str) -> str:
 
 # Tool to search in ChromaDB collection
 @tool
-def search_in_knowledge(query: str, collection_name: str = None) -> str:
+async def search_in_knowledge(query: str, collection_name: str = None) -> str:
     """
-    Search for the top similar vector in a ChromaDB collection using a text query.
+    Search the knowledge base and return the most relevant passages.
+
+    Combines vector similarity with keyword (BM25) matching and returns the
+    top passages, merged where they overlap, as numbered context.
 
     Args:
         query: The user text query.
@@ -72,7 +128,7 @@ def search_in_knowledge(query: str, collection_name: str = None) -> str:
                         If not provided, uses CHROMA_COLLECTION_NAME env var (default: "my_collection").
 
     Returns:
-        A string representation of the top search result.
+        The top matching passages as numbered context.
     """
     if collection_name is None:
         collection_name = DEFAULT_COLLECTION
@@ -82,39 +138,70 @@ def search_in_knowledge(query: str, collection_name: str = None) -> str:
     logger.info(f"   Query: '{query}'")
 
     try:
-        chroma_client = get_chroma_client()
-        # Get or create collection
-        collection = chroma_client.get_or_create_collection(
-            name=collection_name,
-            metadata={"hnsw:space": "cosine"}
-        )
-        
-        # Generate embedding for the query
-        query_vector = embeddings.embed_query(query)
-        
-        # Query ChromaDB
-        search_result = collection.query(
-            query_embeddings=[query_vector],
-            n_results=1,
-        )
-
-        if search_result and search_result['documents'] and search_result['documents'][0]:
-            top_result = search_result['documents'][0][0]
-            logger.info(f"   ✅ Result: {str(top_result)[:100]}...")
-            return str(top_result)
-        else:
-            logger.info("   ℹ️ No results found")
-            return "No results in my mind about it."
+        # Cached collection handle (resolved once per collection)
+        collection = await chroma_collections.aget(collection_name)
+
+        # Hybrid top-k retrieval packed under the context token budget
+        context = await retriever.asearch(query, collection, collection_name)
+        logger.info(f"   ✅ Result: {context[:100]}...")
+        return context
 
     except Exception as e:
+        # The handle may be stale (server restart, deleted collection): re-resolve next time
+        chroma_collections.invalidate(collection_name)
         logger.exception("   ❌ ChromaDB search failed")
         return f"❌ ChromaDB search failed: {e}"
     
+# Tool to search several queries in one round trip
+@tool
+async def search_in_knowledge_batch(queries: list[str], collection_name: str = None) -> str:
+    """
+    Search the knowledge base for several queries at once.
+
+    Use this instead of calling search_in_knowledge repeatedly when a question
+    needs several independent facts: all queries are embedded and searched
+    together, and the passages are returned grouped per query.
+
+    Args:
+        queries: The text queries, one per fact to look up.
+        collection_name: The name of the ChromaDB collection to search.
+                        If not provided, uses CHROMA_COLLECTION_NAME env var (default: "my_collection").
+
+    Returns:
+        The top matching passages for every query, under one heading per query.
+    """
+    if collection_name is None:
+        collection_name = DEFAULT_COLLECTION
+
+    # Drop blanks and repeats, keeping the order the agent asked in
+    queries = list(dict.fromkeys(q.strip() for q in queries if q and q.strip()))
+    logger.info(f"🔍 TOOL CALL: search_in_knowledge_batch")
+    logger.info(f"   Collection: {collection_name}")
+    logger.info(f"   Queries: {queries}")
+
+    if not queries:
+        return "❌ No queries given."
+    dropped = queries[RETRIEVAL_MAX_BATCH_QUERIES:]
+    queries = queries[:RETRIEVAL_MAX_BATCH_QUERIES]
+
+    try:
+        collection = await chroma_collections.aget(collection_name)
+        context = await retriever.asearch_many(queries, collection, collection_name)
+        if dropped:
+            context += f"\n\nNot searched (limit is {RETRIEVAL_MAX_BATCH_QUERIES} queries per call): {dropped}"
+        logger.info(f"   ✅ Result: {len(queries)} queries, {context[:100]}...")
+        return context
+
+    except Exception as e:
+        chroma_collections.invalidate(collection_name)
+        logger.exception("   ❌ ChromaDB batch search failed")
+        return f"❌ ChromaDB search failed: {e}"
+
 # =========================
 # Jira Tools - List all Projects
 # =========================
 @tool
-def jira_get_projects() -> str:
+async def jira_get_projects() -> str:
     """
     Fetch all Jira projects the user has access to.
     
@@ -124,8 +211,8 @@ def jira_get_projects() -> str:
     logger.info(f"🎫 TOOL CALL: jira_get_projects")
     
     try:
-        jira = get_jira_client()
-        projects = jira.projects()
+        # Served from the metadata cache; refreshed after JIRA_METADATA_TTL_SECONDS
+        projects = await jira_metadata.aprojects()
         
         if not projects:
             logger.info("   ℹ️ No projects found")
@@ -152,8 +239,76 @@ def jira_get_projects() -> str:
 # Jira Tools - Create Issue
 # =========================
 
+# Field ids that never need resolving against the field metadata
+SYSTEM_FIELDS = frozenset({
+    "project", "summary", "description", "issuetype", "priority", "labels", "assignee", "reporter",
+    "components", "fixVersions", "versions", "duedate", "parent", "environment",
+})
+
+
+def _field_value(fields: dict, field: str, attribute: str):
+    value = fields.get(field)
+    return value.get(attribute) if isinstance(value, dict) else None
+
+
+async def resolve_field_names(fields: dict) -> dict:
+    """Map custom field names (e.g. "Story Points") to their ids using the cached field metadata."""
+    unknown = [key for key in fields if key not in SYSTEM_FIELDS and not key.startswith("customfield_")]
+    if not unknown:
+        return fields
+    by_name = {field.get("name", "").lower(): field["id"] for field in await jira_metadata.afields() if "id" in field}
+    return {by_name.get(key.lower(), key) if key in unknown else key: value for key, value in fields.items()}
+
+
+async def check_issue_type(fields: dict) -> str | None:
+    """
+    Validate the issue type against the project's cached issue types.
+
+    Returns an error message, or None when the type exists (its name is
+    normalized in place). A miss is re-checked against fresh metadata before
+    it is reported.
+    """
+    project_key = _field_value(fields, "project", "key")
+    issue_type = _field_value(fields, "issuetype", "name")
+    if not project_key or not issue_type:
+        return None
+    for attempt in range(2):
+        if attempt:
+            jira_metadata.invalidate("issue_types", project_key)
+        names = [item.get("name", "") for item in await jira_metadata.aissue_types(project_key)]
+        match = next((name for name in names if name.lower() == issue_type.lower()), None)
+        if match:
+            fields["issuetype"]["name"] = match
+            return None
+    return f"❌ Issue type '{issue_type}' does not exist in project {project_key}. Available: {', '.join(names)}"
+
+
+async def prepare_issue(fields: dict) -> tuple[dict, str | None]:
+    """
+    Check an issue against cached metadata before sending it.
+
+    Returns the fields (custom field names resolved) and an error message,
+    or None. Jira itself reports anything the checks cannot.
+    """
+    try:
+        problem = await check_issue_type(fields)
+        if problem:
+            return fields, problem
+        return await resolve_field_names(fields), None
+    except Exception as e:
+        logger.warning(f"   ⚠️ Jira metadata unavailable, creating without checks: {e}")
+        return fields, None
+
+
+def invalidate_issue_metadata(rejected: list[dict]):
+    """A rejection may come from stale metadata: refetch it next time."""
+    for project_key in {_field_value(fields, "project", "key") for fields in rejected} - {None}:
+        jira_metadata.invalidate("issue_types", project_key)
+    jira_metadata.invalidate("fields")
+
+
 @tool
-def jira_create_issue(issue_dict: str) -> str:
+async def jira_create_issue(issue_dict: str) -> str:
     """
     Create a new Jira issue.
     
@@ -177,9 +332,20 @@ def jira_create_issue(issue_dict: str) -> str:
             fields = json.loads(issue_dict)
         except json.JSONDecodeError:
             return "❌ Invalid JSON format. Please provide a valid JSON string."
+        if not isinstance(fields, dict):
+            return "❌ Invalid issue data. Please provide a JSON object of issue fields."
+
+        fields, problem = await prepare_issue(fields)
+        if problem:
+            logger.info(f"   ⚠️ {problem}")
+            return problem
         
         # Create the issue
-        new_issue = jira.create_issue(fields=fields)
+        try:
+            new_issue = await asyncio.to_thread(jira.create_issue, fields=fields)
+        except Exception:
+            invalidate_issue_metadata([fields])
+            raise
         issue_key = new_issue.get('key', 'N/A')
         issue_url = f"{os.getenv('JIRA_INSTANCE_URL')}/browse/{issue_key}"
         
@@ -194,7 +360,7 @@ def jira_create_issue(issue_dict: str) -> str:
 # Jira Tools - Add Comment
 # ========================= 
 @tool
-def jira_add_comment(issue_key: str, comment: str) -> str:
+async def jira_add_comment(issue_key: str, comment: str) -> str:
     """
     Add a comment to a Jira issue.
     
@@ -211,7 +377,7 @@ def jira_add_comment(issue_key: str, comment: str) -> str:
     
     try:
         jira = get_jira_client()
-        jira.issue_add_comment(issue_key, comment)
+        await asyncio.to_thread(jira.issue_add_comment, issue_key, comment)
         
         logger.info(f"   ✅ Added comment to: {issue_key}")
         return f"✅ Successfully added comment to issue [{issue_key}]"
@@ -219,3 +385,123 @@ def jira_add_comment(issue_key: str, comment: str) -> str:
     except Exception as e:
         logger.exception("   ❌ Jira add comment failed")
         return f"❌ Failed to add comment: {str(e)}"
+
+# =========================
+# Jira Tools - Bulk Operations
+# =========================
+@tool
+async def jira_create_issues_bulk(issues: str) -> str:
+    """
+    Create many Jira issues in one call.
+    
+    Args:
+        issues: A JSON array of issue objects, each in the jira_create_issue format.
+               Example: '[{"project": {"key": "TEST"}, "summary": "Bug in login", "issuetype": {"name": "Bug"}},
+                          {"project": {"key": "TEST"}, "summary": "Slow search", "issuetype": {"name": "Bug"}}]'
+    
+    Returns:
+        One line per issue, in order: its key and URL, or why it was not created.
+    """
+    logger.info(f"🎫 TOOL CALL: jira_create_issues_bulk")
+    
+    try:
+        try:
+            items = json.loads(issues)
+        except json.JSONDecodeError:
+            return "❌ Invalid JSON format. Please provide a JSON array of issue objects."
+        if not isinstance(items, list) or not items:
+            return "❌ Invalid issue data. Please provide a non-empty JSON array of issue objects."
+        if len(items) > JIRA_BULK_MAX_ITEMS:
+            return f"❌ Too many issues ({len(items)}). Create at most {JIRA_BULK_MAX_ITEMS} per call."
+        logger.info(f"   Issues: {len(items)}")
+
+        # Checks against cached metadata first: rejected items are never sent
+        errors, to_send = {}, []
+        for index, fields in enumerate(items):
+            if not isinstance(fields, dict):
+                errors[index] = "not a JSON object of issue fields"
+                continue
+            fields, problem = await prepare_issue(fields)
+            if problem:
+                errors[index] = problem.removeprefix("❌ ")
+            else:
+                to_send.append((index, fields))
+
+        keys = {}
+        if to_send:
+            jira = get_jira_client()
+            results = await asyncio.to_thread(create_issues_bulk, jira, [fields for _, fields in to_send])
+            for result in results:
+                index = to_send[result.index][0]
+                if result.ok:
+                    keys[index] = result.key
+                else:
+                    errors[index] = result.error
+            if any(not result.ok for result in results):
+                invalidate_issue_metadata([to_send[result.index][1] for result in results if not result.ok])
+
+        base_url = os.getenv('JIRA_INSTANCE_URL')
+        lines = []
+        for index, fields in enumerate(items):
+            summary = fields.get("summary", "") if isinstance(fields, dict) else ""
+            if index in keys:
+                lines.append(f"{index + 1}. ✅ [{keys[index]}] {summary}\n   URL: {base_url}/browse/{keys[index]}")
+            else:
+                lines.append(f"{index + 1}. ❌ {summary or 'Not created'}: {errors[index]}")
+
+        icon = "✅" if not errors else ("⚠️" if keys else "❌")
+        logger.info(f"   {icon} Created {len(keys)}/{len(items)} issue(s)")
+        header = f"{icon} Created {len(keys)} of {len(items)} issue(s)"
+        if errors:
+            header += f"; {len(errors)} failed"
+        return header + ":\n\n" + "\n".join(lines)
+        
+    except Exception as e:
+        logger.exception("   ❌ Jira bulk create failed")
+        return f"❌ Failed to create issues: {str(e)}"
+
+
+@tool
+async def jira_add_comments_bulk(comments: list[dict[str, str]]) -> str:
+    """
+    Add comments to many Jira issues in one call.
+    
+    Args:
+        comments: A list of {"issue_key": ..., "comment": ...} objects.
+                 Example: [{"issue_key": "TEST-1", "comment": "Fixed in 2.3"},
+                           {"issue_key": "TEST-2", "comment": "Fixed in 2.3"}]
+    
+    Returns:
+        One line per comment, in order: whether it was added.
+    """
+    logger.info(f"🎫 TOOL CALL: jira_add_comments_bulk")
+    
+    try:
+        if not comments:
+            return "❌ No comments given. Provide a list of {\"issue_key\", \"comment\"} objects."
+        if len(comments) > JIRA_BULK_MAX_ITEMS:
+            return f"❌ Too many comments ({len(comments)}). Add at most {JIRA_BULK_MAX_ITEMS} per call."
+        for position, item in enumerate(comments, 1):
+            if not item.get("issue_key") or not item.get("comment"):
+                return f"❌ Comment {position} needs both 'issue_key' and 'comment'."
+        logger.info(f"   Comments: {len(comments)}")
+
+        jira = get_jira_client()
+        results = await add_comments_bulk(jira, [(item["issue_key"], item["comment"]) for item in comments])
+
+        lines = [
+            f"{result.index + 1}. ✅ [{result.key}] comment added" if result.ok
+            else f"{result.index + 1}. ❌ [{result.key}] {result.error}"
+            for result in results
+        ]
+        added = sum(result.ok for result in results)
+        icon = "✅" if added == len(results) else ("⚠️" if added else "❌")
+        logger.info(f"   {icon} Added {added}/{len(results)} comment(s)")
+        header = f"{icon} Added {added} of {len(results)} comment(s)"
+        if added < len(results):
+            header += f"; {len(results) - added} failed"
+        return header + ":\n\n" + "\n".join(lines)
+        
+    except Exception as e:
+        logger.exception("   ❌ Jira bulk comment failed")
+        return f"❌ Failed to add comments: {str(e)}"
@@ -0,0 +1,427 @@
+"""
+Per-request latency tracing with OpenTelemetry.
+
+Every API request is one trace. Its spans cover:
+
+- graph nodes: history, planner, router, supervisor, each worker agent and
+  the agents' own model/tools steps
+- LLM calls: model, token usage, completion cache hits
+- tools: every tool call, including the handoffs between agents
+- backends: Jina embeddings, ChromaDB, Jira and SMTP calls
+
+Graph, LLM and tool spans come from a LangChain callback handler passed with
+the graph config; backend spans come from `traced_client` proxies and
+`span()` blocks, and nest under the tool or node that made the call.
+
+Finished spans are exported with TRACING_EXPORTER:
+- none: only kept in memory, for /debug/trace/{thread_id}
+- otlp: OTLP/gRPC to OTEL_EXPORTER_OTLP_ENDPOINT (default localhost:4317)
+- file: one JSON span per line in TRACING_FILE_PATH
+- console: printed to stdout
+
+The last traces of recent threads are kept in memory either way, bounded by
+TRACING_RECENT_TRACES.
+"""
+
+import os
+import inspect
+import threading
+import functools
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.runnables.config import var_child_runnable_config
+from langgraph.errors import GraphBubbleUp
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import Status, StatusCode
+
+from .completion_cache import calling_agent
+
+# =========================
+# Configuration
+# =========================
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+# none | otlp | file | console
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "none").lower()
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "multi-agent-assistant")
+TRACING_RECENT_TRACES = int(os.getenv("TRACING_RECENT_TRACES", "500"))
+TRACING_TRACES_PER_THREAD = int(os.getenv("TRACING_TRACES_PER_THREAD", "10"))
+TRACING_MAX_SPANS_PER_TRACE = int(os.getenv("TRACING_MAX_SPANS_PER_TRACE", "2000"))
+
+# Attribute naming the conversation a request trace belongs to
+THREAD_ID_ATTRIBUTE = "thread_id"
+
+
+class FileSpanExporter(SpanExporter):
+    """Appends each finished span as one JSON line."""
+
+    def __init__(self, path: str = TRACING_FILE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+
+class RecentTraces(SpanProcessor):
+    """Keeps the finished spans of the most recent traces, indexed by thread id."""
+
+    def __init__(
+        self,
+        max_traces: int = TRACING_RECENT_TRACES,
+        per_thread: int = TRACING_TRACES_PER_THREAD,
+        max_spans: int = TRACING_MAX_SPANS_PER_TRACE,
+    ):
+        self.max_traces = max_traces
+        self.per_thread = per_thread
+        self.max_spans = max_spans
+        self._lock = threading.Lock()
+        self._spans: OrderedDict[int, list] = OrderedDict()
+        self._threads: OrderedDict[str, deque] = OrderedDict()
+
+    def on_end(self, span):
+        trace_id = span.context.trace_id
+        with self._lock:
+            spans = self._spans.get(trace_id)
+            if spans is None:
+                spans = self._spans[trace_id] = []
+                while len(self._spans) > self.max_traces:
+                    self._spans.popitem(last=False)
+            if len(spans) < self.max_spans:
+                spans.append(span)
+
+            thread_id = span.attributes.get(THREAD_ID_ATTRIBUTE) if span.parent is None else None
+            if thread_id is not None:
+                traces = self._threads.pop(thread_id, None) or deque(maxlen=self.per_thread)
+                traces.append(trace_id)
+                self._threads[thread_id] = traces
+                while len(self._threads) > self.max_traces:
+                    self._threads.popitem(last=False)
+
+    def traces(self, thread_id: str, limit: int = 1) -> list[list]:
+        """Spans of the thread's last `limit` traces, newest first."""
+        with self._lock:
+            trace_ids = list(self._threads.get(thread_id, ()))[::-1][:limit]
+            return [list(self._spans[t]) for t in trace_ids if t in self._spans]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"traces": len(self._spans), "threads": len(self._threads)}
+
+
+def _exporter(kind: str) -> SpanExporter | None:
+    if kind == "otlp":
+        # Reads OTEL_EXPORTER_OTLP_ENDPOINT / OTEL_EXPORTER_OTLP_HEADERS
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+        return OTLPSpanExporter()
+    if kind == "file":
+        return FileSpanExporter(TRACING_FILE_PATH)
+    if kind == "console":
+        return ConsoleSpanExporter()
+    if kind != "none":
+        raise ValueError(f"Unknown TRACING_EXPORTER '{kind}' (expected none, otlp, file or console)")
+    return None
+
+
+def create_tracer_provider(exporter: str = TRACING_EXPORTER) -> tuple[TracerProvider, RecentTraces]:
+    """Provider exporting through `exporter` and recording recent traces in memory."""
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    recent = RecentTraces()
+    provider.add_span_processor(recent)
+    span_exporter = _exporter(exporter)
+    if span_exporter is not None:
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+    return provider, recent
+
+
+# The service's own provider; not installed globally, so libraries' telemetry stays separate
+provider, recent_traces = create_tracer_provider() if TRACING_ENABLED else (None, None)
+tracer = provider.get_tracer("assistant") if TRACING_ENABLED else trace.NoOpTracer()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Turns LangChain run events into spans under a request's root span.
+
+    Only graph node runs, LLM calls and tool calls become spans; other
+    runnables (prompts, sequences) are skipped and their children attach to
+    the nearest traced ancestor.
+    """
+
+    # Inline, so start and end events are handled in order on the event loop
+    run_inline = True
+
+    def __init__(self, root, tracer=tracer):
+        self.root = root
+        self.tracer = tracer
+        self._spans = {}
+        self._parents = {}
+        self._names = {}
+
+    def _traced_ancestor(self, run_id):
+        while run_id is not None and run_id not in self._spans:
+            run_id = self._parents.get(run_id)
+        return run_id
+
+    def span_for(self, run_id):
+        """Span of a run, or of its nearest traced ancestor."""
+        return self._spans.get(self._traced_ancestor(run_id))
+
+    def _start(self, name, run_id, parent_run_id, attributes):
+        parent = self.span_for(parent_run_id) or self.root
+        span = self.tracer.start_span(
+            name, context=trace.set_span_in_context(parent), attributes={k: v for k, v in attributes.items() if v is not None}
+        )
+        self._spans[run_id] = span
+        return span
+
+    def _end(self, run_id, error: BaseException = None, **attributes):
+        self._parents.pop(run_id, None)
+        self._names.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        for key, value in attributes.items():
+            if value is not None:
+                span.set_attribute(key, value)
+        # Handoffs and interrupts propagate as exceptions but are not failures
+        if error is not None and not isinstance(error, GraphBubbleUp):
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, str(error)[:200]))
+        span.end()
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        metadata = metadata or {}
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        node = metadata.get("langgraph_node")
+        if parent_run_id is not None and name not in (node, metadata.get("agent")):
+            return
+        # A node wrapping a compiled subgraph of the same name is one step, not two
+        if parent_run_id is not None and self._names.get(self._traced_ancestor(parent_run_id)) == name:
+            return
+        self._names[run_id] = name
+        self._start(
+            f"graph {name}" if parent_run_id is None else f"node {name}",
+            run_id,
+            parent_run_id,
+            {"langgraph.node": node or name, "langgraph.step": metadata.get("langgraph_step"),
+             "agent": calling_agent(metadata)},
+        )
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        metadata = metadata or {}
+        model = (
+            metadata.get("ls_model_name")
+            or (kwargs.get("invocation_params") or {}).get("model")
+            or ((serialized or {}).get("id") or ["llm"])[-1]
+        )
+        self._start(
+            f"chat {model}",
+            run_id,
+            parent_run_id,
+            {"gen_ai.system": metadata.get("ls_provider"), "gen_ai.request.model": model,
+             "gen_ai.request.messages": len(messages[0]) if messages else 0, "agent": calling_agent(metadata)},
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        message = getattr(response.generations[0][0], "message", None) if response.generations and response.generations[0] else None
+        usage = getattr(message, "usage_metadata", None) or {}
+        metadata = getattr(message, "response_metadata", None) or {}
+        self._end(
+            run_id,
+            **{"gen_ai.usage.input_tokens": usage.get("input_tokens"),
+               "gen_ai.usage.output_tokens": usage.get("output_tokens"),
+               "gen_ai.response.model": metadata.get("model_name"),
+               "llm.completion_cache": metadata.get("completion_cache")},
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._parents[run_id] = parent_run_id
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        self._start(
+            f"tool {name}", run_id, parent_run_id, {"tool.name": name, "agent": calling_agent(metadata or {})}
+        )
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+
+def _parent_context():
+    """
+    Context for a backend span: the innermost of the current OpenTelemetry
+    span and the span of the LangChain run (tool, node) making the call.
+    """
+    current = trace.get_current_span()
+    config = var_child_runnable_config.get()
+    manager = config.get("callbacks") if config else None
+    if isinstance(manager, BaseCallbackManager):
+        for handler in manager.handlers:
+            if isinstance(handler, TracingCallbackHandler):
+                run_span = handler.span_for(manager.parent_run_id)
+                if run_span is not None and (
+                    not current.is_recording() or run_span.start_time > current.start_time
+                ):
+                    return trace.set_span_in_context(run_span)
+    return None
+
+
+def span(name: str, **attributes):
+    """Context manager timing one backend call as a span."""
+    if not TRACING_ENABLED:
+        return nullcontext()
+    return tracer.start_as_current_span(name, context=_parent_context(), attributes=attributes)
+
+
+def annotate(**attributes):
+    """Set attributes on the current span (no-op outside one)."""
+    current = trace.get_current_span()
+    for key, value in attributes.items():
+        if value is not None:
+            current.set_attribute(key, value)
+
+
+@contextmanager
+def request_trace(name: str, thread_id: str, **attributes):
+    """Root span of one API request; yields the callbacks to run the graph with."""
+    if not TRACING_ENABLED:
+        yield []
+        return
+    with tracer.start_as_current_span(name, attributes={THREAD_ID_ATTRIBUTE: thread_id, **attributes}) as root:
+        yield [TracingCallbackHandler(root)]
+
+
+class TracedClient:
+    """Proxy recording a span around each public method call of a backend client."""
+
+    def __init__(self, client, system: str, methods=None):
+        self._client = client
+        self._system = system
+        self._methods = frozenset(methods) if methods else None
+
+    def __getattr__(self, name):
+        attribute = getattr(self._client, name)
+        if name.startswith("_") or not callable(attribute) or (self._methods and name not in self._methods):
+            return attribute
+        span_name = f"{self._system}.{name}"
+        system = self._system
+
+        if inspect.iscoroutinefunction(attribute):
+            @functools.wraps(attribute)
+            async def traced_async(*args, **kwargs):
+                with span(span_name, **{"peer.service": system}):
+                    return await attribute(*args, **kwargs)
+            return traced_async
+
+        @functools.wraps(attribute)
+        def traced_call(*args, **kwargs):
+            with span(span_name, **{"peer.service": system}):
+                return attribute(*args, **kwargs)
+        return traced_call
+
+    def __repr__(self):
+        return f"TracedClient({self._client!r})"
+
+
+def traced_client(client, system: str, methods=None):
+    """`client` with its calls traced, or `client` itself when tracing is off."""
+    return TracedClient(client, system, methods) if TRACING_ENABLED else client
+
+
+def waterfall(spans: list) -> dict:
+    """One trace as a list of spans in start order, with offsets from the root and nesting depth."""
+    spans = sorted(spans, key=lambda s: s.start_time)
+    by_id = {s.context.span_id: s for s in spans}
+    root = next((s for s in spans if s.parent is None), spans[0])
+    origin = root.start_time
+
+    def depth(s) -> int:
+        level = 0
+        while s.parent is not None and s.parent.span_id in by_id:
+            s = by_id[s.parent.span_id]
+            level += 1
+        return level
+
+    return {
+        "trace_id": format(root.context.trace_id, "032x"),
+        "name": root.name,
+        "thread_id": root.attributes.get(THREAD_ID_ATTRIBUTE),
+        "started_at": datetime.fromtimestamp(origin / 1e9, timezone.utc).isoformat(),
+        "duration_ms": round(((root.end_time or origin) - origin) / 1e6, 2),
+        "spans": [
+            {
+                "name": s.name,
+                "span_id": format(s.context.span_id, "016x"),
+                "parent_id": format(s.parent.span_id, "016x") if s.parent is not None else None,
+                "depth": depth(s),
+                "offset_ms": round((s.start_time - origin) / 1e6, 2),
+                "duration_ms": round(((s.end_time or s.start_time) - s.start_time) / 1e6, 2),
+                "status": s.status.status_code.name,
+                "attributes": dict(s.attributes),
+            }
+            for s in spans
+        ],
+    }
+
+
+def render_waterfall(trace_data: dict, width: int = 40) -> str:
+    """Plain-text waterfall: offset, duration, and a bar placed on the request's timeline."""
+    total = trace_data["duration_ms"] or 1.0
+    lines = [f"trace {trace_data['trace_id']}  {trace_data['name']}  {total:.1f} ms  ({trace_data['started_at']})"]
+    for s in trace_data["spans"]:
+        start = int(s["offset_ms"] / total * width)
+        length = max(1, int(s["duration_ms"] / total * width))
+        bar = " " * min(start, width - 1) + "█" * min(length, width - min(start, width - 1))
+        marker = " !" if s["status"] == "ERROR" else ""
+        lines.append(
+            f"{s['offset_ms']:>9.1f} {s['duration_ms']:>9.1f} ms  |{bar:<{width}}|  {'  ' * s['depth']}{s['name']}{marker}"
+        )
+    return "\n".join(lines)
+
+
+def recent_waterfalls(thread_id: str, limit: int = 1) -> list[dict]:
+    if recent_traces is None:
+        return []
+    return [waterfall(spans) for spans in recent_traces.traces(thread_id, limit) if spans]
+
+
+def snapshot() -> dict:
+    recent = recent_traces.snapshot() if recent_traces is not None else {}
+    return {"enabled": TRACING_ENABLED, "exporter": TRACING_EXPORTER, **recent}
+
+
+def shutdown():
+    """Flush spans still waiting in the exporter."""
+    if provider is not None:
+        provider.shutdown()
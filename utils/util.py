@@ -6,18 +6,17 @@ Shared utilities, classes, and configurations for the agent.
 # Imports
 # =========================
 import logging
-from langchain_openai import ChatOpenAI
 from langchain_community.embeddings import JinaEmbeddings
 import os
 import time
+import asyncio
+import threading
 import chromadb
 from dotenv import load_dotenv
-from atlassian import Jira
+from .embedding_cache import CachedEmbeddings
+from .vector_store import VECTOR_STORE_BACKEND, create_client
+from .tracing import span, traced_client
 
-# SMTP for Email
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 
 # =========================
 # Environment Setup
@@ -49,120 +48,228 @@ def _setup_logger():
 
 logger = _setup_logger()
 
-# =========================
-# SMTP Email Configuration
-# =========================
-def send_email_smtp(to: str, subject: str, body: str) -> str:
-    """
-    Send an email using SMTP (Gmail).
-    Requires SMTP_EMAIL and SMTP_PASSWORD environment variables.
-    """
-    smtp_email = os.getenv("SMTP_EMAIL")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    
-    if not smtp_email or not smtp_password:
-        raise ValueError("SMTP_EMAIL and SMTP_PASSWORD must be set in environment")
-    
-    # Create message
-    msg = MIMEMultipart()
-    msg['From'] = smtp_email
-    msg['To'] = to
-    msg['Subject'] = subject
-    msg.attach(MIMEText(body, 'plain'))
-    
-    # Send via Gmail SMTP
-    with smtplib.SMTP_SSL('smtp.gmail.com', 465) as server:
-        server.login(smtp_email, smtp_password)
-        server.send_message(msg)
-    
-    return "Email sent successfully"
-
 # =========================
 # LLM and Embeddings Initialization
 # =========================
-llm = ChatOpenAI(
-    api_key=os.getenv("LLM_API_KEY"),
-    base_url=os.getenv("LLM_BASE_URL"),
-    model=os.getenv("LLM_MODEL_NAME"),
-)
+from .llm_gateway import create_chat_model, llm_gateway
 
-embeddings = JinaEmbeddings(
-    jina_api_key=os.getenv("JINA_EMBEDDING_API_KEY"),
-    jina_embedding_model=os.getenv("JINA_EMBEDDING_MODEL"),
-)   
+# Shared by every agent; async calls go through the gateway's pool, limit, coalescing and retries
+llm = create_chat_model()
+
+# Repeated texts are served from the memory/disk embedding cache; the API calls on a miss are traced
+embeddings = CachedEmbeddings(
+    traced_client(
+        JinaEmbeddings(
+            jina_api_key=os.getenv("JINA_EMBEDDING_API_KEY"),
+            jina_embedding_model=os.getenv("JINA_EMBEDDING_MODEL"),
+        ),
+        "jina",
+        ("embed_documents", "embed_query"),
+    ),
+)
 
 _chroma_client = None
 
+CHROMA_CONNECT_RETRIES = int(os.getenv("CHROMA_CONNECT_RETRIES", "8"))
+CHROMA_CONNECT_RETRY_DELAY = float(os.getenv("CHROMA_CONNECT_RETRY_DELAY", "1.5"))
+# Collection calls recorded as spans
+TRACED_COLLECTION_METHODS = ("query", "get", "add", "upsert", "update", "delete", "count", "peek")
 
-def get_chroma_client():
-    """Create (or reuse) a resilient ChromaDB HttpClient with retries."""
+
+def connect_chroma_client():
+    """
+    Make a single attempt to create the vector-store client selected by VECTOR_STORE_BACKEND.
+
+    Raises on failure instead of retrying, so callers choose how to wait.
+    """
     global _chroma_client
     if _chroma_client is not None:
         return _chroma_client
 
+    if VECTOR_STORE_BACKEND != "http":
+        _chroma_client = create_client(VECTOR_STORE_BACKEND)
+        logger.info("Using local vector store backend '%s'", VECTOR_STORE_BACKEND)
+        return _chroma_client
+
     host = os.getenv("CHROMA_HOST", "localhost")
     port = int(os.getenv("CHROMA_PORT", "8000"))
     tenant = os.getenv("CHROMA_TENANT", "default_tenant")
     database = os.getenv("CHROMA_DATABASE", "default_database")
-    attempts = int(os.getenv("CHROMA_CONNECT_RETRIES", "8"))
-    delay_seconds = float(os.getenv("CHROMA_CONNECT_RETRY_DELAY", "1.5"))
+    _chroma_client = chromadb.HttpClient(
+        host=host,
+        port=port,
+        tenant=tenant,
+        database=database,
+    )
+    logger.info(
+        "Connected to ChromaDB at %s:%s (tenant=%s, database=%s)",
+        host,
+        port,
+        tenant,
+        database,
+    )
+    return _chroma_client
+
+
+def reset_chroma_client():
+    """Drop the cached client so the next connection attempt creates a new one."""
+    global _chroma_client
+    _chroma_client = None
+
+
+def get_chroma_client():
+    """
+    Create (or reuse) the vector-store client selected by VECTOR_STORE_BACKEND.
+
+    The default `http` backend is a resilient ChromaDB HttpClient with retries;
+    the local backends (`chroma`, `numpy`) run in-process. Retries block with
+    time.sleep, so the API resolves collections through `chroma_collections`
+    instead.
+    """
+    if _chroma_client is not None:
+        return _chroma_client
 
     last_error = None
-    for attempt in range(1, attempts + 1):
+    for attempt in range(1, CHROMA_CONNECT_RETRIES + 1):
         try:
-            _chroma_client = chromadb.HttpClient(
-                host=host,
-                port=port,
-                tenant=tenant,
-                database=database,
-            )
-            logger.info(
-                "Connected to ChromaDB at %s:%s (tenant=%s, database=%s)",
-                host,
-                port,
-                tenant,
-                database,
-            )
-            return _chroma_client
+            return connect_chroma_client()
         except Exception as exc:
             last_error = exc
             logger.warning(
                 "ChromaDB connection attempt %s/%s failed: %s",
                 attempt,
-                attempts,
+                CHROMA_CONNECT_RETRIES,
                 exc,
             )
-            if attempt < attempts:
-                time.sleep(delay_seconds)
+            if attempt < CHROMA_CONNECT_RETRIES:
+                time.sleep(CHROMA_CONNECT_RETRY_DELAY)
 
     raise RuntimeError(
-        f"Unable to connect to ChromaDB at {host}:{port} after {attempts} attempts. "
-        f"Last error: {last_error}"
+        f"Unable to connect to the vector store ({VECTOR_STORE_BACKEND}) after "
+        f"{CHROMA_CONNECT_RETRIES} attempts. Last error: {last_error}"
     )
 
 
+class CollectionCache:
+    """
+    Resolved collection handles keyed by name.
+
+    Resolving a collection (`get_or_create_collection`) costs a round trip per
+    call on the HTTP backend, so handles are kept and reused. A failing call
+    invalidates its handle and starts one background health check: it
+    heartbeats the client and, if that fails, reconnects with the usual
+    retry count and delay, sleeping on the event loop. Until it succeeds,
+    lookups fail fast instead of blocking request threads.
+    """
+
+    def __init__(self, connect, reset, retries: int, retry_delay: float):
+        self.connect = connect
+        self.reset = reset
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._reconnect_task = None
+        self.healthy = True
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "invalidations": 0,
+            "health_checks": 0,
+            "reconnects": 0,
+            "failed_attempts": 0,
+        }
+
+    def get(self, name: str):
+        """Cached handle for a collection, resolving it with one connection attempt on a miss."""
+        with self._lock:
+            handle = self._handles.get(name)
+            if handle is not None:
+                self.stats["hits"] += 1
+                return handle
+        with span("chroma.get_or_create_collection", collection=name):
+            handle = self.connect().get_or_create_collection(name=name, metadata={"hnsw:space": "cosine"})
+        handle = traced_client(handle, "chroma", TRACED_COLLECTION_METHODS)
+        with self._lock:
+            self.stats["misses"] += 1
+            self._handles[name] = handle
+        return handle
+
+    async def aget(self, name: str):
+        """Async lookup; cache hits never leave the event loop."""
+        handle = self._handles.get(name)
+        if handle is not None:
+            self.stats["hits"] += 1
+            return handle
+        if not self.healthy:
+            raise ConnectionError("Vector store is unavailable; reconnecting in the background")
+        try:
+            return await asyncio.to_thread(self.get, name)
+        except Exception:
+            self.invalidate(name)
+            raise
+
+    def invalidate(self, name: str = None):
+        """Drop one (or every) handle and check the connection in the background."""
+        with self._lock:
+            if name is None:
+                self._handles.clear()
+            else:
+                self._handles.pop(name, None)
+            self.stats["invalidations"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = loop.create_task(self._check_and_reconnect())
+
+    def _heartbeat(self):
+        with span("chroma.heartbeat"):
+            self.connect().heartbeat()
+
+    async def _check_and_reconnect(self):
+        self.stats["health_checks"] += 1
+        try:
+            await asyncio.to_thread(self._heartbeat)
+            return
+        except Exception as exc:
+            logger.warning("Vector store health check failed, reconnecting: %s", exc)
+
+        self.healthy = False
+        with self._lock:
+            self._handles.clear()
+        for attempt in range(1, self.retries + 1):
+            self.reset()
+            try:
+                await asyncio.to_thread(self._heartbeat)
+                self.healthy = True
+                self.stats["reconnects"] += 1
+                logger.info("Vector store reconnected after %s attempt(s)", attempt)
+                return
+            except Exception as exc:
+                self.stats["failed_attempts"] += 1
+                logger.warning("Vector store reconnect attempt %s/%s failed: %s", attempt, self.retries, exc)
+                if attempt < self.retries:
+                    await asyncio.sleep(self.retry_delay)
+        # Let the next lookup try again, and trigger a new check if it fails
+        self.healthy = True
+        logger.error("Vector store still unavailable after %s reconnect attempts", self.retries)
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "handles": len(self._handles), "healthy": self.healthy}
+
+
+# Resolved collection handles for the API, with background reconnects
+chroma_collections = CollectionCache(
+    connect_chroma_client,
+    reset_chroma_client,
+    retries=CHROMA_CONNECT_RETRIES,
+    retry_delay=CHROMA_CONNECT_RETRY_DELAY,
+)
+
+
 # Backward compatibility for existing imports.
 client = get_chroma_client
 # Default collection name (configurable via env var)
 DEFAULT_COLLECTION = os.getenv("CHROMA_COLLECTION_NAME", "my_collection")
-
-# ==========================
-# Jira Init
-# ==========================
-def get_jira_client():
-    """Get Jira client with username/password authentication."""
-    jira_url = os.getenv("JIRA_INSTANCE_URL")
-    jira_username = os.getenv("JIRA_USERNAME")
-    jira_password = os.getenv("JIRA_PASSWORD")
-    
-    if not all([jira_url, jira_username, jira_password]):
-        raise ValueError(
-            "Missing Jira credentials. Please set JIRA_INSTANCE_URL, "
-            "JIRA_USERNAME, and JIRA_PASSWORD environment variables."
-        )
-    
-    return Jira(
-        url=jira_url,
-        username=jira_username,
-        password=jira_password
-    )
\ No newline at end of file
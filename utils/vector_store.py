@@ -0,0 +1,496 @@
+"""
+Pluggable vector-store backends behind `get_chroma_client`.
+
+VECTOR_STORE_BACKEND selects where collections live:
+
+- http:   a ChromaDB server reached over HTTP (the docker-compose setup)
+- chroma: an in-process persistent ChromaDB at CHROMA_PERSIST_PATH
+- numpy:  a local store at VECTOR_STORE_PATH; vectors sit in an append-only
+  float32 file that is memory-mapped at startup, records in SQLite. Queries
+  run as an exact flat scan or, with VECTOR_STORE_INDEX=hnsw, through an
+  HNSW graph built over the mapped vectors once and then kept in step with
+  new and deleted rows. Once dead rows (deleted or replaced records) make up
+  half the vector file, it is compacted into a new file generation.
+
+The local backends remove the network hop and JSON round trip from every
+query. `LocalVectorClient` and `LocalCollection` implement the subset of the
+ChromaDB client/collection API this project uses (add, upsert, update, delete,
+get, query, count), so ingestion, retrieval and the migration tools work
+unchanged on every backend. Only cosine collections are supported.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+
+import numpy as np
+import portalocker
+
+# =========================
+# Configuration
+# =========================
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "http")
+VECTOR_STORE_PATH = os.getenv("VECTOR_STORE_PATH", "vector_store")
+VECTOR_STORE_INDEX = os.getenv("VECTOR_STORE_INDEX", "flat")
+VECTOR_STORE_HNSW_EF = int(os.getenv("VECTOR_STORE_HNSW_EF", "64"))
+# Compact a vector file once it holds at least this many dead rows, and no fewer than live ones
+VECTOR_STORE_COMPACT_MIN_DEAD_ROWS = int(os.getenv("VECTOR_STORE_COMPACT_MIN_DEAD_ROWS", "1024"))
+CHROMA_PERSIST_PATH = os.getenv("CHROMA_PERSIST_PATH", "chroma_data")
+
+BACKENDS = ("http", "chroma", "numpy")
+DEFAULT_INCLUDE = ("metadatas", "documents")
+
+
+class LocalCollection:
+    """A cosine collection stored as a memory-mapped vector file plus SQLite records."""
+
+    def __init__(self, client: "LocalVectorClient", name: str, dim: int | None, metadata: dict):
+        self.client = client
+        self.name = name
+        self.metadata = metadata
+        self.dim = dim
+        self.index_type = client.index_type
+        self.generation = client.collection_generation(name)
+        self._mapped_generation = self.generation
+        self.lock_path = os.path.join(client.path, f"{name}.lock")
+
+        # One SQLite connection per client, so every collection shares its lock
+        self._lock = client._lock
+        self._data_version = None
+        self._mmap = None
+        self._row_ids = np.empty(0, dtype=object)
+        self._live = np.zeros(0, dtype=bool)
+        self._hnsw = None
+        # Rows marked deleted in the HNSW graph, which still take up its capacity
+        self._hnsw_deleted = 0
+        self._refresh()
+
+    def _vectors_path(self, generation: int) -> str:
+        """Vector file of one generation; compaction writes the next one."""
+        suffix = f".{generation}" if generation else ""
+        return os.path.join(self.client.path, f"{self.name}{suffix}.f32")
+
+    @property
+    def vectors_path(self) -> str:
+        return self._vectors_path(self.generation)
+
+    # ---------- loading ----------
+
+    def _refresh(self):
+        """Reload rows and re-map vectors when this or another process committed changes."""
+        with self._lock:
+            version = self.client.data_version()
+            if version == self._data_version:
+                return
+            self._data_version = version
+            if self.dim is None:
+                self.dim = self.client.collection_dim(self.name)
+            self.generation = self.client.collection_generation(self.name)
+            if self.generation != self._mapped_generation:
+                # Compacted: rows were renumbered into a new file
+                self._mapped_generation = self.generation
+                self._live = np.zeros(0, dtype=bool)
+                self._hnsw = None
+            if self.dim is None or not os.path.exists(self.vectors_path):
+                self._mmap = None
+                self._row_ids = np.empty(0, dtype=object)
+                self._live = np.zeros(0, dtype=bool)
+                self._hnsw = None
+                return
+
+            n_rows = os.path.getsize(self.vectors_path) // (4 * self.dim)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+            row_ids = np.empty(n_rows, dtype=object)
+            live = np.zeros(n_rows, dtype=bool)
+            for row, record_id in self.client.conn.execute(
+                "SELECT row, id FROM records WHERE collection = ?", (self.name,)
+            ):
+                if row < n_rows:
+                    row_ids[row] = record_id
+                    live[row] = True
+            previous_live = self._live
+            self._row_ids = row_ids
+            self._live = live
+            if self.index_type == "hnsw":
+                self._update_hnsw(previous_live)
+
+    def _build_hnsw(self):
+        import hnswlib  # shipped with chromadb as chroma-hnswlib
+
+        rows = np.flatnonzero(self._live)
+        self._hnsw_deleted = 0
+        if len(rows) == 0:
+            self._hnsw = None
+            return
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=len(rows), ef_construction=100, M=16)
+        index.add_items(np.asarray(self._mmap[rows]), rows)
+        index.set_ef(VECTOR_STORE_HNSW_EF)
+        self._hnsw = index
+
+    def _update_hnsw(self, previous_live: np.ndarray):
+        """
+        Apply the rows added and deleted since the last refresh to the HNSW graph.
+
+        Rows are append-only, so a commit only adds rows past the old end or
+        drops live ones; the graph is rebuilt only when it does not exist yet or
+        deleted rows outnumber live ones.
+        """
+        if self._hnsw is None or len(previous_live) > len(self._live):
+            self._build_hnsw()
+            return
+        was_live = np.zeros(len(self._live), dtype=bool)
+        was_live[:len(previous_live)] = previous_live
+        added = np.flatnonzero(self._live & ~was_live)
+        removed = np.flatnonzero(was_live & ~self._live)
+        if self._hnsw_deleted + len(removed) > max(int(self._live.sum()), 1024):
+            self._build_hnsw()
+            return
+        for row in removed:
+            self._hnsw.mark_deleted(int(row))
+        self._hnsw_deleted += len(removed)
+        if len(added):
+            needed = self._hnsw.get_current_count() + len(added)
+            if needed > self._hnsw.get_max_elements():
+                self._hnsw.resize_index(max(needed, 2 * self._hnsw.get_max_elements()))
+            self._hnsw.add_items(np.asarray(self._mmap[added]), added)
+
+    # ---------- writes ----------
+
+    @staticmethod
+    def _normalize(embeddings) -> np.ndarray:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _existing(self, ids: list[str]) -> dict[str, tuple[str, dict]]:
+        found = {}
+        for start in range(0, len(ids), 500):
+            batch = ids[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            for record_id, document, metadata in self.client.conn.execute(
+                f"SELECT id, document, metadata FROM records WHERE collection = ? AND id IN ({placeholders})",
+                (self.name, *batch),
+            ):
+                found[record_id] = (document, json.loads(metadata) if metadata else None)
+        return found
+
+    def _write(self, ids, embeddings=None, documents=None, metadatas=None, mode="upsert"):
+        if not ids:
+            return
+        ids = list(ids)
+        with self._lock, portalocker.Lock(self.lock_path, timeout=60):
+            # Another process may have compacted the file
+            self.generation = self.client.collection_generation(self.name)
+            existing = self._existing(ids)
+            if mode == "add":
+                keep = [i for i, record_id in enumerate(ids) if record_id not in existing]
+            elif mode == "update":
+                keep = [i for i, record_id in enumerate(ids) if record_id in existing]
+            else:
+                keep = list(range(len(ids)))
+            if not keep:
+                return
+
+            rows = {}
+            if embeddings is not None:
+                vectors = self._normalize([embeddings[i] for i in keep])
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    self.client.set_collection_dim(self.name, self.dim)
+                if vectors.shape[1] != self.dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match collection dimension {self.dim}")
+                first_row = os.path.getsize(self.vectors_path) // (4 * self.dim) if os.path.exists(self.vectors_path) else 0
+                with open(self.vectors_path, "ab") as f:
+                    f.write(vectors.tobytes())
+                rows = {ids[i]: first_row + offset for offset, i in enumerate(keep)}
+            elif mode != "update":
+                raise ValueError("embeddings are required to add new records")
+
+            with self.client.conn:
+                for i in keep:
+                    record_id = ids[i]
+                    old_document, old_metadata = existing.get(record_id, (None, None))
+                    document = documents[i] if documents is not None else old_document
+                    metadata = metadatas[i] if metadatas is not None else None
+                    # Chroma merges metadata into existing records
+                    if old_metadata and metadata is not None:
+                        metadata = {**old_metadata, **metadata}
+                    elif metadata is None:
+                        metadata = old_metadata
+                    if record_id in existing:
+                        self.client.conn.execute(
+                            "UPDATE records SET row = COALESCE(?, row), document = ?, metadata = ? "
+                            "WHERE collection = ? AND id = ?",
+                            (rows.get(record_id), document, json.dumps(metadata) if metadata else None, self.name, record_id),
+                        )
+                    else:
+                        self.client.conn.execute(
+                            "INSERT INTO records (collection, id, row, document, metadata) VALUES (?, ?, ?, ?, ?)",
+                            (self.name, record_id, rows[record_id], document, json.dumps(metadata) if metadata else None),
+                        )
+            if rows and existing:
+                # Replaced records left their old rows behind
+                self._maybe_compact()
+
+    def add(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="add")
+
+    def upsert(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="upsert")
+
+    def update(self, ids, embeddings=None, documents=None, metadatas=None):
+        self._write(ids, embeddings, documents, metadatas, mode="update")
+
+    def delete(self, ids=None):
+        if not ids:
+            return
+        with self._lock, portalocker.Lock(self.lock_path, timeout=60):
+            with self.client.conn:
+                self.client.conn.executemany(
+                    "DELETE FROM records WHERE collection = ? AND id = ?",
+                    [(self.name, record_id) for record_id in ids],
+                )
+            self._maybe_compact()
+
+    # ---------- compaction ----------
+
+    def _maybe_compact(self):
+        """Compact once dead rows reach the threshold and outnumber live ones; holds the write locks."""
+        path = self._vectors_path(self.client.collection_generation(self.name))
+        if self.dim is None or not os.path.exists(path):
+            return
+        dead = os.path.getsize(path) // (4 * self.dim) - self.count()
+        if dead >= max(VECTOR_STORE_COMPACT_MIN_DEAD_ROWS, self.count()):
+            self._compact()
+
+    def compact(self) -> int:
+        """Rewrite the vector file with only the live rows; returns the dead rows dropped."""
+        with self._lock, portalocker.Lock(self.lock_path, timeout=60):
+            return self._compact()
+
+    def _compact(self) -> int:
+        generation = self.client.collection_generation(self.name)
+        path = self._vectors_path(generation)
+        if self.dim is None or not os.path.exists(path):
+            return 0
+        n_rows = os.path.getsize(path) // (4 * self.dim)
+        records = self.client.conn.execute(
+            "SELECT id, row FROM records WHERE collection = ? ORDER BY row", (self.name,)
+        ).fetchall()
+        if len(records) == n_rows:
+            return 0
+
+        # Write the next generation completely, then switch rows and generation in one
+        # transaction; a crash before the commit leaves the old file and rows in use
+        source = np.memmap(path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        new_path = self._vectors_path(generation + 1)
+        with open(new_path, "wb") as f:
+            for start in range(0, len(records), 4096):
+                f.write(np.asarray(source[[row for _, row in records[start:start + 4096]]]).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        del source
+        with self.client.conn:
+            self.client.conn.executemany(
+                "UPDATE records SET row = ? WHERE collection = ? AND id = ?",
+                [(row, self.name, record_id) for row, (record_id, _) in enumerate(records)],
+            )
+            self.client.conn.execute(
+                "UPDATE collections SET generation = ? WHERE name = ?", (generation + 1, self.name)
+            )
+        self.generation = generation + 1
+        # Processes still mapping the old file keep reading it until they refresh
+        os.remove(path)
+        return n_rows - len(records)
+
+    # ---------- reads ----------
+
+    def count(self) -> int:
+        with self._lock:
+            return self.client.conn.execute(
+                "SELECT COUNT(*) FROM records WHERE collection = ?", (self.name,)
+            ).fetchone()[0]
+
+    def _records(self, rows_sql: str, params: tuple, include) -> dict:
+        result = {"ids": [], "embeddings": None, "documents": None, "metadatas": None}
+        if "embeddings" in include:
+            # Rows must be read against the vector file generation they point into
+            self._refresh()
+        with self._lock:
+            records = self.client.conn.execute(
+                f"SELECT id, row, document, metadata FROM records WHERE collection = ? {rows_sql}",
+                (self.name, *params),
+            ).fetchall()
+        result["ids"] = [record[0] for record in records]
+        if "documents" in include:
+            result["documents"] = [record[2] for record in records]
+        if "metadatas" in include:
+            result["metadatas"] = [json.loads(record[3]) if record[3] else None for record in records]
+        if "embeddings" in include:
+            with self._lock:
+                result["embeddings"] = [np.asarray(self._mmap[record[1]]).tolist() for record in records]
+        return result
+
+    def get(self, ids=None, include=DEFAULT_INCLUDE, limit=None, offset=None) -> dict:
+        if ids is not None:
+            records = {record_id: None for record_id in ids}
+            result = {"ids": [], "embeddings": None, "documents": None, "metadatas": None}
+            for start in range(0, len(ids), 500):
+                batch = list(ids)[start:start + 500]
+                part = self._records(f"AND id IN ({','.join('?' * len(batch))})", tuple(batch), include)
+                for key in result:
+                    if part[key] is not None:
+                        result[key] = (result[key] or []) + part[key]
+            # Keep the requested order, like Chroma
+            order = {record_id: i for i, record_id in enumerate(result["ids"])}
+            positions = [order[record_id] for record_id in records if record_id in order]
+            return {key: [value[i] for i in positions] if value is not None else None for key, value in result.items()}
+        return self._records(
+            "ORDER BY row LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset or 0),
+            include,
+        )
+
+    def _search(self, vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k rows and cosine similarities for one normalized query vector."""
+        if self._hnsw is not None:
+            # The graph still counts rows marked deleted
+            k = min(k, int(self._live.sum()))
+            labels, distances = self._hnsw.knn_query(vector, k=k)
+            return labels[0].astype(np.int64), 1.0 - distances[0]
+        scores = np.asarray(self._mmap @ vector)
+        scores[~self._live] = -np.inf
+        k = min(k, int(self._live.sum()))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top])][:k]
+        return top, scores[top]
+
+    def query(self, query_embeddings, n_results: int = 10, include=("metadatas", "documents", "distances")) -> dict:
+        self._refresh()
+        result = {key: [] for key in ("ids", "distances", "documents", "metadatas")}
+        queries = self._normalize(query_embeddings)
+        with self._lock:
+            live_count = int(self._live.sum()) if self._mmap is not None else 0
+            hits = [self._search(vector, n_results) if live_count else (np.empty(0, dtype=np.int64), np.empty(0)) for vector in queries]
+            hit_ids = [[self._row_ids[row] for row in rows] for rows, _ in hits]
+
+        wanted = [record_id for ids in hit_ids for record_id in ids]
+        records = self.get(ids=list(dict.fromkeys(wanted)), include=[key for key in include if key in DEFAULT_INCLUDE]) if wanted else {"ids": []}
+        by_id = {record_id: i for i, record_id in enumerate(records["ids"])}
+        for ids, (_, similarities) in zip(hit_ids, hits):
+            # Records deleted since the search are dropped from its hits
+            kept = [(i, s) for i, s in zip(ids, similarities) if i in by_id]
+            ids, similarities = [i for i, _ in kept], [s for _, s in kept]
+            result["ids"].append(list(ids))
+            result["distances"].append([float(1.0 - s) for s in similarities])
+            result["documents"].append([records["documents"][by_id[i]] for i in ids] if records.get("documents") is not None else None)
+            result["metadatas"].append([records["metadatas"][by_id[i]] for i in ids] if records.get("metadatas") is not None else None)
+        for key in ("documents", "metadatas", "distances"):
+            if key not in include:
+                result[key] = None
+        result["embeddings"] = None
+        return result
+
+
+class LocalVectorClient:
+    """ChromaDB-compatible client for the memory-mapped NumPy backend."""
+
+    def __init__(self, path: str = VECTOR_STORE_PATH, index_type: str = VECTOR_STORE_INDEX):
+        if index_type not in ("flat", "hnsw"):
+            raise ValueError(f"Unknown VECTOR_STORE_INDEX '{index_type}'. Use 'flat' or 'hnsw'.")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.index_type = index_type
+        self.conn = sqlite3.connect(os.path.join(path, "store.db"), check_same_thread=False)
+        self.conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            CREATE TABLE IF NOT EXISTS collections (
+                name TEXT PRIMARY KEY,
+                dim INTEGER,
+                metadata TEXT,
+                generation INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                row INTEGER NOT NULL,
+                document TEXT,
+                metadata TEXT,
+                PRIMARY KEY (collection, id)
+            );
+            """
+        )
+        # Stores created before compaction have no generation column
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(collections)")}
+        if "generation" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE collections ADD COLUMN generation INTEGER NOT NULL DEFAULT 0")
+        self._collections: dict[str, LocalCollection] = {}
+        self._lock = threading.RLock()
+
+    def data_version(self) -> int:
+        """Changes whenever any connection, in any process, commits to the store."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0] + self.conn.total_changes
+
+    def collection_dim(self, name: str) -> int | None:
+        row = self.conn.execute("SELECT dim FROM collections WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def collection_generation(self, name: str) -> int:
+        row = self.conn.execute("SELECT generation FROM collections WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def set_collection_dim(self, name: str, dim: int):
+        with self.conn:
+            self.conn.execute("UPDATE collections SET dim = ? WHERE name = ?", (dim, name))
+
+    def get_or_create_collection(self, name: str, metadata: dict = None, **kwargs) -> LocalCollection:
+        with self._lock:
+            if name in self._collections:
+                return self._collections[name]
+            row = self.conn.execute("SELECT dim, metadata FROM collections WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                metadata = metadata or {"hnsw:space": "cosine"}
+                if metadata.get("hnsw:space", "cosine") != "cosine":
+                    raise ValueError("The numpy vector store only supports cosine collections")
+                with self.conn:
+                    self.conn.execute(
+                        "INSERT INTO collections (name, dim, metadata) VALUES (?, NULL, ?)",
+                        (name, json.dumps(metadata)),
+                    )
+                dim = None
+            else:
+                dim, metadata = row[0], json.loads(row[1]) if row[1] else {}
+            collection = LocalCollection(self, name, dim, metadata)
+            self._collections[name] = collection
+            return collection
+
+    def get_collection(self, name: str, **kwargs) -> LocalCollection:
+        if not self.conn.execute("SELECT 1 FROM collections WHERE name = ?", (name,)).fetchone():
+            raise ValueError(f"Collection {name} does not exist.")
+        return self.get_or_create_collection(name)
+
+    def list_collections(self):
+        return [self.get_or_create_collection(name) for (name,) in self.conn.execute("SELECT name FROM collections")]
+
+    def heartbeat(self) -> int:
+        return 0
+
+
+def create_client(backend: str = VECTOR_STORE_BACKEND):
+    """Client for a local backend; the HTTP backend is created by `get_chroma_client`."""
+    if backend == "chroma":
+        import chromadb
+
+        return chromadb.PersistentClient(
+            path=CHROMA_PERSIST_PATH,
+            settings=chromadb.config.Settings(anonymized_telemetry=False),
+        )
+    if backend == "numpy":
+        return LocalVectorClient()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND '{backend}'. Use one of: {', '.join(BACKENDS)}.")